@@ -10,16 +10,26 @@
 # limitations under the License.
 ################################################################################
 
-from typing import Any
+import hashlib
+import json
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Iterator
 
 import boto3
 import pyarrow as pa
 from botocore.config import Config
-from data_processing.utils import TransformUtils, get_logger
+from data_processing.utils import MB, TransformUtils, get_logger
 
 
 logger = get_logger(__name__)
 
+# S3 limits for multipart upload
+MIN_PART_SIZE = 5 * MB
+MAX_PARTS = 10000
+
 
 class ArrowS3:
     """
@@ -36,6 +46,11 @@ class ArrowS3:
         region: str = None,
         s3_retries: int = 10,
         s3_max_attempts=10,
+        part_size: int = 64 * MB,
+        max_concurrency: int = 4,
+        listing_concurrency: int = 1,
+        listing_cache: str = None,
+        listing_cache_ttl: int = 3600,
     ) -> None:
         """
         Initialization
@@ -45,18 +60,33 @@ class ArrowS3:
         :param region: s3 region
         :param s3_retries: number of S3 retries - default 10
         :param s3_max_attempts - boto s3 client internal retries - default 10
+        :param part_size - size of the part for ranged reads and multipart uploads, objects larger than
+                           this are read and written in parts - default 64MB
+        :param max_concurrency - max number of parts read or written concurrently - default 4
+        :param listing_concurrency - max number of prefixes listed concurrently, walking the folder tree one
+                                     level at a time. 1 - files are listed using flat paginated listing - default 1
+        :param listing_cache - optional local folder to cache listings in - default None (no caching)
+        :param listing_cache_ttl - time (sec) for which cached listing is valid, 0 - forever - default 3600
         """
-        # Create boto S3 client
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.max_concurrency = max(max_concurrency, 1)
+        self.listing_concurrency = max(listing_concurrency, 1)
+        # Create boto S3 client. Make sure that the connection pool is large enough for concurrent requests
         self.s3_client = boto3.client(
             service_name="s3",
             aws_access_key_id=access_key,
             aws_secret_access_key=secret_key,
             endpoint_url=endpoint,
             region_name=region,
-            config=Config(retries={"max_attempts": s3_max_attempts, "mode": "standard"}),
+            config=Config(
+                retries={"max_attempts": s3_max_attempts, "mode": "standard"},
+                max_pool_connections=max(10, self.max_concurrency, self.listing_concurrency),
+            ),
         )
         self.retries = s3_retries
         self.s3_max_attempts = s3_max_attempts
+        self.listing_cache = listing_cache
+        self.listing_cache_ttl = listing_cache_ttl
 
     @staticmethod
     def _get_bucket_key(key: str) -> tuple[str, str]:
@@ -69,53 +99,199 @@ class ArrowS3:
         return prefixes[0], "/".join(prefixes[1:])
 
     # get list of the files (names and sizes) for a given prefix (including bucket name)
-    def list_files(self, key: str) -> tuple[list[dict[str, Any]], int]:
+    def list_files(self, key: str, use_cache: bool = True) -> tuple[list[dict[str, Any]], int]:
+        """
+        List files in the folder (hierarchically going through all sub-folders). If listing concurrency
+        is greater than 1, sub-folders are listed concurrently
+        :param key: complete folder name
+        :param use_cache: use listing cache, if it is configured
+        :return: list of dictionaries, containing file names, length and ETag, and number of retries
+        """
+        bucket, prefix = self._get_bucket_key(key)
+        if use_cache:
+            files = self._read_listing_cache(kind="files", bucket=bucket, prefix=prefix)
+            if files is not None:
+                return files, 0
+        if self.listing_concurrency > 1:
+            # tree walk issues a request per prefix, it only pays off for deep trees of large folders
+            files, _, retries = self._list_tree(bucket=bucket, prefix=prefix)
+        else:
+            files = []
+            retries = 0
+            for page, r in self.iterate_files(key=key):
+                files.extend(page)
+                retries += r
+        if use_cache:
+            self._write_listing_cache(kind="files", bucket=bucket, prefix=prefix, listing=files)
+        return files, retries
+
+    def iterate_files(self, key: str) -> Iterator[tuple[list[dict[str, Any]], int]]:
         """
-        List files in the folder (hierarchically going through all sub-folders)
+        Lazily list files in the folder (hierarchically going through all sub-folders), one page at a time
         :param key: complete folder name
-        :return: list of dictionaries, containing file names and length and number of retries
+        :return: iterator of tuples of a list of dictionaries, containing file names, length and ETag
+                 and number of retries
         """
         bucket, prefix = self._get_bucket_key(key)
         # Use paginator here to get all the files rather then 1 page
         paginator = self.s3_client.get_paginator("list_objects_v2")
         pages = paginator.paginate(Bucket=bucket, Prefix=prefix)
-        files = []
-        retries = 0
         for page in pages:
-            # For every page
-            retries += page.get("ResponseMetadata", {}).get("RetryAttempts", 0)
-            for obj in page.get("Contents", []):
-                # Get both file name and size
-                files.append({"name": f"{bucket}/{obj['Key']}", "size": obj["Size"]})
-        return files, retries
+            # For every page get both file name and size
+            yield (
+                [self._file_entry(bucket=bucket, obj=obj) for obj in page.get("Contents", [])],
+                page.get("ResponseMetadata", {}).get("RetryAttempts", 0),
+            )
 
-    def list_folders(self, key: str) -> tuple[list[str], int]:
+    def list_folders(self, key: str, use_cache: bool = True) -> tuple[list[str], int]:
         """
-        Get list of folders for folder
+        Get list of folders for folder. Sub-folders are listed concurrently, if listing concurrency
+        is greater than 1
         :param key: complete folder
+        :param use_cache: use listing cache, if it is configured
         :return: list of folders within a given folder and number of retries
         """
-        def _get_sub_folders(bck: str, p: str) -> tuple[list[str], int]:
-            sub_folders = []
-            # use paginator
-            paginator = self.s3_client.get_paginator("list_objects_v2")
-            # use Delimiter to get folders just folders
-            page_iterator = paginator.paginate(Bucket=bck, Prefix=p, Delimiter="/")
-            internal_retries = 0
-            for page in page_iterator:
-                # for every page
-                internal_retries += page.get("ResponseMetadata", {}).get("RetryAttempts", 0)
-                for p in page.get("CommonPrefixes", []):
-                    sf = p["Prefix"]
-                    sub_folders.append(sf)
-                    # apply recursively
-                    sf, r = _get_sub_folders(bck=bck, p=sf)
-                    internal_retries += r
-                    sub_folders.extend(sf)
-            return sub_folders, internal_retries
         bucket, prefix = self._get_bucket_key(key)
-        subs, retries = _get_sub_folders(bck=bucket, p=prefix)
-        return [f"{bucket}/{f}" for f in subs], retries
+        if use_cache:
+            folders = self._read_listing_cache(kind="folders", bucket=bucket, prefix=prefix)
+            if folders is not None:
+                return folders, 0
+        _, subs, retries = self._list_tree(bucket=bucket, prefix=prefix, with_files=False)
+        folders = [f"{bucket}/{f}" for f in subs]
+        if use_cache:
+            self._write_listing_cache(kind="folders", bucket=bucket, prefix=prefix, listing=folders)
+        return folders, retries
+
+    def list_level(self, key: str) -> tuple[list[dict[str, Any]], list[str], int]:
+        """
+        List a single level of the folder, without going through its sub-folders
+        :param key: complete folder name
+        :return: tuple of files (dictionaries, containing file names, length and ETag) directly in the folder,
+                 its sub folders and number of retries
+        """
+        bucket, prefix = self._get_bucket_key(key)
+        if prefix != "" and not prefix.endswith("/"):
+            prefix = f"{prefix}/"
+        files, subs, retries = self._list_prefix(bucket=bucket, prefix=prefix, with_files=True)
+        return files, [f"{bucket}/{f}" for f in subs], retries
+
+    @staticmethod
+    def _file_entry(bucket: str, obj: dict[str, Any]) -> dict[str, Any]:
+        """
+        Convert S3 object description to the file entry
+        :param bucket: bucket name
+        :param obj: S3 object description
+        :return: dictionary of file name, size and ETag
+        """
+        return {"name": f"{bucket}/{obj['Key']}", "size": obj["Size"], "etag": obj.get("ETag", "")}
+
+    def _list_prefix(self, bucket: str, prefix: str, with_files: bool) -> tuple[list[dict[str, Any]], list[str], int]:
+        """
+        List a single level of the prefix
+        :param bucket: bucket name
+        :param prefix: prefix
+        :param with_files: collect files
+        :return: tuple of files, sub folders (prefixes) and number of retries
+        """
+        files = []
+        sub_folders = []
+        retries = 0
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        # use Delimiter to get a single level
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix, Delimiter="/"):
+            retries += page.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+            if with_files:
+                files.extend(self._file_entry(bucket=bucket, obj=obj) for obj in page.get("Contents", []))
+            sub_folders.extend(p["Prefix"] for p in page.get("CommonPrefixes", []))
+        return files, sub_folders, retries
+
+    def _list_tree(
+        self, bucket: str, prefix: str, with_files: bool = True
+    ) -> tuple[list[dict[str, Any]], list[str], int]:
+        """
+        List prefix hierarchically, fanning out over common prefixes (sub folders) using
+        a thread pool of listing_concurrency threads
+        :param bucket: bucket name
+        :param prefix: prefix
+        :param with_files: collect files
+        :return: tuple of files and sub folders (both sorted, i.e. in the order of flat listing)
+                 and number of retries
+        """
+        files = []
+        sub_folders = []
+        retries = 0
+        with ThreadPoolExecutor(max_workers=self.listing_concurrency) as executor:
+            pending = {executor.submit(self._list_prefix, bucket, prefix, with_files)}
+            while len(pending) > 0:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    level_files, level_folders, r = future.result()
+                    files.extend(level_files)
+                    sub_folders.extend(level_folders)
+                    retries += r
+                    for sub_folder in level_folders:
+                        pending.add(executor.submit(self._list_prefix, bucket, sub_folder, with_files))
+        files.sort(key=lambda f: f["name"])
+        sub_folders.sort()
+        return files, sub_folders, retries
+
+    def _listing_cache_file(self, kind: str, bucket: str, prefix: str) -> str:
+        """
+        Get the name of the listing cache file
+        :param kind: listing kind (files or folders)
+        :param bucket: bucket name
+        :param prefix: prefix
+        :return: cache file name
+        """
+        key = hashlib.sha256(f"{kind}:{bucket}/{prefix}".encode("utf-8")).hexdigest()
+        return os.path.join(self.listing_cache, f"{key}.json")
+
+    def _read_listing_cache(self, kind: str, bucket: str, prefix: str) -> list[Any]:
+        """
+        Read cached listing
+        :param kind: listing kind (files or folders)
+        :param bucket: bucket name
+        :param prefix: prefix
+        :return: cached listing or None, if the listing is not cached or expired
+        """
+        if self.listing_cache is None:
+            return None
+        cache_file = self._listing_cache_file(kind=kind, bucket=bucket, prefix=prefix)
+        try:
+            with open(cache_file, "r") as fp:
+                cached = json.load(fp)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Failed to read listing cache {cache_file} - {e}")
+            return None
+        if 0 < self.listing_cache_ttl < time.time() - cached.get("created", 0):
+            logger.info(f"Cached listing of {bucket}/{prefix} expired")
+            return None
+        logger.info(f"Using cached listing of {bucket}/{prefix}")
+        return cached.get("listing", None)
+
+    def _write_listing_cache(self, kind: str, bucket: str, prefix: str, listing: list[Any]) -> None:
+        """
+        Save listing to the cache
+        :param kind: listing kind (files or folders)
+        :param bucket: bucket name
+        :param prefix: prefix
+        :param listing: listing to cache
+        :return: None
+        """
+        if self.listing_cache is None:
+            return
+        cache_file = self._listing_cache_file(kind=kind, bucket=bucket, prefix=prefix)
+        try:
+            os.makedirs(self.listing_cache, exist_ok=True)
+            # write to a temporary file and rename, so that concurrent readers never see partial cache
+            tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+            with open(tmp_file, "w") as fp:
+                json.dump({"key": f"{bucket}/{prefix}", "created": time.time(), "listing": listing}, fp)
+            os.replace(tmp_file, cache_file)
+        except Exception as e:
+            logger.warning(f"Failed to write listing cache {cache_file} - {e}")
 
     def read_file(self, key: str) -> tuple[bytes, int]:
         """
@@ -127,9 +303,9 @@ class ArrowS3:
         retries = 0
         for n in range(self.retries):
             try:
-                obj = self.s3_client.get_object(Bucket=bucket, Key=prefix)
-                retries += obj.get("ResponseMetadata", {}).get("RetryAttempts", 0)
-                return obj["Body"].read(), retries
+                data, r = self._read_object(bucket=bucket, key=prefix)
+                retries += r
+                return data, retries
             except Exception as e:
                 logger.error(f"failed to read file {key}, exception {e}, attempt {n}")
                 retries += self.s3_max_attempts
@@ -149,8 +325,12 @@ class ArrowS3:
         retries = 0
         for n in range(self.retries):
             try:
-                res = self.s3_client.put_object(Bucket=bucket, Key=prefix, Body=data)
-                retries += res.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+                if len(data) > self.part_size:
+                    res, r = self._multipart_upload(bucket=bucket, key=prefix, data=data)
+                else:
+                    res = self.s3_client.put_object(Bucket=bucket, Key=prefix, Body=data)
+                    r = res.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+                retries += r
                 return res, retries
             except Exception as e:
                 logger.error(f"Failed to upload file to to key {key}, exception {e}")
@@ -158,18 +338,118 @@ class ArrowS3:
         logger.error(f"Failed to upload file {key}, skipping it")
         return None, retries
 
-    def read_table(self, key: str, schema: pa.schema = None) -> tuple[pa.Table, int]:
+    def _read_object(self, bucket: str, key: str) -> tuple[bytes, int]:
+        """
+        Read an object. The first part is always read using a ranged GET. If the object is larger than
+        the part size, the rest of the object is read using concurrent ranged GETs
+        :param bucket: bucket name
+        :param key: object key
+        :return: byte array of the object content and a number of retries
+        """
+        if self.max_concurrency == 1:
+            obj = self.s3_client.get_object(Bucket=bucket, Key=key)
+            return obj["Body"].read(), obj.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        try:
+            obj = self.s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes=0-{self.part_size - 1}")
+        except self.s3_client.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code", "") != "InvalidRange":
+                raise e
+            # ranged read of the empty object fails, read it as a whole
+            obj = self.s3_client.get_object(Bucket=bucket, Key=key)
+            return obj["Body"].read(), obj.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        retries = obj.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        first = obj["Body"].read()
+        # content range is returned as "bytes start-end/size"
+        content_range = obj.get("ContentRange", None)
+        if content_range is None:
+            return first, retries
+        size = int(content_range.split("/")[-1])
+        if size <= len(first):
+            return first, retries
+
+        def _read_range(start: int) -> tuple[bytes, int]:
+            end = min(start + self.part_size, size) - 1
+            part = self.s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes={start}-{end}")
+            return part["Body"].read(), part.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+
+        # read the rest of the object concurrently
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            results = list(executor.map(_read_range, range(len(first), size, self.part_size)))
+        parts = [first]
+        for part, r in results:
+            parts.append(part)
+            retries += r
+        return b"".join(parts), retries
+
+    def _multipart_upload(self, bucket: str, key: str, data: bytes) -> tuple[dict[str, Any], int]:
+        """
+        Save an object using multipart upload with the parts uploaded concurrently
+        :param bucket: bucket name
+        :param key: object key
+        :param data: byte array of the object content
+        :return: dictionary as
+        defined https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/s3/client/complete_multipart_upload.html
+        and the number of retries
+        """
+        # make sure that we do not exceed the max number of parts
+        part_size = max(self.part_size, math.ceil(len(data) / MAX_PARTS))
+        upload = self.s3_client.create_multipart_upload(Bucket=bucket, Key=key)
+        upload_id = upload["UploadId"]
+        retries = upload.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        view = memoryview(data)
+
+        def _upload_part(part_number: int) -> tuple[dict[str, Any], int]:
+            start = (part_number - 1) * part_size
+            res = self.s3_client.upload_part(
+                Bucket=bucket,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=view[start : start + part_size].tobytes(),
+            )
+            return {"ETag": res["ETag"], "PartNumber": part_number}, res.get("ResponseMetadata", {}).get(
+                "RetryAttempts", 0
+            )
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                results = list(executor.map(_upload_part, range(1, math.ceil(len(data) / part_size) + 1)))
+            parts = []
+            for part, r in results:
+                parts.append(part)
+                retries += r
+            res = self.s3_client.complete_multipart_upload(
+                Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+            )
+        except Exception as e:
+            # do not leave incomplete uploads behind
+            try:
+                self.s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+            except Exception as ae:
+                logger.warning(f"failed to abort multipart upload for {bucket}/{key}, exception {ae}")
+            raise e
+        retries += res.get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        return res, retries
+
+    def read_table(
+        self, key: str, schema: pa.schema = None, columns: list[str] = None, filters: Any = None
+    ) -> tuple[pa.Table, int]:
         """
         Get an arrow table from a file with a given name
         :param key: complete path
         :param schema: Schema used for reading table, default None
+        :param columns: list of columns to read, default None - all columns
+        :param filters: row filter, see TransformUtils.convert_binary_to_arrow, default None
         :return: table or None if the read failed and the number of retries
         """
         # Read file as bytes
         data, retries = self.read_file(key)
         if data is None:
             return None, retries
-        return TransformUtils.convert_binary_to_arrow(data=data, schema=schema), retries
+        return (
+            TransformUtils.convert_binary_to_arrow(data=data, schema=schema, columns=columns, filters=filters),
+            retries,
+        )
 
     def save_table(self, key: str, table: pa.Table) -> tuple[int, dict[str, Any], int]:
         """
@@ -11,7 +11,8 @@
 ################################################################################
 
 import random
-from typing import Any
+import uuid
+from typing import Any, Iterator
 
 import pyarrow as pa
 from data_processing.utils import KB, MB, GB, TransformUtils, get_logger
@@ -22,13 +23,14 @@ class DataAccess:
     Base class for data access (interface), defining all the methods
     """
     def __init__(
-            self,
-            d_sets: list[str],
-            checkpoint: bool,
-            m_files: int,
-            n_samples: int,
-            files_to_use: list[str],
-            files_to_checkpoint: list[str],
+        self,
+        d_sets: list[str],
+        checkpoint: bool,
+        m_files: int,
+        n_samples: int,
+        files_to_use: list[str],
+        files_to_checkpoint: list[str],
+        checkpoint_manifest: bool = False,
     ):
         """
         Create data access class for folder based configuration
@@ -38,6 +40,8 @@ class DataAccess:
         :param n_samples: amount of files to randomly sample
         :param files_to_use: files extensions of files to include
         :param files_to_checkpoint: files extensions of files to use for checkpointing
+        :param checkpoint_manifest: flag to persist names of the completed files in the output folder and
+                                    use them, instead of the output folder listing, for checkpointing
         """
         self.d_sets = d_sets
         self.checkpoint = checkpoint
@@ -45,6 +49,12 @@ class DataAccess:
         self.n_samples = n_samples
         self.files_to_use = files_to_use
         self.files_to_checkpoint = files_to_checkpoint
+        self.checkpoint_manifest = checkpoint_manifest
+        # completed files, that are not yet saved to the manifest
+        self.completed_files = []
+        self.manifest_flush_size = 100
+        # sizes of the files, returned by the last get_files_to_process
+        self.file_sizes = {}
         self.logger = get_logger(__name__)
 
     def get_output_folder(self) -> str:
@@ -97,12 +107,174 @@ class DataAccess:
         if self.get_output_folder() is None:
             self.logger.warning("Input/Output are not defined, returning empty list")
             return [], {}, 0
+        self.file_sizes = {}
         path_list, path_profile, retries = self._get_files_to_process_internal()
         if self.n_samples > 0:
             files = self.get_random_file_set(n_samples=self.n_samples, files=path_list)
             return files, path_profile, retries
         return path_list, path_profile, retries
 
+    def get_file_sizes(self) -> dict[str, int]:
+        """
+        Get sizes of the files returned by the last invocation of get_files_to_process. Can be used
+        for the size based scheduling of the files processing
+        :return: dictionary of file name to the file size (bytes)
+        """
+        return self.file_sizes
+
+    def get_listing_shards(self) -> tuple[list[tuple[str, bool]], int]:
+        """
+        Split input into shards, that can be listed independently and in parallel, see get_shard_files_to_process.
+        Shards are the input folder itself (only the files directly in it) and all its sub folders (recursively)
+        or, if data sets are used, folders of the data sets
+        :return: list of shards - tuples of a folder and a flag to list it recursively and number of retries
+        """
+        if self.get_output_folder() is None:
+            self.logger.warning("Input/Output are not defined, returning empty list")
+            return [], 0
+        if self.d_sets is not None:
+            folders, retries = self._get_folders_to_use()
+            return [(folder, True) for folder in folders], retries
+        input_folder = self.get_input_folder()
+        _, folders, retries = self._list_folder(path=input_folder)
+        return [(input_folder, False)] + [(folder, True) for folder in folders], retries
+
+    def get_checkpoint_manifest(self) -> tuple[set[str], int]:
+        """
+        Get the input files completed according to the checkpoint manifest. Used to read the manifest once
+        and pass it to get_shard_files_to_process of all the shards
+        :return: a set of completed input file names without extensions (empty if checkpoint manifest
+                 is not used or is empty) and number of retries
+        """
+        if not self.checkpoint or not self.checkpoint_manifest:
+            return set(), 0
+        completed, retries = self._read_checkpoint_manifest()
+        return self._add_completed_parts(completed), retries
+
+    def get_shard_files_to_process(
+        self, shard: str, recursive: bool = True, manifest: set[str] = None
+    ) -> tuple[list[str], dict[str, int], int]:
+        """
+        Get files to process of a single shard (see get_listing_shards). If checkpointing is enabled, files are
+        filtered using the checkpoint manifest or the listing of the corresponding output folder only. Max files
+        and random samples are not supported, as they require listing of all the input
+        :param shard: shard folder
+        :param recursive: flag to include files of the shard sub folders
+        :param manifest: completed files from the checkpoint manifest (see get_checkpoint_manifest), read once
+                         for all the shards. If None, the manifest (if used) is read by this shard
+        :return: list of files, dictionary of file name to the file size (bytes) and number of retries
+        """
+        if recursive:
+            files, retries = self._list_files_folder(path=shard)
+        else:
+            files, _, retries = self._list_folder(path=shard)
+        completed = None
+        if self.checkpoint:
+            completed, r = self._get_completed_files(
+                output_path=self.get_output_location(shard), recursive=recursive, manifest=manifest
+            )
+            retries += r
+        sizes = {}
+        for file in files:
+            name_extension = TransformUtils.get_file_extension(file["name"])
+            if self.files_to_use is not None and name_extension[1] not in self.files_to_use:
+                continue
+            if completed is not None and name_extension[0] in completed:
+                continue
+            sizes[file["name"]] = file["size"]
+        return list(sizes.keys()), sizes, retries
+
+    def iterate_files_to_process(self, page_size: int = 0) -> Iterator[tuple[list[str], int]]:
+        """
+        Lazily enumerate files to process. Unlike get_files_to_process, files are returned in pages while
+        the listing continues and neither file sizes nor ordering are computed, unless they are required,
+        i.e. the complete listing is used for random sampling and an ordered one for max files
+        :param page_size: maximum amount of files in a page, 0 - use pages returned by the underlying listing
+        :return: iterator of tuples of a list of files and the number of operation retries
+        """
+        if self.get_output_folder() is None:
+            self.logger.warning("Input/Output are not defined, returning empty list")
+            return
+        if self.n_samples > 0:
+            # sampling requires complete list of files
+            files, _, retries = self.get_files_to_process()
+            yield from self._paginate(pages=iter([(files, retries)]), page_size=page_size)
+            return
+        yield from self._paginate(pages=self._iterate_files_to_process_internal(), page_size=page_size)
+
+    @staticmethod
+    def _paginate(pages: Iterator[tuple[list[str], int]], page_size: int) -> Iterator[tuple[list[str], int]]:
+        """
+        Re paginate lists of files, skipping empty pages
+        :param pages: iterator of tuples of a list of files and the number of retries
+        :param page_size: maximum size of the page, 0 - keep the original pages
+        :return: iterator of tuples of a list of files and the number of retries
+        """
+        buffer = []
+        retries = 0
+        for files, r in pages:
+            retries += r
+            if page_size <= 0:
+                if len(files) > 0 or retries > 0:
+                    yield files, retries
+                    retries = 0
+                continue
+            buffer.extend(files)
+            while len(buffer) >= page_size:
+                yield buffer[:page_size], retries
+                buffer = buffer[page_size:]
+                retries = 0
+        if len(buffer) > 0 or retries > 0:
+            yield buffer, retries
+
+    def _iterate_files_to_process_internal(self) -> Iterator[tuple[list[str], int]]:
+        """
+        Lazily enumerate files to process, applying data sets, checkpointing and max files
+        :return: iterator of tuples of a list of files and the number of retries
+        """
+        if self.d_sets is not None:
+            # get folders for the input
+            folders_to_use, retries = self._get_folders_to_use()
+            if retries > 0:
+                yield [], retries
+            locations = [(folder, self.get_output_location(folder)) for folder in folders_to_use]
+        else:
+            locations = [(self.get_input_folder(), self.get_output_folder())]
+        remaining = self.m_files
+        for input_path, output_path in locations:
+            for files, retries in self._iterate_input_files(input_path=input_path, output_path=output_path):
+                if self.m_files > 0:
+                    files = files[:remaining]
+                    remaining -= len(files)
+                yield files, retries
+                if self.m_files > 0 and remaining <= 0:
+                    return
+
+    def _iterate_input_files(self, input_path: str, output_path: str) -> Iterator[tuple[list[str], int]]:
+        """
+        Lazily enumerate files from input path, that do not exist in the output path
+        :param input_path: input path
+        :param output_path: output path
+        :return: iterator of tuples of a list of files and the number of retries
+        """
+        completed = None
+        retries = 0
+        if self.checkpoint:
+            completed, retries = self._get_completed_files(output_path=output_path)
+        # ordering is only required to get the same first files as get_files_to_process
+        for files, r in self._iterate_files_folder(path=input_path, ordered=self.m_files > 0):
+            page = []
+            for file in files:
+                f_name = file["name"]
+                name_extension = TransformUtils.get_file_extension(f_name)
+                if self.files_to_use is not None and name_extension[1] not in self.files_to_use:
+                    continue
+                if completed is not None and name_extension[0] in completed:
+                    continue
+                page.append(f_name)
+            yield page, retries + r
+            retries = 0
+
     def _get_files_to_process_internal(self) -> tuple[list[str], dict[str, float], int]:
         """
         Get files to process
@@ -235,16 +407,10 @@ class DataAccess:
                 max_file_size=max_file_size,
             )
             files = [fs["name"] for fs in file_sizes]
+            self.file_sizes |= {fs["name"]: fs["size"] for fs in file_sizes}
             return files, profile, retries
 
-        pout_list, _, retries1 = self._get_files_folder(
-            path=output_path, files_to_use=self.files_to_checkpoint, cm_files=-1
-        )
-        output_base_names_ext = [file["name"].replace(self.get_output_folder(), self.get_input_folder())
-                                 for file in pout_list]
-        # In the case of binary transforms, an extension can be different, so just use the file names.
-        # Also remove duplicates
-        output_base_names = list(set([TransformUtils.get_file_extension(file)[0] for file in output_base_names_ext]))
+        output_base_names, retries1 = self._get_completed_files(output_path=output_path)
         p_list = []
         total_input_file_size = 0
         i = 0
@@ -263,6 +429,7 @@ class DataAccess:
             if name_extension[0] not in output_base_names:
                 p_list.append(f_name)
                 size = file["size"]
+                self.file_sizes[f_name] = size
                 total_input_file_size += size
                 if min_file_size > size:
                     min_file_size = size
@@ -279,6 +446,125 @@ class DataAccess:
             retries,
         )
 
+    def _get_completed_files(
+        self, output_path: str, recursive: bool = True, manifest: set[str] = None
+    ) -> tuple[set[str], int]:
+        """
+        Get names (without extensions) of the input files, that were already processed. If checkpoint manifest
+        is enabled and exists, it is used, otherwise the names are built from the listing of the output path
+        :param output_path: output path
+        :param recursive: flag to include files of the output path sub folders
+        :param manifest: completed files from the checkpoint manifest, if it was already read
+        :return: a set of input file names without extensions and number of retries
+        """
+        if self.checkpoint_manifest:
+            retries = 0
+            if manifest is None:
+                manifest, retries = self.get_checkpoint_manifest()
+            if len(manifest) > 0:
+                self.logger.info(f"Using checkpoint manifest with {len(manifest)} completed files")
+                return manifest, retries
+            self.logger.info("Checkpoint manifest is empty, using output folder listing")
+        if recursive:
+            pout_list, _, retries = self._get_files_folder(
+                path=output_path, files_to_use=self.files_to_checkpoint, cm_files=-1
+            )
+        else:
+            files, _, retries = self._list_folder(path=output_path)
+            pout_list = [
+                file
+                for file in files
+                if self.files_to_checkpoint is None
+                or TransformUtils.get_file_extension(file["name"])[1] in self.files_to_checkpoint
+            ]
+        # In the case of binary transforms, an extension can be different, so just use the file names.
+        # Using set here both removes duplicates and makes lookups constant time
+        output_folder = self.get_output_folder()
+        input_folder = self.get_input_folder()
+        return (
+            self._add_completed_parts(
+                {
+                    TransformUtils.get_file_extension(file["name"].replace(output_folder, input_folder))[0]
+                    for file in pout_list
+                }
+            ),
+            retries,
+        )
+
+    @staticmethod
+    def _add_completed_parts(completed: set[str]) -> set[str]:
+        """
+        Add the files, that were split into parts (see TransformUtils.get_file_part_name), to the completed
+        ones, if all their parts are completed. Files with missing parts are processed again completely,
+        overwriting the outputs of their parts
+        :param completed: set of completed names without extensions
+        :return: the same set with the completed split files added
+        """
+        parts = {}
+        for name in completed:
+            file_part = TransformUtils.get_file_part(name)
+            if file_part is not None:
+                parts.setdefault((file_part[0], file_part[2]), set()).add(file_part[1])
+        for (name, n_parts), done in parts.items():
+            if len(done) == n_parts:
+                completed.add(name)
+        return completed
+
+    def get_checkpoint_manifest_folder(self) -> str:
+        """
+        Get location of the checkpoint manifest
+        :return: checkpoint manifest folder
+        """
+        output_folder = self.get_output_folder()
+        if not output_folder.endswith("/"):
+            output_folder += "/"
+        return f"{output_folder}checkpoint/"
+
+    def _read_checkpoint_manifest(self) -> tuple[set[str], int]:
+        """
+        Read checkpoint manifest
+        :return: a set of input file names without extensions and number of retries
+        """
+        parts, retries = self.get_folder_files(path=self.get_checkpoint_manifest_folder(), extensions=[".manifest"])
+        completed = set()
+        for name, data in parts.items():
+            if data is None:
+                self.logger.warning(f"Failed to read checkpoint manifest part {name}")
+                continue
+            completed.update(line for line in data.decode("utf-8").splitlines() if line != "")
+        return completed, retries
+
+    def add_completed_file(self, path: str) -> int:
+        """
+        Record input file as completed in the checkpoint manifest. Completed files are buffered locally
+        and saved to the manifest in batches
+        :param path: input file path
+        :return: number of operation retries
+        """
+        if not self.checkpoint_manifest:
+            return 0
+        self.completed_files.append(TransformUtils.get_file_extension(path)[0])
+        if len(self.completed_files) >= self.manifest_flush_size:
+            return self.flush_completed_files()
+        return 0
+
+    def flush_completed_files(self) -> int:
+        """
+        Save locally buffered completed files to the checkpoint manifest. Every invocation writes a new,
+        uniquely named part of the manifest, so that multiple workers can update it concurrently
+        :return: number of operation retries
+        """
+        if len(self.completed_files) == 0 or self.get_output_folder() is None:
+            return 0
+        path = f"{self.get_checkpoint_manifest_folder()}{uuid.uuid4()}.manifest"
+        res, retries = self.save_file(path=path, data="\n".join(self.completed_files).encode("utf-8"))
+        if res is None:
+            # keep the buffer, we will retry on the next flush
+            self.logger.warning(f"Failed to save checkpoint manifest {path}")
+        else:
+            self.completed_files = []
+        return retries
+
     def _list_files_folder(self, path: str) -> tuple[list[dict[str, Any]], int]:
         """
         Get files for a given folder and all sub folders
@@ -287,10 +573,30 @@ class DataAccess:
         """
         raise NotImplementedError("Subclasses should implement this!")
 
-    def get_table(self, path: str) -> tuple[pa.table, int]:
+    def _list_folder(self, path: str) -> tuple[list[dict[str, Any]], list[str], int]:
+        """
+        Get files and sub folders of a given folder, without going through the sub folders
+        :param path: path
+        :return: list of files, list of sub folders and number of retries
+        """
+        raise NotImplementedError("Subclasses should implement this!")
+
+    def _iterate_files_folder(self, path: str, ordered: bool = False) -> Iterator[tuple[list[dict[str, Any]], int]]:
+        """
+        Lazily get files for a given folder and all sub folders. Sub classes should override this
+        to return files while listing continues. Size of the file is not guaranteed to be returned
+        :param path: path
+        :param ordered: flag to return files in the same order as _list_files_folder
+        :return: iterator of tuples of a list of files and the number of retries
+        """
+        yield self._list_files_folder(path=path)
+
+    def get_table(self, path: str, columns: list[str] = None, filters: Any = None) -> tuple[pa.table, int]:
         """
         Get pyArrow table for a given path
         :param path - file path
+        :param columns - optional list of columns to read, default None - all columns
+        :param filters - optional row filter, see TransformUtils.convert_binary_to_arrow, default None
         :return: pyArrow table or None, if the table read failed and number of operation retries.
                  Retries are performed on operation failures and are typically due to the resource overload.
         """
@@ -306,6 +612,18 @@ class DataAccess:
         """
         raise NotImplementedError("Subclasses should implement this!")
 
+    def get_file_buffer(self, path: str) -> tuple[pa.Buffer, int]:
+        """
+        Get file content as a pyarrow buffer. Implementations should override this to return a zero-copy
+        (e.g. memory mapped) buffer. The default implementation wraps content returned by get_file
+        :param path: file path
+        :return: file content as a buffer or None and number of retries
+        """
+        data, retries = self.get_file(path=path)
+        if data is None:
+            return None, retries
+        return pa.py_buffer(data), retries
+
     def get_folder_files(
         self, path: str, extensions: list[str] = None, return_data: bool = True
     ) -> tuple[dict[str, bytes], int]:
@@ -20,7 +20,7 @@ from data_processing.data_access import (
     DataAccessLocal,
     DataAccessS3,
 )
-from data_processing.utils import ParamsUtils, str2bool
+from data_processing.utils import MB, ParamsUtils, str2bool
 
 
 class DataAccessFactory(DataAccessFactoryBase):
@@ -72,6 +72,37 @@ class DataAccessFactory(DataAccessFactoryBase):
             help="AST string of options for s3 credentials. Only required for S3 data access.\n"
             + ParamsUtils.get_ast_help_text(help_example_dict),
         )
+        parser.add_argument(
+            f"--{self.cli_arg_prefix}s3_part_size",
+            type=int,
+            default=64,
+            help="part size (MB) for parallel ranged reads and multipart uploads of large S3 files. Minimum 5",
+        )
+        parser.add_argument(
+            f"--{self.cli_arg_prefix}s3_max_concurrency",
+            type=int,
+            default=4,
+            help="max number of parts of a single S3 file read or written concurrently",
+        )
+        parser.add_argument(
+            f"--{self.cli_arg_prefix}s3_listing_concurrency",
+            type=int,
+            default=1,
+            help="max number of S3 prefixes (sub folders) listed concurrently. Default 1 - flat listing",
+        )
+        parser.add_argument(
+            f"--{self.cli_arg_prefix}s3_listing_cache",
+            type=str,
+            default=None,
+            help="local folder to cache S3 input folder listings in, so that repeated runs skip listing. "
+            "Default - no cache",
+        )
+        parser.add_argument(
+            f"--{self.cli_arg_prefix}s3_listing_cache_ttl",
+            type=int,
+            default=3600,
+            help="time (sec) for which cached S3 listing is valid, 0 - forever",
+        )
 
         if self.enable_data_navigation:
             self.__add_data_navigation_params(parser)
@@ -113,6 +144,13 @@ class DataAccessFactory(DataAccessFactoryBase):
             default=False,
             help="checkpointing flag",
         )
+        parser.add_argument(
+            f"--{self.cli_arg_prefix}checkpoint_manifest",
+            type=lambda x: bool(str2bool(x)),
+            default=False,
+            help="flag to persist completed files in the output folder and use them for checkpointing "
+            "instead of listing the output folder",
+        )
         # In the case of binary files, the resulting extension can be different from the source extension
         # The checkpointing extension is defined here. If multiple files (extensions) are produced from the
         # source files, only the leading one is required here
@@ -155,11 +193,17 @@ class DataAccessFactory(DataAccessFactoryBase):
         s3_config = arg_dict.get(f"{self.cli_arg_prefix}s3_config", None)
         local_config = arg_dict.get(f"{self.cli_arg_prefix}local_config", None)
         checkpointing = arg_dict.get(f"{self.cli_arg_prefix}checkpointing", False)
+        checkpoint_manifest = arg_dict.get(f"{self.cli_arg_prefix}checkpoint_manifest", False)
         max_files = arg_dict.get(f"{self.cli_arg_prefix}max_files", -1)
         data_sets = arg_dict.get(f"{self.cli_arg_prefix}data_sets", None)
         n_samples = arg_dict.get(f"{self.cli_arg_prefix}num_samples", -1)
         files_to_use = arg_dict.get(f"{self.cli_arg_prefix}files_to_use", [".parquet"])
         files_to_checkpoint = arg_dict.get(f"{self.cli_arg_prefix}files_to_checkpoint", [".parquet"])
+        s3_part_size = arg_dict.get(f"{self.cli_arg_prefix}s3_part_size", 64)
+        s3_max_concurrency = arg_dict.get(f"{self.cli_arg_prefix}s3_max_concurrency", 4)
+        s3_listing_concurrency = arg_dict.get(f"{self.cli_arg_prefix}s3_listing_concurrency", 1)
+        s3_listing_cache = arg_dict.get(f"{self.cli_arg_prefix}s3_listing_cache", None)
+        s3_listing_cache_ttl = arg_dict.get(f"{self.cli_arg_prefix}s3_listing_cache_ttl", 3600)
         # check which configuration (S3 or Local) is specified
         s3_config_specified = 1 if s3_config is not None else 0
         local_config_specified = 1 if local_config is not None else 0
@@ -207,6 +251,20 @@ class DataAccessFactory(DataAccessFactoryBase):
                 f"data factory {self.cli_arg_prefix} " f"is using local configuration without input/output path"
             )
 
+        # validate S3 parallel IO parameters
+        if s3_part_size < 5 or s3_max_concurrency < 1 or s3_listing_concurrency < 1:
+            self.logger.error(
+                f"data factory {self.cli_arg_prefix} "
+                f"S3 part size {s3_part_size} MB has to be at least 5 MB, max concurrency "
+                f"{s3_max_concurrency} and listing concurrency {s3_listing_concurrency} at least 1"
+            )
+            return False
+        self.s3_part_size = s3_part_size
+        self.s3_max_concurrency = s3_max_concurrency
+        self.s3_listing_concurrency = s3_listing_concurrency
+        self.s3_listing_cache = s3_listing_cache
+        self.s3_listing_cache_ttl = s3_listing_cache_ttl
+
         # Check whether both max_files and number samples are defined
         self.logger.info(f"data factory {self.cli_arg_prefix} max_files {max_files}, n_sample {n_samples}")
         if max_files > 0 and n_samples > 0:
@@ -216,6 +274,7 @@ class DataAccessFactory(DataAccessFactoryBase):
             )
             return False
         self.checkpointing = checkpointing
+        self.checkpoint_manifest = checkpoint_manifest
         self.max_files = max_files
         self.n_samples = n_samples
         self.files_to_use = files_to_use
@@ -251,6 +310,12 @@ class DataAccessFactory(DataAccessFactoryBase):
                 n_samples=self.n_samples,
                 files_to_use=self.files_to_use,
                 files_to_checkpoint=self.files_to_checkpoint,
+                checkpoint_manifest=self.checkpoint_manifest,
+                part_size=self.s3_part_size * MB,
+                max_concurrency=self.s3_max_concurrency,
+                listing_concurrency=self.s3_listing_concurrency,
+                listing_cache=self.s3_listing_cache,
+                listing_cache_ttl=self.s3_listing_cache_ttl,
             )
         else:
             # anything else is local data
@@ -262,4 +327,5 @@ class DataAccessFactory(DataAccessFactoryBase):
                 n_samples=self.n_samples,
                 files_to_use=self.files_to_use,
                 files_to_checkpoint=self.files_to_checkpoint,
+                checkpoint_manifest=self.checkpoint_manifest,
             )
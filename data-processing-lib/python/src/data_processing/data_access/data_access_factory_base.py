@@ -39,6 +39,12 @@ class DataAccessFactoryBase(CLIArgumentProvider):
         self.n_samples = -1
         self.files_to_use = []
         self.files_to_checkpoint = []
+        self.checkpoint_manifest = False
+        self.s3_part_size = 64
+        self.s3_max_concurrency = 4
+        self.s3_listing_concurrency = 1
+        self.s3_listing_cache = None
+        self.s3_listing_cache_ttl = 3600
         self.cli_arg_prefix = cli_arg_prefix
         self.params = {}
         self.logger = get_logger(__name__ + str(uuid.uuid4()))
@@ -71,6 +77,7 @@ class DataAccessFactoryBase(CLIArgumentProvider):
         """
         params = {
             "checkpointing": self.checkpointing,
+            "checkpoint_manifest": self.checkpoint_manifest,
             "max_files": self.max_files,
             "random_samples": self.n_samples,
             "files_to_use": self.files_to_use,
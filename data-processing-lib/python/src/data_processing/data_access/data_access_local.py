@@ -14,7 +14,7 @@ import gzip
 import json
 import os
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 import pyarrow as pa
 import pyarrow.parquet as pq
@@ -39,6 +39,7 @@ class DataAccessLocal(DataAccess):
         n_samples: int = -1,
         files_to_use: list[str] = [".parquet"],
         files_to_checkpoint: list[str] = [".parquet"],
+        checkpoint_manifest: bool = False,
     ):
         """
         Create data access class for folder based configuration
@@ -49,9 +50,17 @@ class DataAccessLocal(DataAccess):
         :param n_samples: amount of files to randomly sample
         :param files_to_use: files extensions of files to include
         :param files_to_checkpoint: files extensions of files to use for checkpointing
+        :param checkpoint_manifest: flag to use persisted manifest of the completed files for checkpointing
         """
-        super().__init__(d_sets=d_sets, checkpoint=checkpoint, m_files=m_files, n_samples=n_samples,
-                         files_to_use=files_to_use, files_to_checkpoint=files_to_checkpoint)
+        super().__init__(
+            d_sets=d_sets,
+            checkpoint=checkpoint,
+            m_files=m_files,
+            n_samples=n_samples,
+            files_to_use=files_to_use,
+            files_to_checkpoint=files_to_checkpoint,
+            checkpoint_manifest=checkpoint_manifest,
+        )
         if local_config is None:
             self.input_folder = None
             self.output_folder = None
@@ -67,6 +76,7 @@ class DataAccessLocal(DataAccess):
         logger.debug(f"Local n_samples: {self.n_samples}")
         logger.debug(f"Local files_to_use: {self.files_to_use}")
         logger.debug(f"Local files_to_checkpoint: {self.files_to_checkpoint}")
+        logger.debug(f"Local checkpoint_manifest: {self.checkpoint_manifest}")
 
     def get_output_folder(self) -> str:
         """
@@ -88,14 +98,55 @@ class DataAccessLocal(DataAccess):
         :param path: path
         :return: List of files
         """
-        files = sorted(Path(path).rglob("*"))
         res = []
-        for file in files:
-            if file.is_dir():
+        folders = [path]
+        while len(folders) > 0:
+            folder = folders.pop()
+            if not os.path.isdir(folder):
                 continue
-            res.append({"name": str(file), "size": file.stat().st_size})
+            # directory entries cache the file type, so only the files are stat'ed
+            for entry in os.scandir(folder):
+                if entry.is_dir():
+                    # as rglob, do not follow the links to directories
+                    if not entry.is_symlink():
+                        folders.append(entry.path)
+                else:
+                    res.append({"name": entry.path, "size": entry.stat().st_size})
+        # same order as sorting the paths
+        res.sort(key=lambda file: file["name"].split(os.sep))
         return res, 0
 
+    def _list_folder(self, path: str) -> tuple[list[dict[str, Any]], list[str], int]:
+        """
+        Get files and sub folders of a given folder, without going through the sub folders
+        :param path: path
+        :return: list of files, list of sub folders and number of retries
+        """
+        files = []
+        folders = []
+        if not os.path.isdir(path):
+            return files, folders, 0
+        for entry in sorted(os.scandir(path), key=lambda e: e.name):
+            if entry.is_dir():
+                folders.append(entry.path)
+            else:
+                files.append({"name": entry.path, "size": entry.stat().st_size})
+        return files, folders, 0
+
+    def _iterate_files_folder(self, path: str, ordered: bool = False) -> Iterator[tuple[list[dict[str, Any]], int]]:
+        """
+        Lazily get files for a given folder and all sub folders, one directory at a time.
+        Unless ordering is required, files are neither sorted nor stat'ed, so their size is not returned
+        :param path: path
+        :param ordered: flag to return files in the same order as _list_files_folder
+        :return: iterator of tuples of a list of files and the number of retries
+        """
+        if ordered:
+            yield self._list_files_folder(path=path)
+            return
+        for root, _, files in os.walk(path):
+            yield [{"name": os.path.join(root, file)} for file in files], 0
+
     def _get_folders_to_use(self) -> tuple[list[str], int]:
         """
         convert data sets to a list of folders to use
@@ -112,19 +163,22 @@ class DataAccessLocal(DataAccess):
                         break
         return folders_to_use, 0
 
-    def get_table(self, path: str) -> tuple[pa.table, int]:
+    def get_table(self, path: str, columns: list[str] = None, filters: Any = None) -> tuple[pa.table, int]:
         """
         Attempts to read a PyArrow table from the given path.
 
         Args:
             path (str): Path to the file containing the table.
+            columns (list[str]): Optional list of columns to read, default None - all columns.
+            filters: Optional row filter, see TransformUtils.convert_binary_to_arrow, default None.
 
         Returns:
             pyarrow.Table: PyArrow table if read successfully, None otherwise.
         """
 
         try:
-            table = pq.read_table(path)
+            # memory mapping avoids copying file content before parsing it
+            table = pq.read_table(path, memory_map=True, columns=columns, filters=filters)
             return table, 0
         except (FileNotFoundError, IOError, pa.ArrowException) as e:
             logger.error(f"Error reading table from {path}: {e}")
@@ -213,6 +267,28 @@ class DataAccessLocal(DataAccess):
             logger.error(f"Error reading file {path}: {e}")
             raise e
 
+    def get_file_buffer(self, path: str) -> tuple[pa.Buffer, int]:
+        """
+        Gets the contents of a file as a zero-copy, memory mapped buffer. Compressed (gz) files
+        are decompressed into memory.
+
+        Args:
+            path (str): The path to the file.
+
+        Returns:
+            pyarrow.Buffer: The contents of the file, or None if an error occurs.
+        """
+        if path.endswith(".gz"):
+            return super().get_file_buffer(path=path)
+        try:
+            with pa.memory_map(path, "r") as f:
+                # buffer keeps the mapping alive after the file is closed
+                data = f.read_buffer()
+            return data, 0
+        except (FileNotFoundError, IOError) as e:
+            logger.error(f"Error reading file {path}: {e}")
+            raise e
+
     def save_file(self, path: str, data: bytes) -> tuple[dict[str, Any], int]:
         """
         Saves bytes to a file and returns a dictionary with file information.
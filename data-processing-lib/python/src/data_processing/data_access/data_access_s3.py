@@ -12,11 +12,11 @@
 
 import gzip
 import json
-from typing import Any
+from typing import Any, Iterator
 
 import pyarrow
 from data_processing.data_access import ArrowS3, DataAccess
-from data_processing.utils import TransformUtils
+from data_processing.utils import MB, TransformUtils
 
 
 class DataAccessS3(DataAccess):
@@ -34,6 +34,12 @@ class DataAccessS3(DataAccess):
         n_samples: int = -1,
         files_to_use: list[str] = [".parquet"],
         files_to_checkpoint: list[str] = [".parquet"],
+        checkpoint_manifest: bool = False,
+        part_size: int = 64 * MB,
+        max_concurrency: int = 4,
+        listing_concurrency: int = 1,
+        listing_cache: str = None,
+        listing_cache_ttl: int = 3600,
     ):
         """
         Create data access class for folder based configuration
@@ -45,9 +51,22 @@ class DataAccessS3(DataAccess):
         :param n_samples: amount of files to randomly sample
         :param files_to_use: files extensions of files to include
         :param files_to_checkpoint: files extensions of files to use for checkpointing
+        :param checkpoint_manifest: flag to use persisted manifest of the completed files for checkpointing
+        :param part_size: part size for ranged reads and multipart uploads of the large files
+        :param max_concurrency: max number of parts read/written concurrently
+        :param listing_concurrency: max number of prefixes listed concurrently, 1 - flat listing
+        :param listing_cache: optional local folder for caching of the input folder listings
+        :param listing_cache_ttl: time (sec) for which cached listing is valid, 0 - forever
         """
-        super().__init__(d_sets=d_sets, checkpoint=checkpoint, m_files=m_files, n_samples=n_samples,
-                         files_to_use=files_to_use, files_to_checkpoint=files_to_checkpoint)
+        super().__init__(
+            d_sets=d_sets,
+            checkpoint=checkpoint,
+            m_files=m_files,
+            n_samples=n_samples,
+            files_to_use=files_to_use,
+            files_to_checkpoint=files_to_checkpoint,
+            checkpoint_manifest=checkpoint_manifest,
+        )
         if (
             s3_credentials is None
             or s3_credentials.get("access_key", None) is None
@@ -66,6 +85,11 @@ class DataAccessS3(DataAccess):
             secret_key=s3_credentials.get("secret_key"),
             endpoint=s3_credentials.get("url", None),
             region=s3_credentials.get("region", None),
+            part_size=part_size,
+            max_concurrency=max_concurrency,
+            listing_concurrency=listing_concurrency,
+            listing_cache=listing_cache,
+            listing_cache_ttl=listing_cache_ttl,
         )
 
     def get_output_folder(self) -> str:
@@ -82,6 +106,19 @@ class DataAccessS3(DataAccess):
         """
         return self.input_folder
 
+    def _is_input_path(self, path: str) -> bool:
+        """
+        Check whether the path is the input folder or its sub folder (and not in the output folder)
+        :param path: path
+        :return: True, if the path is in the input folder, False otherwise
+        """
+        if self.input_folder is None:
+            return False
+        input_folder = self.input_folder.rstrip("/")
+        if path.rstrip("/") != input_folder and not path.startswith(f"{input_folder}/"):
+            return False
+        return self.output_folder is None or not path.startswith(self.output_folder)
+
     def _list_files_folder(self, path: str) -> tuple[list[dict[str, Any]], int]:
         """
         Get files for a given folder and all sub folders
@@ -89,11 +126,41 @@ class DataAccessS3(DataAccess):
         :return: List of files
         """
         try:
-            return self.arrS3.list_files(key=path)
+            # only the input is cached, output and other folders (e.g. intermediate results of other
+            # transforms) change between the runs
+            use_cache = self._is_input_path(path)
+            return self.arrS3.list_files(key=path, use_cache=use_cache)
         except Exception as e:
             self.logger.error(f"Error listing S3 files for path {path} - {e}")
             return [], 0
 
+    def _list_folder(self, path: str) -> tuple[list[dict[str, Any]], list[str], int]:
+        """
+        Get files and sub folders of a given folder, without going through the sub folders
+        :param path: path
+        :return: list of files, list of sub folders and number of retries
+        """
+        try:
+            return self.arrS3.list_level(key=path)
+        except Exception as e:
+            self.logger.error(f"Error listing S3 folder {path} - {e}")
+            return [], [], 0
+
+    def _iterate_files_folder(self, path: str, ordered: bool = False) -> Iterator[tuple[list[dict[str, Any]], int]]:
+        """
+        Lazily get files for a given folder and all sub folders, one listing page at a time.
+        S3 listing is always ordered. Listing errors are raised, so that a partial listing is never used
+        :param path: path
+        :param ordered: flag to return files in the same order as _list_files_folder
+        :return: iterator of tuples of a list of files and the number of retries
+        """
+        try:
+            yield from self.arrS3.iterate_files(key=path)
+        except Exception as e:
+            # re raise, as the pages already returned are not the complete listing
+            self.logger.error(f"Error listing S3 files for path {path} - {e}")
+            raise
+
     def _get_folders_to_use(self) -> tuple[list[str], int]:
         """
         convert data sets to a list of folders to use
@@ -114,14 +181,16 @@ class DataAccessS3(DataAccess):
                     break
         return folders_to_use, retries
 
-    def get_table(self, path: str) -> tuple[pyarrow.table, int]:
+    def get_table(self, path: str, columns: list[str] = None, filters: Any = None) -> tuple[pyarrow.table, int]:
         """
         Get pyArrow table for a given path
         :param path - file path
+        :param columns - optional list of columns to read, default None - all columns
+        :param filters - optional row filter, see TransformUtils.convert_binary_to_arrow, default None
         :return: pyArrow table or None, if the table read failed and number of retries
         """
         try:
-            return self.arrS3.read_table(path)
+            return self.arrS3.read_table(path, columns=columns, filters=filters)
         except Exception as e:
             self.logger.error(f"Exception reading table {path} from S3 - {e}")
             return None, 0
@@ -193,4 +262,5 @@ class DataAccessS3(DataAccess):
         try:
             return self.arrS3.save_file(key=path, data=data)
         except Exception as e:
-            self.logger.error(f"Exception saving file {path} - {e}")
\ No newline at end of file
+            self.logger.error(f"Exception saving file {path} - {e}")
+            return None, 0
@@ -13,7 +13,7 @@
 import argparse
 import ast
 
-from data_processing.utils import CLIArgumentProvider, ParamsUtils, get_logger
+from data_processing.utils import CLIArgumentProvider, ParamsUtils, get_logger, str2bool
 
 
 logger = get_logger(__name__)
@@ -38,6 +38,9 @@ class TransformExecutionConfiguration(CLIArgumentProvider):
         self.code_location = {}
         self.name = name
         self.print_params = print_params
+        self.read_ahead = 0
+        self.write_behind = 0
+        self.stream_row_groups = False
 
     def add_input_params(self, parser: argparse.ArgumentParser) -> None:
         """
@@ -59,6 +62,25 @@ class TransformExecutionConfiguration(CLIArgumentProvider):
             default=None,
             help="AST string containing code location\n" + ParamsUtils.get_ast_help_text(help_example_dict),
         )
+        parser.add_argument(
+            f"--{runtime_cli_prefix}read_ahead",
+            type=int,
+            default=0,
+            help="number of input files read in the background ahead of their processing, 0 disables read ahead",
+        )
+        parser.add_argument(
+            f"--{runtime_cli_prefix}write_behind",
+            type=int,
+            default=0,
+            help="number of input files whose results can be written in the background, 0 disables write behind",
+        )
+        parser.add_argument(
+            f"--{runtime_cli_prefix}stream_row_groups",
+            type=lambda x: bool(str2bool(x)),
+            default=False,
+            help="flag to transform parquet files one row group at a time. Only used by table transforms "
+            "supporting streaming",
+        )
 
     def apply_input_params(self, args: argparse.Namespace) -> bool:
         """
@@ -76,9 +98,19 @@ class TransformExecutionConfiguration(CLIArgumentProvider):
             "job id": captured["job_id"],
         }
         self.code_location = captured["code_location"]
+        self.read_ahead = captured["read_ahead"]
+        self.write_behind = captured["write_behind"]
+        self.stream_row_groups = captured["stream_row_groups"]
+        if self.read_ahead < 0 or self.write_behind < 0:
+            logger.error(f"read ahead {self.read_ahead} and write behind {self.write_behind} can not be negative")
+            return False
         # print parameters
         logger.info(f"pipeline id {self.pipeline_id}")
         if self.print_params:
             logger.info(f"job details {self.job_details}")
         logger.info(f"code location {self.code_location}")
+        if self.read_ahead > 0 or self.write_behind > 0:
+            logger.info(f"read ahead {self.read_ahead}, write behind {self.write_behind}")
+        if self.stream_row_groups:
+            logger.info("streaming row groups of table transforms")
         return True
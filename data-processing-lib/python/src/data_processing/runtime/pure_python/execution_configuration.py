@@ -34,6 +34,8 @@ class PythonTransformExecutionConfiguration(TransformExecutionConfiguration):
         """
         super().__init__(name=name, print_params=False)
         self.num_processors = 0
+        self.num_readers = 0
+        self.num_threads = 0
 
     def add_input_params(self, parser: argparse.ArgumentParser) -> None:
         """
@@ -42,6 +44,21 @@ class PythonTransformExecutionConfiguration(TransformExecutionConfiguration):
         :return:
         """
         parser.add_argument(f"--{cli_prefix}num_processors", type=int, default=0, help="size of multiprocessing pool")
+        parser.add_argument(
+            f"--{cli_prefix}num_readers",
+            type=int,
+            default=0,
+            help="number of reader processes, reading input tables into shared memory for the multiprocessing "
+            "pool. Only used for table transforms. 0 - every process of the pool reads its own files",
+        )
+        parser.add_argument(
+            f"--{cli_prefix}num_threads",
+            type=int,
+            default=0,
+            help="number of threads, processing files in a single process, sharing the transform instance, if it "
+            "is thread safe, or each with its own one. Suitable for transforms releasing GIL. Can not be used "
+            "together with num_processors",
+        )
 
         return TransformExecutionConfiguration.add_input_params(self, parser=parser)
 
@@ -56,10 +73,23 @@ class PythonTransformExecutionConfiguration(TransformExecutionConfiguration):
         captured = CLIArgumentProvider.capture_parameters(args, cli_prefix, False)
         # store parameters locally
         self.num_processors = captured["num_processors"]
+        self.num_readers = captured["num_readers"]
+        if self.num_readers < 0:
+            logger.error(f"number of readers {self.num_readers} can not be negative")
+            return False
+        self.num_threads = captured["num_threads"]
+        if self.num_threads > 0 and self.num_processors > 0:
+            logger.error(
+                f"number of threads {self.num_threads} and number of processors {self.num_processors} "
+                f"can not be used together"
+            )
+            return False
         # print them
         if self.num_processors > 0:
             # we are using multiprocessing
-            logger.info(f"using multiprocessing, num processors {self.num_processors}")
+            logger.info(f"using multiprocessing, num processors {self.num_processors}, num readers {self.num_readers}")
+        if self.num_threads > 0:
+            logger.info(f"using threads, num threads {self.num_threads}")
         return True
 
     def get_input_params(self) -> dict[str, Any]:
@@ -67,4 +97,11 @@ class PythonTransformExecutionConfiguration(TransformExecutionConfiguration):
         get input parameters for job_input_params in metadata
         :return: dictionary of parameters
         """
-        return {"num_processors": self.num_processors}
+        return {
+            "num_processors": self.num_processors,
+            "num_readers": self.num_readers,
+            "num_threads": self.num_threads,
+            "read_ahead": self.read_ahead,
+            "write_behind": self.write_behind,
+            "stream_row_groups": self.stream_row_groups,
+        }
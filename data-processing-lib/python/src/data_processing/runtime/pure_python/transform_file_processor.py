@@ -12,6 +12,7 @@
 
 from typing import Any
 
+import pyarrow as pa
 from data_processing.data_access import DataAccessFactoryBase
 from data_processing.runtime import AbstractTransformFileProcessor
 from data_processing.transform import AbstractTransform, TransformStatistics
@@ -30,6 +31,9 @@ class PythonTransformFileProcessor(AbstractTransformFileProcessor):
         transform_params: dict[str, Any],
         transform_class: type[AbstractTransform],
         is_folder: bool,
+        read_ahead: int = 0,
+        write_behind: int = 0,
+        transform: AbstractTransform = None,
     ):
         """
         Init method
@@ -38,17 +42,23 @@ class PythonTransformFileProcessor(AbstractTransformFileProcessor):
         :param transform_params - transform parameters
         :param transform_class: transform class
         :param is_folder: folder transform flag
+        :param read_ahead: maximum number of files read in the background
+        :param write_behind: maximum number of files with outstanding background writes
+        :param transform: optional thread safe transform instance, shared with other processors. If None, the
+                          processor creates its own transform
         """
         # invoke superclass
         super().__init__(
             data_access_factory=data_access_factory,
             transform_parameters=dict(transform_params),
             is_folder=is_folder,
+            read_ahead=read_ahead,
+            write_behind=write_behind,
         )
         self.transform_params["statistics"] = statistics
         # Create local processor
         try:
-            self.transform = transform_class(self.transform_params)
+            self.transform = transform if transform is not None else transform_class(self.transform_params)
         except Exception as e:
             self.logger.error(f"Exception creating transform  {e}")
             raise UnrecoverableException("failed creating transform")
@@ -69,7 +79,8 @@ class PythonPoolTransformFileProcessor(AbstractTransformFileProcessor):
         data_access_factory: DataAccessFactoryBase,
         transform_params: dict[str, Any],
         transform_class: type[AbstractTransform],
-        is_folder: bool
+        is_folder: bool,
+        write_behind: int = 0,
     ):
         """
         Init method
@@ -77,32 +88,50 @@ class PythonPoolTransformFileProcessor(AbstractTransformFileProcessor):
         :param transform_params - transform parameters
         :param transform_class: transform class
         :param is_folder: folder tranform flag
+        :param write_behind: maximum number of files with outstanding background writes
         """
         super().__init__(
             data_access_factory=data_access_factory,
             transform_parameters=dict(transform_params),
             is_folder=is_folder,
+            write_behind=write_behind,
         )
         # Add data access and statistics to the processor parameters
         self.transform_params["data_access"] = self.data_access
         self.transform_class = transform_class
         self.transform = None
 
-    def process_file(self, f_name: str) -> dict[str, Any]:
-        # re initialize statistics
-        self.stats = {}
+    def create_transform(self) -> None:
+        """
+        Create transform, if it is not created yet. Make sure to invoke this in the worker process
+        :return: None
+        """
         if self.transform is None:
-            # create transform. Make sure to do this locally
             try:
                 self.transform = self.transform_class(self.transform_params)
             except Exception as e:
                 self.logger.error(f"Exception creating transform  {e}")
                 raise UnrecoverableException("failed creating transform")
-        # Invoke superclass method
+
+    def process_file(self, f_name: str) -> dict[str, Any]:
+        # re initialize statistics
+        self.stats = {}
+        self.create_transform()
+        # Invoke superclass method. Statistics of the background writes completed here are returned with this file,
+        # the rest of the writes are completed by flush
         super().process_file(f_name=f_name)
         # return collected statistics
         return self.stats
 
+    def process_table(self, f_name: str, table: pa.Table, size: int, retries: int = 0) -> dict[str, Any]:
+        # re initialize statistics
+        self.stats = {}
+        self.create_transform()
+        # Invoke superclass method
+        super().process_table(f_name=f_name, table=table, size=size, retries=retries)
+        # return collected statistics
+        return self.stats
+
     def flush(self) -> dict[str, Any]:
         # re initialize statistics
         self.stats = {}
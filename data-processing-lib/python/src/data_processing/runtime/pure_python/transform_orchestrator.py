@@ -10,26 +10,105 @@
 # limitations under the License.
 ################################################################################
 import os
+import queue
+import threading
 import time
 import traceback
-import psutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from multiprocessing import Pool
-from typing import Any
+from multiprocessing import Process, Queue, shared_memory
+from typing import Any, Iterable, Iterator
 
-from data_processing.data_access import DataAccessFactoryBase
+import psutil
+from data_processing.data_access import DataAccess, DataAccessFactoryBase
 from data_processing.runtime.pure_python import (
+    DefaultPythonTransformRuntime,
     PythonPoolTransformFileProcessor,
     PythonTransformExecutionConfiguration,
     PythonTransformFileProcessor,
     PythonTransformRuntimeConfiguration,
 )
-from data_processing.transform import AbstractTransform, TransformStatistics, AbstractFolderTransform
-from data_processing.utils import GB, get_logger
+from data_processing.transform import (
+    AbstractFolderTransform,
+    AbstractTableTransform,
+    AbstractTransform,
+    ThreadSafeTransformStatistics,
+    TransformStatistics,
+)
+from data_processing.utils import GB, TransformUtils, UnrecoverableException, get_logger
 
 
 logger = get_logger(__name__)
 
+# flush request of the worker
+_FLUSH = ("flush",)
+# how often the orchestrator checks that the workers are alive, sec
+_WORKER_CHECK_INTERVAL = 5
+# print interval (files), when the files are processed while listing them and their number is not known
+_LAZY_PRINT_INTERVAL = 100
+
+
+class _LazyFiles:
+    """
+    Input files, that are listed page by page while they are processed (see DataAccess.iterate_files_to_process),
+    so that processing starts once the first page is listed and neither sizes nor order of the files are computed
+    """
+
+    def __init__(self, data_access: DataAccess):
+        """
+        Initialization
+        :param data_access: data access
+        """
+        self.pages = data_access.iterate_files_to_process()
+        self.first = []
+        self.retries = 0
+        self.listed = 0
+        # list until the first file to make sure that there is something to process
+        for files, retries in self.pages:
+            self.retries += retries
+            if len(files) > 0:
+                self.first = files
+                break
+
+    def empty(self) -> bool:
+        """
+        Check whether there are any files to process
+        :return: True if there are no files
+        """
+        return len(self.first) == 0
+
+    def __iter__(self) -> Iterator[str]:
+        """
+        Iterate files to process. Can only be used once
+        :return: iterator of file names
+        """
+        self.listed += len(self.first)
+        yield from self.first
+        self.first = []
+        for files, retries in self.pages:
+            self.retries += retries
+            self.listed += len(files)
+            yield from files
+
+
+def _log_progress(completed: int, files: Iterable[str], t_start: float) -> None:
+    """
+    Log processing progress
+    :param completed: number of completed files
+    :param files: files to process
+    :param t_start: processing start time
+    :return: None
+    """
+    if isinstance(files, _LazyFiles):
+        # total number of files is not known yet
+        logger.info(f"Completed {completed} files in {round((time.time() - t_start)/60., 3)} min")
+    else:
+        logger.info(
+            f"Completed {completed} files ({round(100 * completed / len(files), 2)}%) "
+            f"in {round((time.time() - t_start)/60., 3)} min"
+        )
+
 
 def _execution_resources() -> dict[str, Any]:
     """
@@ -63,8 +142,8 @@ def orchestrate(
     start_ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     start_time = time.time()
     logger.info(f"orchestrator {runtime_config.get_name()} started at {start_ts}")
-    # create statistics
-    statistics = TransformStatistics()
+    # create statistics, shared by the threads in the case of threaded execution
+    statistics = ThreadSafeTransformStatistics() if execution_config.num_threads > 0 else TransformStatistics()
     # create data access
     data_access = data_access_factory.create_data_access()
     if data_access is None:
@@ -73,11 +152,19 @@ def orchestrate(
     # create additional execution parameters
     runtime = runtime_config.create_transform_runtime()
     is_folder = issubclass(runtime_config.get_transform_class(), AbstractFolderTransform)
+    files = []
     try:
         if is_folder:
             # folder transform
             files = runtime.get_folders(data_access=data_access)
             logger.info(f"Number of folders is {len(files)}")
+        elif type(runtime).get_transform_config is DefaultPythonTransformRuntime.get_transform_config:
+            # transform configuration does not depend on the list of files, process files while listing them
+            files = _LazyFiles(data_access=data_access)
+            if files.empty():
+                logger.error("No input files to process - exiting")
+                return 0
+            logger.info("Processing input files while listing them")
         else:
             # Get files to process
             files, profile, retries = data_access.get_files_to_process()
@@ -88,11 +175,32 @@ def orchestrate(
                 statistics.add_stats({"data access retries": retries})
             logger.info(f"Number of files is {len(files)}, source profile {profile}")
         # Print interval
-        print_interval = int(len(files) / 100)
+        if isinstance(files, _LazyFiles):
+            print_interval = _LAZY_PRINT_INTERVAL
+        else:
+            print_interval = int(len(files) / 100)
         if print_interval == 0:
             print_interval = 1
         logger.debug(f"{runtime_config.get_name()} Begin processing files")
-        if execution_config.num_processors > 0:
+        use_readers = execution_config.num_processors > 0 and execution_config.num_readers > 0
+        if use_readers and not issubclass(runtime_config.get_transform_class(), AbstractTableTransform):
+            logger.warning("Reader processes are only supported for table transforms, not using them")
+            use_readers = False
+        if use_readers:
+            # using reader and worker processes, passing tables through shared memory
+            statistics = _process_transforms_pipelined(
+                files=files,
+                size=execution_config.num_processors,
+                n_readers=execution_config.num_readers,
+                data_access_factory=data_access_factory,
+                print_interval=print_interval,
+                transform_params=runtime.get_transform_config(
+                    data_access_factory=data_access_factory, statistics=statistics, files=files
+                ),
+                transform_class=runtime_config.get_transform_class(),
+                write_behind=execution_config.write_behind,
+            )
+        elif execution_config.num_processors > 0:
             # using multiprocessor pool for execution
             statistics = _process_transforms_multiprocessor(
                 files=files,
@@ -104,6 +212,23 @@ def orchestrate(
                 ),
                 transform_class=runtime_config.get_transform_class(),
                 is_folder=is_folder,
+                write_behind=execution_config.write_behind,
+            )
+        elif execution_config.num_threads > 0:
+            # using threads for execution
+            _process_transforms_threads(
+                files=files,
+                size=execution_config.num_threads,
+                data_access_factory=data_access_factory,
+                print_interval=print_interval,
+                statistics=statistics,
+                transform_params=runtime.get_transform_config(
+                    data_access_factory=data_access_factory, statistics=statistics, files=files
+                ),
+                transform_class=runtime_config.get_transform_class(),
+                is_folder=is_folder,
+                read_ahead=execution_config.read_ahead,
+                write_behind=execution_config.write_behind,
             )
         else:
             # using sequential execution
@@ -117,6 +242,8 @@ def orchestrate(
                 ),
                 transform_class=runtime_config.get_transform_class(),
                 is_folder=is_folder,
+                read_ahead=execution_config.read_ahead,
+                write_behind=execution_config.write_behind,
             )
         status = "success"
         return_code = 0
@@ -124,6 +251,10 @@ def orchestrate(
         logger.error(f"Exception during execution {e}: {traceback.print_exc()}")
         return_code = 1
         status = "failure"
+    if isinstance(files, _LazyFiles):
+        logger.info(f"Number of listed files is {files.listed}")
+        if files.retries > 0:
+            statistics.add_stats({"data access retries": files.retries})
     try:
         # Compute execution statistics
         logger.debug("Computing execution stats")
@@ -159,23 +290,27 @@ def orchestrate(
 
 
 def _process_transforms(
-    files: list[str],
+    files: Iterable[str],
     print_interval: int,
     data_access_factory: DataAccessFactoryBase,
     statistics: TransformStatistics,
     transform_params: dict[str, Any],
     transform_class: type[AbstractTransform],
     is_folder: bool,
+    read_ahead: int = 0,
+    write_behind: int = 0,
 ) -> None:
     """
     Process transforms sequentially
-    :param files: list of files to process
+    :param files: files to process
     :param statistics: statistics class
     :param print_interval: print interval
     :param data_access_factory: data access factory
     :param transform_params - transform parameters
     :param transform_class: transform class
     :param is_folder: folder transform flag
+    :param read_ahead: number of files read in the background
+    :param write_behind: number of files written in the background
     :return: metadata for the execution
     """
     # create executor
@@ -185,18 +320,30 @@ def _process_transforms(
         transform_params=transform_params,
         transform_class=transform_class,
         is_folder=is_folder,
+        read_ahead=read_ahead,
+        write_behind=write_behind,
     )
     # process data
     t_start = time.time()
     completed = 0
-    for path in files:
+    source = iter(files)
+    # current file and the ones read ahead
+    pending = deque()
+    while True:
+        while len(pending) <= read_ahead:
+            f_name = next(source, None)
+            if f_name is None:
+                break
+            pending.append(f_name)
+        if len(pending) == 0:
+            break
+        path = pending.popleft()
+        # let the executor read the next files in the background
+        executor.prefetch(list(pending))
         executor.process_file(path)
         completed += 1
         if completed % print_interval == 0:
-            logger.info(
-                f"Completed {completed} files ({round(100 * completed / len(files), 2)}%) "
-                f"in {round((time.time() - t_start)/60., 3)} min"
-            )
+            _log_progress(completed=completed, files=files, t_start=t_start)
     logger.info(f"Done processing {completed} files, waiting for flush() completion.")
     # invoke flush to ensure that all results are returned
     start = time.time()
@@ -204,24 +351,182 @@ def _process_transforms(
     logger.info(f"done flushing in {round(time.time() - start, 3)} sec")
 
 
+def _process_transforms_threads(
+    files: Iterable[str],
+    size: int,
+    print_interval: int,
+    data_access_factory: DataAccessFactoryBase,
+    statistics: TransformStatistics,
+    transform_params: dict[str, Any],
+    transform_class: type[AbstractTransform],
+    is_folder: bool,
+    read_ahead: int = 0,
+    write_behind: int = 0,
+) -> None:
+    """
+    Process transforms using a pool of threads. Every thread has its own file processor, sharing the process
+    (and everything loaded once per process) with the rest of the threads. Thread safe transforms (see
+    AbstractTransform.thread_safe) are created once and shared by all the threads, the rest get a transform
+    instance per thread. This is efficient for transforms spending most of the time in the native code releasing GIL
+    :param files: files to process
+    :param size: number of threads
+    :param print_interval: print interval
+    :param data_access_factory: data access factory
+    :param statistics: statistics class, has to be thread safe
+    :param transform_params - transform parameters
+    :param transform_class: transform class
+    :param is_folder: folder transform flag
+    :param read_ahead: number of files read in the background by every thread
+    :param write_behind: number of files written in the background
+    :return: None
+    """
+    # create executors, one per thread. Thread safe transform is created by the first one and shared
+    shared = getattr(transform_class, "thread_safe", False)
+    executors = []
+    for _ in range(size):
+        executors.append(
+            PythonTransformFileProcessor(
+                data_access_factory=data_access_factory,
+                statistics=statistics,
+                transform_params=transform_params,
+                transform_class=transform_class,
+                is_folder=is_folder,
+                read_ahead=read_ahead,
+                write_behind=write_behind,
+                transform=executors[0].transform if shared and len(executors) > 0 else None,
+            )
+        )
+    if shared:
+        logger.info(f"Transform is thread safe, {size} threads share a single transform instance")
+    source = iter(files)
+    lock = threading.Lock()
+    failed = threading.Event()
+    completed = 0
+    t_start = time.time()
+
+    def process(executor: PythonTransformFileProcessor) -> None:
+        nonlocal completed
+        # files taken by this thread - the current one and the ones read ahead
+        pending = deque()
+        while not failed.is_set():
+            # listing is not thread safe
+            with lock:
+                while len(pending) <= read_ahead:
+                    f_name = next(source, None)
+                    if f_name is None:
+                        break
+                    pending.append(f_name)
+            if len(pending) == 0:
+                return
+            f_name = pending.popleft()
+            # let the executor read the next files of this thread in the background
+            executor.prefetch(list(pending))
+            try:
+                executor.process_file(f_name)
+            except Exception:
+                # stop the rest of the threads
+                failed.set()
+                raise
+            with lock:
+                completed += 1
+                if completed % print_interval == 0:
+                    _log_progress(completed=completed, files=files, t_start=t_start)
+
+    with ThreadPoolExecutor(max_workers=size, thread_name_prefix="transform") as pool:
+        futures = [pool.submit(process, executor) for executor in executors]
+        for future in futures:
+            # re raise exceptions of the threads
+            future.result()
+    logger.info(f"Done processing {completed} files, waiting for flush() completion.")
+    # invoke flush of every executor to ensure that all results are returned. Shared transform is flushed once,
+    # by an executor, that processed files, so that its output is named after the last of them
+    start = time.time()
+    flusher = next((executor for executor in executors if executor.last_file_name is not None), executors[0])
+    for executor in executors:
+        executor.flush(flush_transform=not shared or executor is flusher)
+    logger.info(f"done flushing in {round(time.time() - start, 3)} sec")
+
+
+def _worker(index: int, processor: PythonPoolTransformFileProcessor, requests: Queue, results: Queue) -> None:
+    """
+    Worker process loop. The transform is created once, when the process starts, and is used for all the
+    files assigned to this worker, until it is flushed
+    :param index: worker index
+    :param processor: file processor
+    :param requests: worker's own queue of requests - file name to process, FLUSH to flush the transform
+                     or None to exit
+    :param results: queue of results shared by all the workers - tuples of worker index, request and its
+                    statistics (or None if the transform can not be created)
+    :return: None
+    """
+    try:
+        processor.create_transform()
+    except UnrecoverableException:
+        results.put((index, None, None))
+        return
+    results.put((index, None, {}))
+    while True:
+        request = requests.get()
+        if request is None:
+            return
+        if request == _FLUSH:
+            results.put((index, request, processor.flush()))
+        else:
+            results.put((index, request, processor.process_file(request)))
+
+
+def _get_result(results: Queue, processes: list[Process]) -> tuple[Any, ...]:
+    """
+    Get the next result of the worker (or reader) processes, checking that they are alive while waiting
+    :param results: queue of results
+    :param processes: processes producing the results
+    :return: result
+    """
+    while True:
+        try:
+            return results.get(timeout=_WORKER_CHECK_INTERVAL)
+        except queue.Empty:
+            failed = [p.name for p in processes if p.exitcode is not None and p.exitcode != 0]
+            if len(failed) > 0:
+                logger.error(f"Processes {failed} exited unexpectedly")
+                raise UnrecoverableException("worker failure")
+
+
+def _stop_processes(processes: list[Process]) -> None:
+    """
+    Wait for the processes to exit, terminating the ones, that do not
+    :param processes: processes
+    :return: None
+    """
+    for p in processes:
+        p.join(timeout=_WORKER_CHECK_INTERVAL)
+        if p.is_alive():
+            p.terminate()
+
+
 def _process_transforms_multiprocessor(
-    files: list[str],
+    files: Iterable[str],
     size: int,
     print_interval: int,
     data_access_factory: DataAccessFactoryBase,
     transform_params: dict[str, Any],
     transform_class: type[AbstractTransform],
-    is_folder: bool
+    is_folder: bool,
+    write_behind: int = 0,
 ) -> TransformStatistics:
     """
-    Process transforms using multiprocessing pool
-    :param files: list of files to process
+    Process transforms using dedicated worker processes. Every worker creates its transform once and keeps it
+    (with its state) for all the files assigned to it. Once all the files are processed, every worker is
+    flushed exactly once and the orchestrator waits for all the flushes to complete (barrier), so that
+    buffering transforms neither lose nor duplicate their data
+    :param files: files to process
     :param size: pool size
     :param print_interval: print interval
     :param data_access_factory: data access factory
     :param transform_params - transform parameters
     :param transform_class: transform class
     :param is_folder: folder transform class
+    :param write_behind: number of files written in the background
     :return: metadata for the execution
     """
     # result statistics
@@ -232,28 +537,261 @@ def _process_transforms_multiprocessor(
         transform_params=transform_params,
         transform_class=transform_class,
         is_folder=is_folder,
+        write_behind=write_behind,
     )
     completed = 0
     t_start = time.time()
-    # create multiprocessing pool
-    with Pool(processes=size) as pool:
-        # execute for every input file
-        for result in pool.imap_unordered(processor.process_file, files):
+    results = Queue()
+    requests = [Queue() for _ in range(size)]
+    workers = [Process(target=_worker, args=(i, processor, requests[i], results), daemon=True) for i in range(size)]
+    for worker in workers:
+        worker.start()
+    try:
+        # wait for all the workers to create their transforms
+        for _ in range(size):
+            index, _, result = _get_result(results=results, processes=workers)
+            if result is None:
+                raise UnrecoverableException(f"worker {index} failed creating transform")
+        # every worker has a single outstanding file, next file is sent to the worker completing its file
+        source = iter(files)
+        dispatched = 0
+        for i in range(size):
+            f_name = next(source, None)
+            if f_name is None:
+                break
+            requests[i].put(f_name)
+            dispatched += 1
+        while completed < dispatched:
+            index, _, result = _get_result(results=results, processes=workers)
             completed += 1
             # accumulate statistics
             statistics.add_stats(result)
+            f_name = next(source, None)
+            if f_name is not None:
+                requests[index].put(f_name)
+                dispatched += 1
             if completed % print_interval == 0:
                 # print intermediate statistics
-                logger.info(
-                    f"Completed {completed} files ({round(100 * completed / len(files), 2)}%) "
-                    f"in {round((time.time() - t_start)/60., 3)} min"
-                )
+                _log_progress(completed=completed, files=files, t_start=t_start)
         logger.info(f"Done processing {completed} files, waiting for flush() completion.")
-        results = [{}] * size
-        # flush
-        for i in range(size):
-            results[i] = pool.apply_async(processor.flush)
-        for s in results:
-            statistics.add_stats(s.get())
-    logger.info(f"done flushing in {time.time() - t_start} sec")
+        start = time.time()
+        # flush every worker once and wait for all of them
+        for request in requests:
+            request.put(_FLUSH)
+        flushed = set()
+        while len(flushed) < size:
+            index, _, result = _get_result(results=results, processes=workers)
+            flushed.add(index)
+            statistics.add_stats(result)
+        logger.info(f"done flushing in {round(time.time() - start, 3)} sec")
+    finally:
+        for request in requests:
+            request.put(None)
+        _stop_processes(processes=workers)
+    return statistics
+
+
+def _reader(data_access_factory: DataAccessFactoryBase, files: Queue, tables: Queue) -> None:
+    """
+    Reader process loop. Reads files and passes their content as Arrow tables in shared memory
+    :param data_access_factory: data access factory
+    :param files: queue of files to read - tuples of file name and name of the shared memory segment
+                  to create for its table, None to exit
+    :param tables: queue of read tables - tuples of file name, shared memory segment name (None if the read
+                   failed), size of the table data, size of the file and number of retries
+    :return: None
+    """
+    data_access = data_access_factory.create_data_access()
+    while True:
+        item = files.get()
+        if item is None:
+            return
+        f_name, segment_name = item
+        segment, table_size, size, retries = None, 0, 0, 0
+        try:
+            data, retries = data_access.get_file(path=f_name)
+            if data is not None:
+                size = len(data)
+                table = TransformUtils.convert_binary_to_arrow(data=data)
+                if table is not None:
+                    segment, table_size = TransformUtils.convert_arrow_to_shared_memory(table=table, name=segment_name)
+        except Exception as e:
+            logger.warning(f"Exception reading file {f_name}: {e}")
+        tables.put((f_name, segment, table_size, size, retries))
+
+
+def _close_segments(segments: list[shared_memory.SharedMemory]) -> list[shared_memory.SharedMemory]:
+    """
+    Close shared memory segments, that are no longer referenced
+    :param segments: segments
+    :return: segments, that are still referenced (e.g. by the tables buffered by the transform)
+    """
+    referenced = []
+    for segment in segments:
+        try:
+            segment.close()
+        except BufferError:
+            referenced.append(segment)
+    return referenced
+
+
+def _remove_segments(names: Iterable[str]) -> None:
+    """
+    Remove shared memory segments, that were not removed by the processes using them (e.g. because they
+    were terminated or died). Segments, that were never created or are already removed, are ignored
+    :param names: names of the segments
+    :return: None
+    """
+    for name in names:
+        try:
+            segment = shared_memory.SharedMemory(name=name)
+        except FileNotFoundError:
+            continue
+        segment.unlink()
+        segment.close()
+
+
+def _table_worker(index: int, processor: PythonPoolTransformFileProcessor, tables: Queue, results: Queue) -> None:
+    """
+    Worker process loop, transforming tables read by the reader processes. The transform is created once,
+    when the process starts. Every worker takes a single None from the tables queue and exits after flushing,
+    so that every worker is flushed exactly once
+    :param index: worker index
+    :param processor: file processor
+    :param tables: queue of read tables (see _reader), None to flush
+    :param results: queue of results shared by all the workers - tuples of worker index, file name (or FLUSH)
+                    and statistics (or None if the transform can not be created)
+    :return: None
+    """
+    try:
+        processor.create_transform()
+    except UnrecoverableException:
+        results.put((index, None, None))
+        return
+    results.put((index, None, {}))
+    segments = []
+    while True:
+        item = tables.get()
+        if item is None:
+            break
+        f_name, segment, table_size, size, retries = item
+        table = None
+        if segment is not None:
+            # table is mapped from the shared memory, without copying it
+            table, shm = TransformUtils.convert_shared_memory_to_arrow(name=segment, size=table_size)
+            segments.append(shm)
+        stats = processor.process_table(f_name=f_name, table=table, size=size, retries=retries)
+        table = None
+        segments = _close_segments(segments=segments)
+        results.put((index, f_name, stats))
+    results.put((index, _FLUSH, processor.flush()))
+    _close_segments(segments=segments)
+
+
+def _process_transforms_pipelined(
+    files: Iterable[str],
+    size: int,
+    n_readers: int,
+    print_interval: int,
+    data_access_factory: DataAccessFactoryBase,
+    transform_params: dict[str, Any],
+    transform_class: type[AbstractTransform],
+    write_behind: int = 0,
+) -> TransformStatistics:
+    """
+    Process table transforms using reader and worker processes. Readers decode the input files into Arrow
+    tables in shared memory, workers map them without copying and transform them, so that CPU heavy transforms
+    are scaled across the processes without decoding or pickling the tables in the workers
+    :param files: files to process
+    :param size: number of worker processes
+    :param n_readers: number of reader processes
+    :param print_interval: print interval
+    :param data_access_factory: data access factory
+    :param transform_params - transform parameters
+    :param transform_class: transform class
+    :param write_behind: number of files written in the background
+    :return: metadata for the execution
+    """
+    # result statistics
+    statistics = TransformStatistics()
+    # create processor
+    processor = PythonPoolTransformFileProcessor(
+        data_access_factory=data_access_factory,
+        transform_params=transform_params,
+        transform_class=transform_class,
+        is_folder=False,
+        write_behind=write_behind,
+    )
+    completed = 0
+    t_start = time.time()
+    results = Queue()
+    to_read = Queue()
+    # bounded, so that the readers do not get too far ahead of the workers, filling the shared memory
+    tables = Queue(maxsize=size)
+    readers = [
+        Process(target=_reader, args=(data_access_factory, to_read, tables), daemon=True) for _ in range(n_readers)
+    ]
+    workers = [Process(target=_table_worker, args=(i, processor, tables, results), daemon=True) for i in range(size)]
+    processes = readers + workers
+    for p in processes:
+        p.start()
+    flushed = set()
+    # shared memory segments of the files in flight (file name to segment name). Segments are named by the
+    # orchestrator, so that it can remove them, if a reader or worker dies before removing them itself
+    in_flight = {}
+    try:
+        # wait for all the workers to create their transforms
+        for _ in range(size):
+            index, _, result = _get_result(results=results, processes=processes)
+            if result is None:
+                raise UnrecoverableException(f"worker {index} failed creating transform")
+        # files are sent to the readers gradually, keeping enough of them outstanding to keep everybody busy
+        source = iter(files)
+        dispatched = 0
+        exhausted = False
+
+        def dispatch(n: int) -> None:
+            nonlocal dispatched, exhausted
+            for _ in range(n):
+                f_name = next(source, None)
+                if f_name is None:
+                    # let the readers exit
+                    for _ in range(n_readers):
+                        to_read.put(None)
+                    exhausted = True
+                    return
+                in_flight[f_name] = f"dpk_{os.getpid()}_{dispatched}"
+                to_read.put((f_name, in_flight[f_name]))
+                dispatched += 1
+
+        dispatch(2 * size + n_readers)
+        while completed < dispatched:
+            _, f_name, result = _get_result(results=results, processes=processes)
+            in_flight.pop(f_name, None)
+            completed += 1
+            # accumulate statistics
+            statistics.add_stats(result)
+            if not exhausted:
+                dispatch(1)
+            if completed % print_interval == 0:
+                # print intermediate statistics
+                _log_progress(completed=completed, files=files, t_start=t_start)
+        logger.info(f"Done processing {completed} files, waiting for flush() completion.")
+        start = time.time()
+        # every worker takes a single flush request and exits
+        for _ in range(size):
+            tables.put(None)
+        while len(flushed) < size:
+            index, _, result = _get_result(results=results, processes=processes)
+            flushed.add(index)
+            statistics.add_stats(result)
+        logger.info(f"done flushing in {round(time.time() - start, 3)} sec")
+    finally:
+        if len(flushed) < size:
+            # failure, stop the processes
+            for p in processes:
+                p.terminate()
+        _stop_processes(processes=processes)
+        # remove the tables, that were not processed, including the ones taken by the workers
+        _remove_segments(names=in_flight.values())
     return statistics
@@ -27,9 +27,12 @@ class TransformRuntimeConfiguration(CLIArgumentProvider):
 
     def add_input_params(self, parser: ArgumentParser) -> None:
         self.transform_config.add_input_params(parser)
+        self.transform_config.add_write_profile_params(parser)
 
     def apply_input_params(self, args: Namespace) -> bool:
-        return self.transform_config.apply_input_params(args)
+        if not self.transform_config.apply_input_params(args):
+            return False
+        return self.transform_config.apply_write_profile_params(args)
 
     def get_input_params(self) -> dict[str, Any]:
         return self.transform_config.get_input_params()
@@ -11,15 +11,24 @@
 ################################################################################
 import time
 import traceback
-from typing import Any
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
 
+import pyarrow as pa
 from data_processing.data_access import DataAccessFactoryBase
 from data_processing.utils import TransformUtils, UnrecoverableException, get_logger
 
 
 class AbstractTransformFileProcessor:
     """
-    This is the the base class implementing processing of a single binary file
+    This is the the base class implementing processing of a single binary file.
+    Reading and writing of files can be overlapped with the transform execution:
+     - read ahead - up to read_ahead files (announced using prefetch()) are read in the background
+     - write behind - up to write_behind input files' results are written in the background. Once this
+       limit is reached, processing blocks until the oldest write completes. All outstanding writes
+       are completed by flush()
+    Both are disabled (0) by default
     """
 
     def __init__(
@@ -27,12 +36,16 @@ class AbstractTransformFileProcessor:
         data_access_factory: DataAccessFactoryBase,
         transform_parameters: dict[str, Any],
         is_folder: bool = False,
+        read_ahead: int = 0,
+        write_behind: int = 0,
     ):
         """
         Init method
         :param data_access_factory: Data Access Factory
         :param transform_parameters: Transform parameters
         :param is_folder: folder transform flag
+        :param read_ahead: maximum number of files read in the background
+        :param write_behind: maximum number of files with outstanding background writes
         """
         self.logger = get_logger(__name__)
         # validate parameters
@@ -49,44 +62,198 @@ class AbstractTransformFileProcessor:
         self.transform_params = transform_parameters
         self.transform_params["data_access"] = self.data_access
         self.is_folder = is_folder
+        # background IO. Executors are created lazily, so that the processor can be pickled
+        self.read_ahead = max(read_ahead, 0)
+        self.write_behind = max(write_behind, 0)
+        self.read_executor = None
+        self.write_executor = None
+        self.prefetched = {}
+        self.pending_writes = deque()
 
-    def process_file(self, f_name: str) -> None:
+    def prefetch(self, f_names: list[str]) -> None:
+        """
+        Announce files that are going to be processed next, so that they can be read in the background.
+        At most read_ahead files are read ahead, the rest of the names is ignored
+        :param f_names: names of the files, in the order of processing
+        :return: None
+        """
+        if self.read_ahead == 0 or self.is_folder:
+            return
+        for f_name in f_names:
+            if len(self.prefetched) >= self.read_ahead:
+                return
+            if f_name in self.prefetched:
+                continue
+            if self.read_executor is None:
+                self.read_executor = ThreadPoolExecutor(max_workers=self.read_ahead, thread_name_prefix="read_ahead")
+            self.prefetched[f_name] = self.read_executor.submit(self._read_file, f_name)
+
+    def process_files(self, f_names: list[str]) -> None:
+        """
+        Process a list of files sequentially, reading up to read_ahead files ahead
+        :param f_names: list of file names
+        :return: None
+        """
+        for index, f_name in enumerate(f_names):
+            self.prefetch(f_names[index + 1 : index + 1 + self.read_ahead])
+            self.process_file(f_name=f_name)
+
+    def _read_file(self, f_name: str) -> tuple[Any, int]:
+        """
+        Read source file. Transforms supporting it get zero-copy buffer, the rest - bytes
+        :param f_name: file name
+        :return: file content and number of retries
+        """
+        if getattr(self.transform, "zero_copy_input", False):
+            return self.data_access.get_file_buffer(path=f_name)
+        return self.data_access.get_file(path=f_name)
+
+    def process_file(self, f_name: str, part: tuple[int, int] = None, content: tuple[Any, int] = None) -> None:
         """
         Method processing an individual file
         :param f_name: file name
+        :param part: optional tuple of the part index and number of parts, used to process only a part
+                     (range of row groups) of the file. Only supported by transforms with supports_file_parts
+        :param content: optional content of the file and number of retries reading it, already read by the
+                        runtime (e.g. once for all the parts of the file), as returned by DataAccess.get_file()
         :return: None
         """
-        self.logger.debug(f"Begin processing file {f_name}")
+        self.logger.debug(f"Begin processing file {f_name}, part {part}")
+        if part is not None and not getattr(self.transform, "supports_file_parts", False):
+            # transform can not process parts, the first one processes complete file
+            if part[0] > 0:
+                return
+            part = None
         if self.data_access is None:
             self.logger.warning("No data_access found. Returning.")
             return
+        # complete writes, that are already done
+        self._complete_writes(max_pending=len(self.pending_writes))
         t_start = time.time()
         if not self.is_folder:
             # Read source file only if we are processing file
-            filedata, retries = self.data_access.get_file(path=f_name)
-            if retries > 0:
-                self._publish_stats({"data access retries": retries})
-            if filedata is None:
-                self.logger.warning(f"File read resulted in None for {f_name}. Returning.")
-                self._publish_stats({"failed_reads": 1})
+            read = self.prefetched.pop(f_name, None)
+            if content is not None:
+                filedata, retries = content
+                if part is not None and part[0] > 0:
+                    # retries are counted once, with the first part
+                    retries = 0
+            elif read is None:
+                filedata, retries = self._read_file(f_name=f_name)
+            else:
+                # read ahead, exceptions are re raised here, same as for the direct read
+                filedata, retries = read.result()
+            if not self._publish_read_stats(
+                f_name=f_name,
+                content=filedata,
+                size=0 if filedata is None else len(filedata),
+                retries=retries,
+                # the complete source is counted once, with its first part
+                first=part is None or part[0] == 0,
+            ):
                 return
-            self._publish_stats({"source_files": 1, "source_size": len(filedata)})
         # Process input file
+        if self.is_folder:
+            self._transform(
+                f_name=f_name,
+                t_start=t_start,
+                transform=lambda: self.transform.transform(folder_name=f_name),
+                last_file_name=f_name,
+            )
+            return
+        name_extension = TransformUtils.get_file_extension(f_name)
+        if part is None:
+            self._transform(
+                f_name=f_name,
+                t_start=t_start,
+                transform=lambda: self.transform.transform_binary(file_name=f_name, byte_array=filedata),
+                last_file_name=name_extension[0],
+                completed=f_name,
+            )
+            return
+        # Parts of the file are recorded as completed individually, the file is completed once all its parts are
+        part_name = TransformUtils.get_file_part_name(file_name=name_extension[0], part=part[0], n_parts=part[1])
+        self._transform(
+            f_name=f_name,
+            t_start=t_start,
+            transform=lambda: self.transform.transform_binary_part(
+                file_name=f_name, byte_array=filedata, part=part[0], n_parts=part[1]
+            ),
+            last_file_name=part_name,
+            completed=f"{part_name}{name_extension[1]}",
+        )
+
+    def process_table(self, f_name: str, table: pa.Table, size: int, retries: int = 0) -> None:
+        """
+        Method processing an individual file, already read as a table (for example by a reader process).
+        Only supported by table transforms
+        :param f_name: file name
+        :param table: file content or None, if the file read failed
+        :param size: size of the file (bytes)
+        :param retries: number of retries reading the file
+        :return: None
+        """
+        self.logger.debug(f"Begin processing table of file {f_name}")
+        # complete writes, that are already done
+        self._complete_writes(max_pending=len(self.pending_writes))
+        t_start = time.time()
+        if not self._publish_read_stats(f_name=f_name, content=table, size=size, retries=retries):
+            return
+        self._transform(
+            f_name=f_name,
+            t_start=t_start,
+            transform=lambda: self.transform.transform_table(file_name=f_name, table=table),
+            last_file_name=TransformUtils.get_file_extension(f_name)[0],
+            completed=f_name,
+        )
+
+    def _publish_read_stats(self, f_name: str, content: Any, size: int, retries: int, first: bool = True) -> bool:
+        """
+        Publish statistics of reading a source file
+        :param f_name: file name
+        :param content: file content, None if the read failed
+        :param size: size of the file (bytes)
+        :param retries: number of retries reading the file
+        :param first: flag to count the source file, False for the subsequent parts of the file
+        :return: True if the file was read, False otherwise
+        """
+        if retries > 0:
+            self._publish_stats({"data access retries": retries})
+        if content is None:
+            self.logger.warning(f"File read resulted in None for {f_name}. Returning.")
+            self._publish_stats({"failed_reads": 1})
+            return False
+        if first:
+            self._publish_stats({"source_files": 1, "source_size": size})
+        return True
+
+    def _transform(
+        self,
+        f_name: str,
+        t_start: float,
+        transform: Callable[[], tuple[list[tuple[bytes, str]], dict[str, Any]]],
+        last_file_name: str,
+        completed: str = None,
+    ) -> None:
+        """
+        Execute the transform of a file (or folder) and submit its results
+        :param f_name: name of the processed file or folder
+        :param t_start: processing start time
+        :param transform: function executing the transform, returning output files and statistics
+        :param last_file_name: name (without extension) used for the output files
+        :param completed: name of the source file, recorded as completed (for checkpointing) once its outputs
+                          are written, None for folders
+        :return: None
+        """
         try:
             self.logger.debug(f"Begin transforming file {f_name}")
+            out_files, stats = transform()
+            self.last_file_name = last_file_name
             if not self.is_folder:
-                # execute local processing
-                out_files, stats = self.transform.transform_binary(file_name=f_name, byte_array=filedata)
-                name_extension = TransformUtils.get_file_extension(f_name)
-                self.last_file_name = name_extension[0]
                 self.last_file_name_next_index = None
-                self.last_extension = name_extension[1]
-            else:
-                out_files, stats = self.transform.transform(folder_name=f_name)
-                self.last_file_name = f_name
+                self.last_extension = TransformUtils.get_file_extension(f_name)[1]
             self.logger.debug(f"Done transforming file {f_name}, got {len(out_files)} files")
-            # save results
-            self._submit_file(t_start=t_start, out_files=out_files, stats=stats)
+            self._submit_file(t_start=t_start, out_files=out_files, stats=stats, f_name=completed)
         # Process unrecoverable exceptions
         except UnrecoverableException as _:
             self.logger.warning(f"Transform has thrown unrecoverable exception processing file {f_name}. Exiting...")
@@ -96,57 +263,69 @@ class AbstractTransformFileProcessor:
             self.logger.warning(f"Exception processing file {f_name}: {traceback.format_exc()}")
             self._publish_stats({"transform execution exception": 1})
 
-    def flush(self) -> None:
+    def flush(self, flush_transform: bool = True) -> None:
         """
         This is supporting method for transformers, that implement buffering of data, for example resize.
         These transformers can have buffers containing data that were not written to the output. Flush is
-        the hook for them to return back locally stored data and their statistics.
+        the hook for them to return back locally stored data and their statistics. It also completes all
+        outstanding background writes
+        :param flush_transform: flag to flush the transform, False if the transform is shared with another
+                                processor, that flushes it
         :return: None
         """
-        if self.last_file_name is None or self.is_folder:
+        # complete outstanding writes so that their sources are recorded as completed
+        self._complete_writes(max_pending=0)
+        # drop files read ahead, that were never processed
+        self.prefetched = {}
+        if not flush_transform:
+            self.logger.debug("skipping flush of the transform, it is flushed by another processor")
+        elif self.last_file_name is None or self.is_folder:
             # for some reason a given worker never processed anything. Happens in testing
             # when the amount of workers is greater than the amount of files
             self.logger.debug("skipping flush, no name for file is defined or this is a folder transform")
-            return
-        try:
-            t_start = time.time()
-            # get flush results
-            self.logger.debug(
-                f"Begin flushing transform, last file name {self.last_file_name}, "
-                f"last index {self.last_file_name_next_index}"
-            )
-            out_files, stats = self.transform.flush_binary()
-            self.logger.debug(f"Done flushing transform, got {len(out_files)} files")
-            # Here we are using the name of the last file, that we were processing
-            self._submit_file(t_start=t_start, out_files=out_files, stats=stats)
-        except Exception as e:
-            self.logger.warning(f"Exception {e} flushing: {traceback.format_exc()}")
-            self._publish_stats({"transform execution exception": 1})
+        else:
+            try:
+                t_start = time.time()
+                # get flush results
+                self.logger.debug(
+                    f"Begin flushing transform, last file name {self.last_file_name}, "
+                    f"last index {self.last_file_name_next_index}"
+                )
+                out_files, stats = self.transform.flush_binary()
+                self.logger.debug(f"Done flushing transform, got {len(out_files)} files")
+                # Here we are using the name of the last file, that we were processing
+                self._submit_file(t_start=t_start, out_files=out_files, stats=stats)
+                self._complete_writes(max_pending=0)
+            except Exception as e:
+                self.logger.warning(f"Exception {e} flushing: {traceback.format_exc()}")
+                self._publish_stats({"transform execution exception": 1})
+        # save completed files, that are still buffered
+        retries = self.data_access.flush_completed_files()
+        if retries > 0:
+            self._publish_stats({"data access retries": retries})
 
-    def _submit_file(self, t_start: float, out_files: list[tuple[bytes, str]], stats: dict[str, Any]) -> None:
+    def _submit_file(
+        self, t_start: float, out_files: list[tuple[bytes, str]], stats: dict[str, Any], f_name: str = None
+    ) -> None:
         """
         This is a helper method writing output files and statistics
         :param t_start: execution start time
         :param out_files: list of files to write
         :param stats: execution statistics to populate
+        :param f_name: name of the source file, recorded as completed once all outputs are written
         :return: None
         """
         self.logger.debug(
             f"submitting files under file named {self.last_file_name}{self.last_extension} "
             f"number of files {len(out_files)}"
         )
+        writes = []
         match len(out_files):
             case 0:
                 # no output file - save input file name for flushing
                 self.logger.debug(
                     f"Transform did not produce a transformed file for " f"file {self.last_file_name}.parquet"
                 )
-                self._publish_stats(
-                    {
-                        "result_files": len(out_files),
-                        "processing_time": time.time() - t_start,
-                    }
-                )
             case 1:
                 # we have exactly 1 output file
                 if self.is_folder:
@@ -163,27 +342,13 @@ class AbstractTransformFileProcessor:
                 self.logger.debug(
                     f"Writing transformed file {self.last_file_name}{self.last_extension} to {output_name}"
                 )
-                save_res, retries = self.data_access.save_file(path=output_name, data=dt)
-                if retries > 0:
-                    self._publish_stats({"data access retries": retries})
-                if save_res is None:
-                    self.logger.warning(f"Failed to write file {output_name}")
-                    self._publish_stats({"failed_writes": 1})
-                # Store execution statistics. Doing this async
-                self._publish_stats(
-                    {
-                        "result_files": 1,
-                        "result_size": len(dt),
-                        "processing_time": time.time() - t_start,
-                    }
-                )
+                writes.append((output_name, dt))
                 if self.last_file_name_next_index is None:
                     self.last_file_name_next_index = 0
                 else:
                     self.last_file_name_next_index += 1
             case _:
                 # we have more than 1 file
-                file_sizes = 0
                 output_file_name = self.data_access.get_output_location(path=self.last_file_name)
                 start_index = self.last_file_name_next_index
                 if start_index is None:
@@ -203,25 +368,101 @@ class AbstractTransformFileProcessor:
                             f"of {count}  to {output_name_indexed}"
                         )
                         dt = file_ext[0]
-                    file_sizes += len(dt)
-                    save_res, retries = self.data_access.save_file(path=output_name_indexed, data=dt)
-                    if retries > 0:
-                        self._publish_stats({"data access retries": retries})
-                    if save_res is None:
-                        self.logger.warning(f"Failed to write file {output_name_indexed}")
-                        self._publish_stats({"failed_writes": 1})
-                        break
+                    writes.append((output_name_indexed, dt))
                 self.last_file_name_next_index = start_index + count
-                self._publish_stats(
-                    {
-                        "result_files": len(out_files),
-                        "result_size": file_sizes,
-                        "processing_time": time.time() - t_start,
-                    }
-                )
         # save transformer's statistics
         if len(stats) > 0:
             self._publish_stats(stats)
+        if len(writes) == 0:
+            self._publish_stats({"result_files": 0, "processing_time": time.time() - t_start})
+            # source file without outputs (e.g. all rows are filtered out) is completed as well
+            self._add_completed_file(f_name=f_name)
+            return
+        result_size = sum(len(dt) for _, dt in writes)
+        if self.write_behind == 0:
+            # write synchronously
+            saved, retries = self._write_files(writes=writes)
+            self._complete_write(
+                t_start=t_start, n_files=len(writes), size=result_size, f_name=f_name, saved=saved, retries=retries
+            )
+            return
+        # write behind. Wait for the oldest writes to complete, if there are too many outstanding
+        self._complete_writes(max_pending=self.write_behind - 1)
+        if self.write_executor is None:
+            self.write_executor = ThreadPoolExecutor(max_workers=self.write_behind, thread_name_prefix="write_behind")
+        write = self.write_executor.submit(self._write_files, writes)
+        self.pending_writes.append((write, t_start, len(writes), result_size, f_name))
+
+    def _write_files(self, writes: list[tuple[str, bytes]]) -> tuple[bool, int]:
+        """
+        Write output files. Writing stops on the first failure
+        :param writes: list of output file names and their content
+        :return: a tuple of a flag whether all files were written and the number of retries
+        """
+        retries = 0
+        for output_name, dt in writes:
+            save_res, save_retries = self.data_access.save_file(path=output_name, data=dt)
+            retries += save_retries
+            if save_res is None:
+                self.logger.warning(f"Failed to write file {output_name}")
+                return False, retries
+        return True, retries
+
+    def _complete_writes(self, max_pending: int) -> None:
+        """
+        Complete background writes (in the order of submission), until at most max_pending writes
+        are outstanding. Writes, that are already done are always completed.
+        :param max_pending: maximum number of outstanding writes to leave
+        :return: None
+        """
+        while len(self.pending_writes) > 0 and (
+            len(self.pending_writes) > max_pending or self.pending_writes[0][0].done()
+        ):
+            write, t_start, n_files, size, f_name = self.pending_writes.popleft()
+            try:
+                saved, retries = write.result()
+            except UnrecoverableException as _:
+                self.logger.warning("Unrecoverable exception writing results. Exiting...")
+                raise UnrecoverableException
+            except Exception as e:
+                self.logger.warning(f"Exception writing results: {e}")
+                saved = False
+                retries = 0
+            self._complete_write(
+                t_start=t_start, n_files=n_files, size=size, f_name=f_name, saved=saved, retries=retries
+            )
+
+    def _complete_write(self, t_start: float, n_files: int, size: int, f_name: str, saved: bool, retries: int) -> None:
+        """
+        Publish write statistics and record source file as completed
+        :param t_start: execution start time
+        :param n_files: number of output files
+        :param size: total size of the output files
+        :param f_name: name of the source file or None
+        :param saved: flag whether all files were written
+        :param retries: number of retries
+        :return: None
+        """
+        if retries > 0:
+            self._publish_stats({"data access retries": retries})
+        if not saved:
+            self._publish_stats({"failed_writes": 1})
+        # Store execution statistics
+        self._publish_stats({"result_files": n_files, "result_size": size, "processing_time": time.time() - t_start})
+        if saved:
+            self._add_completed_file(f_name=f_name)
+
+    def _add_completed_file(self, f_name: str) -> None:
+        """
+        Record source file as completed for checkpointing
+        :param f_name: name of the source file or None
+        :return: None
+        """
+        if f_name is None:
+            return
+        retries = self.data_access.add_completed_file(path=f_name)
+        if retries > 0:
+            self._publish_stats({"data access retries": retries})
 
     def _publish_stats(self, stats: dict[str, Any]) -> None:
         """
@@ -67,11 +67,19 @@ class AbstractTransformLauncher:
         and does parameters validation
         :return: True if validation passes or False, if not
         """
-        return (
-                self.runtime_config.apply_input_params(args=args)
-                and self.execution_config.apply_input_params(args=args)
-                and self.data_access_factory.apply_input_params(args=args)
-        )
+        if not (
+            self.runtime_config.apply_input_params(args=args)
+            and self.execution_config.apply_input_params(args=args)
+            and self.data_access_factory.apply_input_params(args=args)
+        ):
+            return False
+        if self.execution_config.stream_row_groups:
+            # streaming is implemented by the table transforms, that support it, pass the flag to them
+            if getattr(self.runtime_config.get_transform_class(), "supports_streaming", False):
+                self.runtime_config.get_transform_params()["stream_row_groups"] = True
+            else:
+                logger.warning(f"Transform {self.name} does not support streaming, processing complete files")
+        return True
 
     def _submit_for_execution(self) -> int:
         """
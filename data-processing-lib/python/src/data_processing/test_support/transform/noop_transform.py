@@ -38,6 +38,15 @@ class NOOPTransform(AbstractTableTransform):
     Implements a simple copy of a pyarrow Table.
     """
 
+    # rows are processed independently, so files can be streamed one row group at a time. Number of rows is
+    # summed across row groups in the streaming mode, number of files is not
+    supports_streaming = True
+    file_stats = ["nfiles"]
+    # rows are processed independently, so files can be split into parts
+    supports_file_parts = True
+    # transform has no state, so a single instance can be shared by several threads
+    thread_safe = True
+
     def __init__(self, config: dict[str, Any]):
         """
         Initialize based on the dictionary of configuration information.
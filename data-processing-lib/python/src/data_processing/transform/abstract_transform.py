@@ -13,4 +13,9 @@
 class AbstractTransform:
     """
     Base class for all transform types
-    """
\ No newline at end of file
+    """
+
+    # transform methods can be invoked concurrently by several threads, so that a single instance is shared by
+    # them (see runtime_num_threads of the python runtime). Transforms have to opt in, setting it to True, as this
+    # is only correct for the ones without mutable state, except for the thread safe one (e.g. locked caches)
+    thread_safe = False
\ No newline at end of file
@@ -19,8 +19,17 @@ class AbstractBinaryTransform(AbstractTransform):
     Converts input binary file to output file(s) (binary)
     Sub-classes must provide the transform() method to provide the conversion of one binary files to 0 or
     more new binary files.
+    Transforms, that can process any bytes-like object supporting buffer protocol (e.g. pyarrow Buffer)
+    in transform_binary(), can set zero_copy_input to True to receive zero-copy (e.g. memory mapped)
+    buffers instead of bytes.
+    Transforms, that can process a part (range of row groups) of a parquet file, implement
+    transform_binary_part() and set supports_file_parts to True. This allows runtimes to split very
+    large files across several workers.
     """
 
+    zero_copy_input = False
+    supports_file_parts = False
+
     def __init__(self, config: dict[str, Any]):
         """
         Initialize based on the dictionary of configuration information.
@@ -40,6 +49,21 @@ class AbstractBinaryTransform(AbstractTransform):
         """
         raise NotImplemented()
 
+    def transform_binary_part(
+        self, file_name: str, byte_array: bytes, part: int, n_parts: int
+    ) -> tuple[list[tuple[bytes, str]], dict[str, Any]]:
+        """
+        Converts a part of the input file into 0 or more output files. The file is split into n_parts
+        parts containing consecutive ranges of its row groups. Only implemented by transforms setting
+        supports_file_parts to True
+        :param file_name: the name of the file containing the given byte_array.
+        :param byte_array: contents of the complete input file.
+        :param part: index of the part to transform
+        :param n_parts: number of parts the file is split into
+        :return: same as transform_binary()
+        """
+        raise NotImplemented()
+
     def flush_binary(self) -> tuple[list[tuple[bytes, str]], dict[str, Any]]:
         """
         This is supporting method for transformers, that implement buffering of data, for example coalesce.
@@ -10,9 +10,12 @@
 # limitations under the License.
 ################################################################################
 
+import time
 from typing import Any
 
+import numpy as np
 import pyarrow as pa
+import pyarrow.parquet as pq
 from data_processing.transform import AbstractBinaryTransform
 from data_processing.utils import TransformUtils
 
@@ -21,8 +24,38 @@ class AbstractTableTransform(AbstractBinaryTransform):
     """
     Extends AbstractBinaryTransform to expect the byte arrays from to contain a pyarrow Table.
     Sub-classes are expected to implement transform() on the parsed Table instances.
+    Transforms, that do not need to see the complete table at once, can support the streaming mode by setting
+    supports_streaming. It is then used, if "stream_row_groups" is True in their configuration (or the
+    runtime_stream_row_groups option is used). In this mode the input file is read one row group at a time,
+    every row group is passed to transform_batch() and the results are written incrementally into a single
+    output file, so that the decoded tables are bounded by the row group and not the file size. The encoded
+    input and output files are still kept in memory. Numeric statistics are summed across the row groups,
+    except for the ones listed in file_stats, which are reported once per file.
+    Transforms, that only use some of the columns, can declare them in read_columns (and optionally row filters
+    in read_filters), either in their configuration or by setting these attributes in their initializer.
+    Only these columns and matching rows are then read and passed to transform(). Other columns are passed
+    through to the output (unless pass_through_columns is False) without being seen by the transform. They
+    are matched to the output rows using the ROW_INDEX_COLUMN column, added to the table passed to transform(),
+    if the transform keeps it (e.g. when it filters rows), or by position, if the number of rows is unchanged.
+    Projection is not applied in the streaming mode.
+    Large files can be split into parts, each containing a range of row groups, which are transformed
+    independently (see transform_binary_part()), if the transform sets supports_file_parts.
     """
 
+    ROW_INDEX_COLUMN = "__row_index"
+
+    # input bytes are only parsed by pyarrow, so zero-copy buffers can be used
+    zero_copy_input = True
+    # row groups of a parquet file can be read independently (see transform_binary_part()), but transforms have
+    # to opt in, setting it to True, as this is only correct for the ones processing every row independently
+    supports_file_parts = False
+    # transform_batch() can process the file one row group at a time. Transforms have to opt in, setting it to
+    # True, as this is only correct for the ones, that do not need the complete file (e.g. dedup or numbering)
+    supports_streaming = False
+    # statistics of transform_batch(), that are file level, not summed across row groups in the streaming mode,
+    # but taken from the first row group reporting them. Numeric statistics are summed by default
+    file_stats = []
+
     def __init__(self, config: dict[str, Any]):
         """
         Initialize based on the dictionary of configuration information.
@@ -31,6 +64,14 @@ class AbstractTableTransform(AbstractBinaryTransform):
 
         super().__init__(config)
         self.logger = get_logger(__name__)
+        self.stream_row_groups = config.get("stream_row_groups", False) and self.supports_streaming
+        self.read_columns = config.get("read_columns", None)
+        self.read_filters = config.get("read_filters", None)
+        self.pass_through_columns = config.get("pass_through_columns", True)
+        # parquet write profile. If it is specified, bytes and time of writing per codec are added to statistics
+        self.write_profile = config.get("write_profile", None)
+        # row groups to read, set while transforming a part of the file
+        self.row_groups = None
 
     def transform_binary(self, file_name: str, byte_array: bytes) -> tuple[list[tuple[bytes, str]], dict[str, Any]]:
         """
@@ -46,8 +87,16 @@ class AbstractTableTransform(AbstractBinaryTransform):
         if TransformUtils.get_file_extension(file_name)[1] != ".parquet":
             self.logger.warning(f"Get wrong file type {file_name}")
             return [], {"wrong file type": 1}
+        if self.stream_row_groups:
+            # process the file row group by row group
+            result = self._transform_binary_streaming(file_name=file_name, byte_array=byte_array)
+            if result is not None:
+                return result
+            self.logger.info(f"Streaming read of {file_name} failed, falling back to reading complete table")
         # convert to table
-        table = TransformUtils.convert_binary_to_arrow(data=byte_array)
+        table = TransformUtils.convert_binary_to_arrow(
+            data=byte_array, columns=self.read_columns, filters=self.read_filters, row_groups=self.row_groups
+        )
         if table is None:
             self.logger.warning("Transformation of file to table failed")
             return [], {"failed_reads": 1}
@@ -55,8 +104,13 @@ class AbstractTableTransform(AbstractBinaryTransform):
         if table.num_rows == 0:
             self.logger.warning(f"table is empty, skipping processing")
             return [], {"skipped empty tables": 1}
+        pass_through = self.read_columns is not None and self.pass_through_columns
+        if pass_through:
+            table = table.append_column(self.ROW_INDEX_COLUMN, pa.array(np.arange(table.num_rows)))
         # transform table
         out_tables, stats = self.transform(table=table, file_name=file_name)
+        if pass_through:
+            out_tables = self._pass_through_columns(byte_array=byte_array, out_tables=out_tables)
         # Add number of rows to stats
         stats = stats | {"source_doc_count": table.num_rows}
         # convert tables to files
@@ -64,6 +118,49 @@ class AbstractTableTransform(AbstractBinaryTransform):
             out_tables=out_tables, stats=stats | {"source_doc_count": table.num_rows}
         )
 
+    def transform_binary_part(
+        self, file_name: str, byte_array: bytes, part: int, n_parts: int
+    ) -> tuple[list[tuple[bytes, str]], dict[str, Any]]:
+        """
+        Converts a part of the input file - a consecutive range of its row groups - into 0 or more output files.
+        If there are less row groups than parts, some of the parts are empty and produce no output.
+        :param file_name: the file name of the file containing the given byte_array.
+        :param byte_array: contents of the complete input file.
+        :param part: index of the part to transform
+        :param n_parts: number of parts the file is split into
+        :return: same as transform_binary()
+        """
+        try:
+            n_row_groups = pq.read_metadata(pa.BufferReader(byte_array)).num_row_groups
+        except Exception as e:
+            self.logger.warning(f"Could not read metadata of {file_name}: {e}")
+            return [], {"failed_reads": 1}
+        row_groups = list(range(part * n_row_groups // n_parts, (part + 1) * n_row_groups // n_parts))
+        if len(row_groups) == 0:
+            return [], {}
+        self.row_groups = row_groups
+        try:
+            return self.transform_binary(file_name=file_name, byte_array=byte_array)
+        finally:
+            self.row_groups = None
+
+    def transform_table(self, file_name: str, table: pa.Table) -> tuple[list[tuple[bytes, str]], dict[str, Any]]:
+        """
+        Converts already read input table into 0 or more output files. Used by runtimes reading the
+        input in separate processes. The table contains all the columns of the file, so neither read
+        columns nor row filters are applied
+        :param file_name: the file name of the file containing the given table.
+        :param table: content of the input file
+        :return: same as transform_binary()
+        """
+        if table.num_rows == 0:
+            self.logger.warning(f"table is empty, skipping processing")
+            return [], {"skipped empty tables": 1}
+        out_tables, stats = self.transform(table=table, file_name=file_name)
+        return self._check_and_convert_tables(
+            out_tables=out_tables, stats=stats | {"source_doc_count": table.num_rows}
+        )
+
     def transform(self, table: pa.Table, file_name: str = None) -> tuple[list[pa.Table], dict[str, Any]]:
         """
         Converts input table into an output table.
@@ -75,6 +172,31 @@ class AbstractTableTransform(AbstractBinaryTransform):
         """
         raise NotImplemented("This method must be implemented by the subclass")
 
+    def transform_batch(self, batch: pa.Table, file_name: str = None) -> tuple[list[pa.Table], dict[str, Any]]:
+        """
+        Converts a single row group of the input file into 0 or more tables. Used in the streaming mode only.
+        All returned tables are appended to the same output file and thus have to have the same schema.
+        Default implementation delegates to transform(), which works for transforms processing rows
+        independently. Transforms requiring different behaviour for batches should override this method.
+        If there is an error, an exception must be raised - exit()ing is not generally allowed.
+        :param batch: table containing a single row group of the input file
+        :param file_name: the file name of the file containing the given batch.
+        :return: a tuple of a list of 0 or more converted tables and a dictionary of statistics that will be
+        propagated to metadata
+        """
+        return self.transform(table=batch, file_name=file_name)
+
+    def get_output_schema(self, schema: pa.Schema) -> pa.Schema:
+        """
+        Get schema of the tables returned by transform() for the input tables of the given schema, if it is known
+        without transforming any data. Used by the runtimes, that need the output schema before processing (Spark
+        data frame execution), otherwise they transform a sample of the input to get it. Transforms, whose
+        transform() has side effects, should implement it
+        :param schema: input schema
+        :return: output schema or None, if it is not declared
+        """
+        return None
+
     def flush_binary(self) -> tuple[list[tuple[bytes, str]], dict[str, Any]]:
         """
         This is supporting method for transformers, that implement buffering of tables, for example coalesce.
@@ -106,14 +228,156 @@ class AbstractTableTransform(AbstractBinaryTransform):
 
         out_files = [tuple[bytes, str]] * len(out_tables)
         out_docs = 0
+        write_time = 0
+        write_size = 0
         for i in range(len(out_tables)):
             if not TransformUtils.verify_no_duplicate_columns(table=out_tables[i], file=""):
                 self.logger.warning("Transformer created file with the duplicate columns")
                 return [], {"duplicate columns result": 1}
-            out_binary = TransformUtils.convert_arrow_to_binary(table=out_tables[i])
+            if self.write_profile is None:
+                out_binary = TransformUtils.convert_arrow_to_binary(table=out_tables[i])
+            else:
+                start = time.time()
+                out_binary = TransformUtils.convert_arrow_to_binary(
+                    table=out_tables[i], write_profile=self.write_profile
+                )
+                write_time += time.time() - start
             if out_binary is None:
                 self.logger.warning("Failed to convert table to binary")
                 return [], {"failed_writes": 1}
+            write_size += len(out_binary)
             out_docs += out_tables[i].num_rows
             out_files[i] = (out_binary, ".parquet")
-        return out_files, stats | {"result_doc_count": out_docs}
+        return out_files, stats | {"result_doc_count": out_docs} | self._write_stats(
+            size=write_size, w_time=write_time
+        )
+
+    def _write_stats(self, size: int, w_time: float) -> dict[str, Any]:
+        """
+        Build parquet write statistics. Statistics are only reported if the write profile is specified
+        :param size: number of bytes written
+        :param w_time: write time
+        :return: statistics dictionary
+        """
+        if self.write_profile is None or size == 0:
+            return {}
+        codec = TransformUtils.get_parquet_write_options(write_profile=self.write_profile)["compression"]
+        return {f"parquet {codec} bytes": size, f"parquet {codec} write time": w_time}
+
+    def _pass_through_columns(self, byte_array: bytes, out_tables: list[pa.Table]) -> list[pa.Table]:
+        """
+        Add columns, that were not read for the transform, to its output tables. The original column order
+        is preserved, new columns created by the transform are placed at the end
+        :param byte_array: contents of the input file
+        :param out_tables: transform's output tables
+        :return: output tables with all the columns
+        """
+        schema = pq.read_schema(pa.BufferReader(byte_array))
+        untouched = [name for name in schema.names if name not in self.read_columns]
+        rest = None
+        if len(untouched) > 0 and len(out_tables) > 0:
+            rest = TransformUtils.convert_binary_to_arrow(
+                data=byte_array, columns=untouched, filters=self.read_filters, row_groups=self.row_groups
+            )
+            if rest is None:
+                raise Exception("Failed to read columns to pass through")
+        result = []
+        for table in out_tables:
+            if self.ROW_INDEX_COLUMN in table.column_names:
+                indices = table.column(self.ROW_INDEX_COLUMN)
+                table = table.drop_columns([self.ROW_INDEX_COLUMN])
+                extra = None if rest is None else rest.take(indices)
+            elif rest is None or table.num_rows == rest.num_rows:
+                extra = rest
+            else:
+                raise Exception(
+                    f"Transform changed the number of rows from {rest.num_rows} to {table.num_rows} and dropped "
+                    f"{self.ROW_INDEX_COLUMN}, columns {untouched} can not be passed through"
+                )
+            if extra is not None:
+                for name in extra.column_names:
+                    if name not in table.column_names:
+                        table = table.append_column(extra.schema.field(name), extra.column(name))
+                # restore original column order
+                original = [name for name in schema.names if name in table.column_names]
+                table = table.select(original + [name for name in table.column_names if name not in original])
+            result.append(table)
+        return result
+
+    def _transform_binary_streaming(
+        self, file_name: str, byte_array: bytes
+    ) -> tuple[list[tuple[bytes, str]], dict[str, Any]]:
+        """
+        Streaming implementation of transform_binary(). The input file is read one row group at a time,
+        every row group is transformed by transform_batch() and the results are written out incrementally
+        :param file_name: the file name of the file containing the given byte_array.
+        :param byte_array: contents of the input file to be transformed.
+        :return: same as transform_binary() or None, if the input can not be read as a parquet file
+        """
+        try:
+            parquet_file = pq.ParquetFile(pa.BufferReader(byte_array))
+        except Exception as e:
+            self.logger.warning(f"Could not open {file_name} as a parquet file: {e}")
+            return None
+        row_groups = range(parquet_file.num_row_groups) if self.row_groups is None else self.row_groups
+        if sum(parquet_file.metadata.row_group(rg).num_rows for rg in row_groups) == 0:
+            self.logger.warning(f"table is empty, skipping processing")
+            return [], {"skipped empty tables": 1}
+        stats = {}
+        source_docs = 0
+        out_docs = 0
+        sink = None
+        writer = None
+        write_time = 0
+        write_options = TransformUtils.get_parquet_write_options(write_profile=self.write_profile)
+        row_group_size = write_options.pop("row_group_size", None)
+        for rg in row_groups:
+            rg_rows = parquet_file.metadata.row_group(rg).num_rows
+            if rg_rows == 0:
+                continue
+            # batch size equal to the row group size gives us exactly one batch per row group
+            for batch in parquet_file.iter_batches(batch_size=rg_rows, row_groups=[rg]):
+                source_docs += batch.num_rows
+                out_tables, batch_stats = self.transform_batch(
+                    batch=pa.Table.from_batches([batch]), file_name=file_name
+                )
+                for key, val in batch_stats.items():
+                    if key not in stats:
+                        stats[key] = val
+                    elif key not in self.file_stats and isinstance(val, (int, float)):
+                        stats[key] += val
+                for table in out_tables:
+                    if writer is None:
+                        # first output table defines the schema of the output file
+                        if not TransformUtils.verify_no_duplicate_columns(table=table, file=""):
+                            self.logger.warning("Transformer created file with the duplicate columns")
+                            return [], {"duplicate columns result": 1}
+                        sink = pa.BufferOutputStream()
+                        writer = pq.ParquetWriter(where=sink, schema=table.schema, **write_options)
+                    if not table.schema.equals(writer.schema):
+                        try:
+                            table = table.cast(writer.schema)
+                        except Exception as e:
+                            writer.close()
+                            raise Exception(
+                                f"Output schema of a row group of {file_name} {table.schema} does not match "
+                                f"the schema of the output file {writer.schema}: {e}"
+                            )
+                    try:
+                        start = time.time()
+                        writer.write_table(table, row_group_size=row_group_size)
+                        write_time += time.time() - start
+                    except Exception as e:
+                        self.logger.warning(f"Failed to write streaming results for {file_name}: {e}")
+                        writer.close()
+                        return [], {"failed_writes": 1}
+                    out_docs += table.num_rows
+        stats = stats | {"source_doc_count": source_docs, "result_doc_count": out_docs}
+        if writer is None:
+            # transform did not produce any output
+            return [], stats
+        start = time.time()
+        writer.close()
+        out_binary = bytes(sink.getvalue())
+        write_time += time.time() - start
+        return [(out_binary, ".parquet")], stats | self._write_stats(size=len(out_binary), w_time=write_time)
@@ -10,11 +10,22 @@
 # limitations under the License.
 ################################################################################
 
-from argparse import ArgumentParser
+from argparse import ArgumentParser, Namespace
 from typing import Any
 
 from data_processing.transform import AbstractTransform
-from data_processing.utils import CLIArgumentProvider
+from data_processing.utils import (
+    PARQUET_CODECS,
+    PARQUET_WRITE_OPTIONS,
+    CLIArgumentProvider,
+    get_logger,
+    str2bool,
+)
+
+
+logger = get_logger(__name__)
+
+parquet_cli_prefix = "parquet_"
 
 
 class TransformConfiguration(CLIArgumentProvider):
@@ -23,19 +34,93 @@ class TransformConfiguration(CLIArgumentProvider):
     """
 
     def __init__(
-        self, name: str, transform_class: type[AbstractTransform], remove_from_metadata: list[str] = []
+        self,
+        name: str,
+        transform_class: type[AbstractTransform],
+        remove_from_metadata: list[str] = [],
+        write_profile: dict[str, Any] = None,
     ):
         """
         Initialization
         :param name: transformer name
         :param transform_class: transform implementation class
         :param remove_from_metadata - list of parameters to remove from metadata
+        :param write_profile - transform specific default parquet write profile, see
+                TransformUtils.get_parquet_write_options
         """
         self.name = name
         self.transform_class = transform_class
         self.remove_from_metadata = remove_from_metadata
+        self.write_profile = write_profile
         self.params = {}
 
+    @staticmethod
+    def add_write_profile_params(parser: ArgumentParser) -> None:
+        """
+        Add parquet write profile arguments to the given parser. These are common for all transforms
+        :param parser: parser
+        :return: None
+        """
+        parser.add_argument(
+            f"--{parquet_cli_prefix}compression",
+            type=str,
+            default=None,
+            choices=PARQUET_CODECS,
+            help="compression codec used for writing parquet files, default zstd",
+        )
+        parser.add_argument(
+            f"--{parquet_cli_prefix}compression_level",
+            type=int,
+            default=None,
+            help="compression level of the codec, default - codec specific",
+        )
+        parser.add_argument(
+            f"--{parquet_cli_prefix}row_group_size",
+            type=int,
+            default=None,
+            help="maximum number of rows in a row group of written parquet files, default - pyarrow specific",
+        )
+        parser.add_argument(
+            f"--{parquet_cli_prefix}use_dictionary",
+            type=lambda x: bool(str2bool(x)),
+            default=None,
+            help="use dictionary encoding for written parquet files, default True",
+        )
+        parser.add_argument(
+            f"--{parquet_cli_prefix}write_statistics",
+            type=lambda x: bool(str2bool(x)),
+            default=None,
+            help="write column statistics to written parquet files, default True",
+        )
+        parser.add_argument(
+            f"--{parquet_cli_prefix}write_page_index",
+            type=lambda x: bool(str2bool(x)),
+            default=None,
+            help="write page index to written parquet files, default False",
+        )
+
+    def apply_write_profile_params(self, args: Namespace) -> bool:
+        """
+        Validate and apply parquet write profile arguments. The resulting profile (transform default
+        overwritten by the values specified on the command line) is added to transform parameters.
+        If neither the default profile nor any of the arguments is specified, no profile is added
+        (pyarrow defaults are used and no parquet write statistics are collected)
+        :param args: user defined arguments
+        :return: True, if validate pass or False otherwise
+        """
+        captured = CLIArgumentProvider.capture_parameters(args, parquet_cli_prefix, False)
+        specified = {key: captured[key] for key in PARQUET_WRITE_OPTIONS if captured.get(key, None) is not None}
+        if self.write_profile is None and len(specified) == 0:
+            return True
+        profile = {} if self.write_profile is None else dict(self.write_profile)
+        profile |= specified
+        row_group_size = profile.get("row_group_size", None)
+        if row_group_size is not None and row_group_size <= 0:
+            logger.error(f"parquet row group size should be greater than 0, specified {row_group_size}")
+            return False
+        self.params["write_profile"] = profile
+        return True
+
     def get_transform_class(self) -> type[AbstractTransform]:
         """
         Get the class extending AbstractBinaryTransform which implements a specific transformation.
@@ -10,6 +10,7 @@
 # limitations under the License.
 ################################################################################
 
+import threading
 from typing import Any
 
 
@@ -40,3 +41,25 @@ class TransformStatistics:
         :return:
         """
         return self.stats
+
+
+class ThreadSafeTransformStatistics(TransformStatistics):
+    """
+    Statistics class, that can be shared by multiple threads
+    """
+
+    def __init__(self):
+        """
+        Init - setting up variables and the lock protecting them
+        """
+        super().__init__()
+        self.lock = threading.Lock()
+
+    def add_stats(self, stats: dict[str, Any]) -> None:
+        """
+        Add statistics
+        :param stats - dictionary creating new statistics
+        :return: None
+        """
+        with self.lock:
+            super().add_stats(stats)
@@ -13,17 +13,46 @@
 import hashlib
 import io
 import os
+import re
 import string
 import sys
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, Union
 
 import mmh3
 import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.parquet as pq
+import xxhash
 
 
 RANDOM_SEED = 42
 LOCAL_TO_DISK = 2
+# parquet write profile. Keys are the names of pyarrow.parquet.write_table parameters
+PARQUET_WRITE_OPTIONS = [
+    "compression",
+    "compression_level",
+    "row_group_size",
+    "use_dictionary",
+    "write_statistics",
+    "write_page_index",
+]
+PARQUET_CODECS = ["none", "snappy", "gzip", "brotli", "lz4", "zstd"]
+DEFAULT_WRITE_PROFILE = {"compression": "zstd"}
+# hash algorithms supported for arrays
+HASH_ALGORITHMS = ["sha256", "murmur3_32", "murmur3_64", "murmur3_128", "xxh3_64", "xxh3_128"]
+# hash algorithms, which implementations release GIL, so that arrays are hashed by several threads. hashlib
+# releases it for values of at least 2 KB, xxhash for all values, mmh3 does not release it
+HASH_PARALLEL_ALGORITHMS = ["sha256", "xxh3_64", "xxh3_128"]
+# minimum total size of the values of an array slice hashed by a single thread
+HASH_SLICE_SIZE = 1024 * 1024
+# maximum number of threads hashing an array
+HASH_THREADS = min(os.cpu_count() or 1, 8)
+# characters removed by the string normalization
+NORMALIZE_PATTERN = f"[ \\n{re.escape(string.punctuation)}]"
+# name of the part of the file, optionally followed by the index of its output file
+FILE_PART_PATTERN = re.compile(r"^(.*)_part(\d+)of(\d+)(?:_\d+)?$")
 
 
 class TransformUtils:
@@ -31,6 +60,9 @@ class TransformUtils:
     Class implementing support methods for filter implementation
     """
 
+    # thread pool hashing slices of arrays (see hash_array), created on the first use
+    _hash_executor = None
+
     @staticmethod
     def deep_get_size(ob) -> int:
         """
@@ -77,6 +109,131 @@ class TransformUtils:
         """
         return mmh3.hash(s, seed=RANDOM_SEED, signed=False)
 
+    @staticmethod
+    def normalize_array(array: Union[pa.Array, pa.ChunkedArray]) -> Union[pa.Array, pa.ChunkedArray]:
+        """
+        Normalize all the strings of an array, producing the same strings as normalize_string. ASCII strings are
+        normalized using Arrow compute functions, the rest (where Unicode lower casing of Arrow and Python
+        differs, e.g. for "İ") using normalize_string. Nulls are preserved
+        :param array: array or chunked array of strings
+        :return: array of the normalized strings
+        """
+        if isinstance(array, pa.ChunkedArray):
+            return pa.chunked_array([TransformUtils.normalize_array(chunk) for chunk in array.chunks], type=array.type)
+        normalized = pc.replace_substring_regex(pc.ascii_lower(array), pattern=NORMALIZE_PATTERN, replacement="")
+        non_ascii = pc.invert(pc.string_is_ascii(array))
+        if not pc.any(non_ascii).as_py():
+            return normalized
+        replacements = [TransformUtils.normalize_string(doc) for doc in array.filter(non_ascii).to_pylist()]
+        return pc.replace_with_mask(normalized, non_ascii, pa.array(replacements, type=array.type))
+
+    @staticmethod
+    def hash_array(
+        array: Union[pa.Array, pa.ChunkedArray], algorithm: str = "sha256", seed: int = RANDOM_SEED
+    ) -> pa.Array:
+        """
+        Compute hashes of all the values of an array of strings (or binaries). The values are sliced from the
+        Arrow data buffer, without converting them to Python strings, and passed to the native hash function.
+        For the algorithms releasing GIL (HASH_PARALLEL_ALGORITHMS), large arrays are split into slices
+        hashed by a pool of threads, so hashing of the slices runs in parallel. sha256 and murmur3_32 hashes
+        (with the default seed) are the same as the ones of str_to_hash and str_to_int
+        :param array: array or chunked array of strings or binaries
+        :param algorithm: hash algorithm, one of HASH_ALGORITHMS:
+            sha256 - hex digest strings,
+            murmur3_32 - uint32,
+            murmur3_64 - uint64,
+            murmur3_128 - 16 bytes digests (fixed size binary),
+            xxh3_64 - uint64,
+            xxh3_128 - 16 bytes digests (fixed size binary)
+        :param seed: seed of the murmur3 and xxh3 hashes, not used by sha256
+        :return: array of hashes, containing nulls for null values
+        """
+        hash_function, hash_type = TransformUtils._get_hash_function(algorithm=algorithm, seed=seed)
+        chunks = array.chunks if isinstance(array, pa.ChunkedArray) else [array]
+        hashes = [
+            TransformUtils._hash_chunk(
+                chunk=chunk,
+                hash_function=hash_function,
+                hash_type=hash_type,
+                parallel=algorithm in HASH_PARALLEL_ALGORITHMS,
+            )
+            for chunk in chunks
+        ]
+        if len(hashes) == 0:
+            return pa.array([], type=hash_type)
+        if len(hashes) == 1:
+            return hashes[0]
+        return pa.concat_arrays(hashes)
+
+    @staticmethod
+    def _get_hash_function(algorithm: str, seed: int) -> tuple[Callable[[Any], Any], pa.DataType]:
+        """
+        Get hash function for a hash algorithm
+        :param algorithm: hash algorithm, one of HASH_ALGORITHMS
+        :param seed: hash seed
+        :return: hash function, accepting bytes-like objects, and type of the produced hashes
+        """
+        if algorithm == "sha256":
+            return lambda value: hashlib.sha256(value).hexdigest(), pa.string()
+        if algorithm == "murmur3_32":
+            return lambda value: mmh3.mmh3_32_uintdigest(value, seed), pa.uint32()
+        if algorithm == "murmur3_64":
+            return lambda value: mmh3.mmh3_x64_128_utupledigest(value, seed)[0], pa.uint64()
+        if algorithm == "murmur3_128":
+            return lambda value: mmh3.mmh3_x64_128_digest(value, seed), pa.binary(16)
+        if algorithm == "xxh3_64":
+            return lambda value: xxhash.xxh3_64_intdigest(value, seed), pa.uint64()
+        if algorithm == "xxh3_128":
+            return lambda value: xxhash.xxh3_128_digest(value, seed), pa.binary(16)
+        raise ValueError(f"unsupported hash algorithm {algorithm}, supported algorithms {HASH_ALGORITHMS}")
+
+    @staticmethod
+    def _hash_chunk(
+        chunk: pa.Array, hash_function: Callable[[Any], Any], hash_type: pa.DataType, parallel: bool = False
+    ) -> pa.Array:
+        """
+        Compute hashes of all the values of a single array, slicing them from its data buffer using its offsets
+        :param chunk: array of strings or binaries
+        :param hash_function: hash function
+        :param hash_type: type of the hashes
+        :param parallel: flag to hash slices of the array, larger than HASH_SLICE_SIZE, in parallel threads.
+                         Only useful if the hash function releases GIL
+        :return: array of hashes
+        """
+        if pa.types.is_string(chunk.type) or pa.types.is_binary(chunk.type):
+            offset_type = pa.int32()
+        elif pa.types.is_large_string(chunk.type) or pa.types.is_large_binary(chunk.type):
+            offset_type = pa.int64()
+        else:
+            raise TypeError(f"hashes can only be computed for strings or binaries, not {chunk.type}")
+        if len(chunk) == 0:
+            return pa.array([], type=hash_type)
+        _, offsets_buffer, data_buffer = chunk.buffers()
+        offsets = pa.Array.from_buffers(offset_type, len(chunk) + 1, [None, offsets_buffer], offset=chunk.offset)
+        offsets = offsets.to_numpy().tolist()
+        # data buffer is missing when all the values are empty
+        data = memoryview(data_buffer if data_buffer is not None else b"")
+
+        def hash_slice(bounds: tuple[int, int]) -> list[Any]:
+            return [hash_function(data[offsets[i] : offsets[i + 1]]) for i in range(bounds[0], bounds[1])]
+
+        n_slices = 1
+        if parallel:
+            n_slices = max(min(HASH_THREADS, (offsets[-1] - offsets[0]) // HASH_SLICE_SIZE, len(chunk)), 1)
+        if n_slices == 1:
+            values = hash_slice((0, len(chunk)))
+        else:
+            if TransformUtils._hash_executor is None:
+                TransformUtils._hash_executor = ThreadPoolExecutor(
+                    max_workers=HASH_THREADS, thread_name_prefix="hash_array"
+                )
+            slices = [(i * len(chunk) // n_slices, (i + 1) * len(chunk) // n_slices) for i in range(n_slices)]
+            values = [value for part in TransformUtils._hash_executor.map(hash_slice, slices) for value in part]
+        hashes = pa.array(values, type=hash_type)
+        if chunk.null_count > 0:
+            hashes = pc.if_else(chunk.is_valid(), hashes, pa.scalar(None, type=hash_type))
+        return hashes
+
     @staticmethod
     def decode_content(content_bytes: bytes, encoding: str = "utf-8") -> str:
         """
@@ -101,6 +258,30 @@ class TransformUtils:
         """
         return os.path.splitext(file_path)
 
+    @staticmethod
+    def get_file_part_name(file_name: str, part: int, n_parts: int) -> str:
+        """
+        Get the name (without extension) used for the outputs of a part of the file
+        :param file_name: file name without extension
+        :param part: index of the part
+        :param n_parts: number of parts the file is split into
+        :return: name of the part
+        """
+        return f"{file_name}_part{part}of{n_parts}"
+
+    @staticmethod
+    def get_file_part(name: str) -> tuple[str, int, int]:
+        """
+        Parse the name of a part of the file (see get_file_part_name), possibly followed by the index of its
+        output file
+        :param name: name without extension
+        :return: tuple of the file name, index of the part and number of parts or None, if it is not a part
+        """
+        match = FILE_PART_PATTERN.match(name)
+        if match is None:
+            return None
+        return match.group(1), int(match.group(2)), int(match.group(3))
+
     @staticmethod
     def get_file_basename(file_path) -> str:
         """
@@ -130,11 +311,22 @@ class TransformUtils:
             )
 
     @staticmethod
-    def convert_binary_to_arrow(data: bytes, schema: pa.schema = None) -> pa.Table:
+    def convert_binary_to_arrow(
+        data: bytes,
+        schema: pa.schema = None,
+        columns: list[str] = None,
+        filters: Any = None,
+        row_groups: list[int] = None,
+    ) -> pa.Table:
         """
         Convert byte array to table
         :param data: byte array
         :param schema: optional Arrow table schema used for reading table, default None
+        :param columns: optional list of columns to read, default None - all columns
+        :param filters: optional row filter (pyarrow compute expression or list of tuples in disjunctive
+                        normal form, see pyarrow.parquet.read_table), used to skip row groups and rows,
+                        default None
+        :param row_groups: optional list of consecutive row groups to read, default None - all row groups
         :return: table or None if the conversion failed
         """
         from data_processing.utils import get_logger
@@ -142,7 +334,13 @@ class TransformUtils:
         logger = get_logger(__name__)
         try:
             reader = pa.BufferReader(data)
-            table = pq.read_table(reader, schema=schema)
+            if row_groups is None:
+                table = pq.read_table(reader, schema=schema, columns=columns, filters=filters)
+            else:
+                table = pq.ParquetFile(reader).read_row_groups(row_groups, columns=columns)
+                if schema is not None:
+                    table = table.cast(schema)
+                table = TransformUtils._filter_table(table=table, filters=filters)
             return table
         except Exception as e:
             logger.warning(f"Could not convert bytes to pyarrow: {e}")
@@ -154,18 +352,53 @@ class TransformUtils:
         try:
             import polars
 
-            df = polars.read_parquet(io.BytesIO(data))
+            df = polars.read_parquet(io.BytesIO(data), columns=columns)
             table = df.to_arrow()
+            if row_groups is not None:
+                # polars does not read row groups, select the rows they contain
+                metadata = pq.read_metadata(pa.BufferReader(data))
+                offset = sum(metadata.row_group(rg).num_rows for rg in range(min(row_groups, default=0)))
+                table = table.slice(offset, sum(metadata.row_group(rg).num_rows for rg in row_groups))
+            table = TransformUtils._filter_table(table=table, filters=filters)
         except Exception as e:
             logger.error(f"Could not convert bytes to pyarrow using polars: {e}. Skipping.")
             table = None
         return table
 
     @staticmethod
-    def convert_arrow_to_binary(table: pa.Table) -> bytes:
+    def _filter_table(table: pa.Table, filters: Any) -> pa.Table:
+        """
+        Filter table rows
+        :param table: table
+        :param filters: row filter in the format of pyarrow.parquet.read_table or None
+        :return: filtered table
+        """
+        if filters is None:
+            return table
+        if not isinstance(filters, pc.Expression):
+            filters = pq.filters_to_expression(filters)
+        return table.filter(filters)
+
+    @staticmethod
+    def get_parquet_write_options(write_profile: dict[str, Any] = None) -> dict[str, Any]:
+        """
+        Build parquet write options from the write profile
+        :param write_profile: dictionary of pyarrow.parquet.write_table parameters (see PARQUET_WRITE_OPTIONS).
+                              Parameters, that are not specified or None, are taken from DEFAULT_WRITE_PROFILE
+                              or pyarrow defaults
+        :return: dictionary of pyarrow.parquet.write_table parameters
+        """
+        options = dict(DEFAULT_WRITE_PROFILE)
+        if write_profile is not None:
+            options |= {key: value for key, value in write_profile.items() if value is not None}
+        return options
+
+    @staticmethod
+    def convert_arrow_to_binary(table: pa.Table, write_profile: dict[str, Any] = None) -> bytes:
         """
         Convert Arrow table to byte array
         :param table: Arrow table
+        :param write_profile: optional parquet write profile, see get_parquet_write_options
         :return: byte array or None if conversion fails
         """
         from data_processing.utils import get_logger
@@ -174,14 +407,63 @@ class TransformUtils:
         try:
             # convert table to bytes
             writer = pa.BufferOutputStream()
-            # Update default snappy compression to ZSTD.
+            # Default compression is ZSTD, instead of snappy.
             # See https://arrow.apache.org/docs/python/generated/pyarrow.parquet.write_table.html
-            pq.write_table(table=table, where=writer, compression="ZSTD")
+            pq.write_table(
+                table=table, where=writer, **TransformUtils.get_parquet_write_options(write_profile=write_profile)
+            )
             return bytes(writer.getvalue())
         except Exception as e:
             logger.error(f"Failed to convert arrow table to byte array, exception {e}. Skipping it")
             return None
 
+    @staticmethod
+    def convert_arrow_to_shared_memory(table: pa.Table, name: str = None) -> tuple[str, int]:
+        """
+        Write Arrow table to a new shared memory segment in Arrow IPC stream format. The segment is owned by
+        the reader of the table (see convert_shared_memory_to_arrow), which is responsible for removing it
+        :param table: Arrow table
+        :param name: optional name of the segment, e.g. assigned by the creator of the process, so that it can
+                     remove the segment if the process fails. Random name is generated if not specified
+        :return: name of the shared memory segment and size of the table data (bytes)
+        """
+        sink = pa.MockOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        size = sink.size()
+        # zero size segments are not supported
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+        # the segment outlives this process, it is removed by the reader
+        resource_tracker.unregister(shm._name, "shared_memory")
+        buffer = pa.py_buffer(shm.buf)
+        try:
+            with pa.FixedSizeBufferWriter(buffer) as stream, pa.ipc.new_stream(stream, table.schema) as writer:
+                writer.write_table(table)
+        except Exception:
+            shm.unlink()
+            raise
+        finally:
+            # buffer and stream reference the segment memory, they have to be released before it is closed
+            stream = writer = buffer = None
+            shm.close()
+        return shm.name, size
+
+    @staticmethod
+    def convert_shared_memory_to_arrow(name: str, size: int) -> tuple[pa.Table, shared_memory.SharedMemory]:
+        """
+        Map Arrow table written by convert_arrow_to_shared_memory, without copying it. The segment is
+        removed immediately (it remains mapped until closed). It has to be closed once the table and all the
+        tables referencing its data are released
+        :param name: name of the shared memory segment
+        :param size: size of the table data (bytes)
+        :return: table and shared memory segment
+        """
+        shm = shared_memory.SharedMemory(name=name)
+        # removing the segment also stops its tracking by this process
+        shm.unlink()
+        table = pa.ipc.open_stream(pa.py_buffer(shm.buf)[:size]).read_all()
+        return table, shm
+
     @staticmethod
     def add_column(table: pa.Table, name: str, content: list[Any]) -> pa.Table:
         """
@@ -191,11 +473,35 @@ class TransformUtils:
         :param content: content of the column
         :return: updated table, containing new column
         """
-        # check if column already exist and drop it
-        if name in table.schema.names:
-            table = table.drop(columns=[name])
-        # append column
-        return table.append_column(field_=name, column=[content])
+        return TransformUtils.add_columns(table=table, columns={name: content})
+
+    @staticmethod
+    def add_columns(table: pa.Table, columns: dict[str, Any]) -> pa.Table:
+        """
+        Add several columns to the table. Existing columns with the same names are dropped and the new columns
+        are appended at the end, building the resulting table once
+        :param table: original table
+        :param columns: dictionary of column names to their content - Arrow arrays (or chunked arrays),
+            numpy arrays or lists
+        :return: updated table, containing new columns
+        """
+        if len(columns) == 0:
+            return table
+        # check if columns already exist and drop them
+        existing = [name for name in columns.keys() if name in table.schema.names]
+        if len(existing) > 0:
+            table = table.drop(columns=existing)
+        # convert content to Arrow
+        arrays = [
+            content if isinstance(content, (pa.Array, pa.ChunkedArray)) else pa.array(content)
+            for content in columns.values()
+        ]
+        # append columns, preserving fields and metadata of the table
+        schema = pa.schema(
+            list(table.schema) + [pa.field(name, array.type) for name, array in zip(columns.keys(), arrays)],
+            metadata=table.schema.metadata,
+        )
+        return pa.Table.from_arrays(table.columns + arrays, schema=schema)
 
     @staticmethod
     def verify_no_duplicate_columns(table: pa.Table, file: str) -> bool:
@@ -210,6 +210,197 @@ class TestGetInputFiles(TestInit):
         assert result == ([], self.size_stat_dict_empty, 0)
 
 
+class TestCheckpointManifest:
+    def test_checkpoint_manifest(self, tmp_path):
+        """
+        Test checkpointing based on the persisted manifest of completed files
+        """
+        input_path = tmp_path / "input"
+        output_path = tmp_path / "output"
+        os.makedirs(input_path)
+        input_files = [input_path / f"file{i}.parquet" for i in range(3)]
+        for file in input_files:
+            file.touch()
+        dal = DataAccessLocal(
+            {"input_folder": str(input_path), "output_folder": str(output_path)},
+            checkpoint=True,
+            checkpoint_manifest=True,
+        )
+        # no manifest and no output - everything has to be processed
+        files, _, _ = dal.get_files_to_process()
+        assert files == [str(file) for file in input_files]
+        # record completed files and save them
+        dal.add_completed_file(str(input_files[0]))
+        dal.add_completed_file(str(input_files[2]))
+        assert dal.flush_completed_files() == 0
+        assert dal.completed_files == []
+        # manifest part is not treated as an output file
+        assert not os.path.exists(output_path / "file0.parquet")
+        files, _, _ = dal.get_files_to_process()
+        assert files == [str(input_files[1])]
+        # manifest is ignored without checkpointing
+        dal.checkpoint = False
+        files, _, _ = dal.get_files_to_process()
+        assert len(files) == 3
+
+
+class TestIterateFilesToProcess:
+    def test_iterate_files_to_process(self, tmp_path):
+        """
+        Test lazy enumeration of files to process
+        """
+        input_path = tmp_path / "input"
+        output_path = tmp_path / "output"
+        for dset in ["dset1", "dset2"]:
+            os.makedirs(input_path / dset)
+            os.makedirs(output_path / dset)
+            for i in range(3):
+                (input_path / dset / f"file{i}.parquet").touch()
+            (input_path / dset / "file.txt").touch()
+        # already processed
+        (output_path / "dset1" / "file0.parquet").touch()
+        dal = DataAccessLocal(
+            {"input_folder": str(input_path), "output_folder": str(output_path)},
+            d_sets=["dset1", "dset2"],
+            checkpoint=True,
+            files_to_use=[".parquet"],
+        )
+        expected, _, _ = dal.get_files_to_process()
+        assert len(expected) == 5
+        # lazy enumeration is not ordered
+        files = [f for page, _ in dal.iterate_files_to_process() for f in page]
+        assert sorted(files) == sorted(expected)
+        # pages
+        pages = [page for page, _ in dal.iterate_files_to_process(page_size=2)]
+        assert [len(page) for page in pages] == [2, 2, 1]
+        # max files uses the same files as get_files_to_process
+        dal.m_files = 3
+        expected, _, _ = dal.get_files_to_process()
+        files = [f for page, _ in dal.iterate_files_to_process() for f in page]
+        assert files == expected
+        # sampling
+        dal.m_files = -1
+        dal.n_samples = 2
+        files = [f for page, _ in dal.iterate_files_to_process() for f in page]
+        assert len(files) == 2
+
+
+class TestCompletedParts:
+    def test_completed_parts(self, tmp_path):
+        """
+        Test that a file split into parts is completed once all its parts are
+        """
+        input_path = tmp_path / "input"
+        output_path = tmp_path / "output"
+        os.makedirs(input_path)
+        os.makedirs(output_path)
+        for name in ["split", "partial", "whole"]:
+            (input_path / f"{name}.parquet").touch()
+        for name in ["split_part0of2", "split_part1of2_1", "partial_part1of2", "whole"]:
+            (output_path / f"{name}.parquet").touch()
+        dal = DataAccessLocal(
+            {"input_folder": str(input_path), "output_folder": str(output_path)},
+            checkpoint=True,
+            files_to_use=[".parquet"],
+        )
+        files, _, _ = dal.get_files_to_process()
+        assert files == [str(input_path / "partial.parquet")]
+
+
+class TestListFilesFolder:
+    def test_list_files_folder(self, tmp_path):
+        """
+        Test that the recursive listing returns the files in the order of their sorted paths
+        """
+        for folder in ["a", "a.b", "a/c", "b"]:
+            os.makedirs(tmp_path / folder, exist_ok=True)
+            (tmp_path / folder / "file.parquet").write_bytes(b"data")
+        (tmp_path / "file.parquet").touch()
+        dal = DataAccessLocal({"input_folder": str(tmp_path), "output_folder": str(tmp_path / "output")})
+        files, retries = dal._list_files_folder(path=str(tmp_path))
+        assert retries == 0
+        assert [file["name"] for file in files] == [str(f) for f in sorted(tmp_path.rglob("*")) if f.is_file()]
+        assert [file["size"] for file in files] == [4, 4, 4, 4, 0]
+
+
+class TestGetFileSizes:
+    def test_get_file_sizes(self, tmp_path):
+        """
+        Test sizes of files to process
+        """
+        input_path = tmp_path / "input"
+        output_path = tmp_path / "output"
+        os.makedirs(input_path)
+        os.makedirs(output_path)
+        for i in range(3):
+            (input_path / f"file{i}.parquet").write_bytes(b"0" * (i + 1) * 10)
+        (output_path / "file0.parquet").touch()
+        for checkpoint in [False, True]:
+            dal = DataAccessLocal(
+                {"input_folder": str(input_path), "output_folder": str(output_path)}, checkpoint=checkpoint
+            )
+            files, _, _ = dal.get_files_to_process()
+            sizes = dal.get_file_sizes()
+            assert sorted(sizes.keys()) == sorted(files)
+            assert [sizes[f] for f in sorted(files)] == [(i + 1) * 10 for i in range(3 - len(files), 3)]
+
+
+class TestListingShards:
+    def test_listing_shards(self, tmp_path):
+        """
+        Test sharded listing of files to process
+        """
+        input_path = tmp_path / "input"
+        output_path = tmp_path / "output"
+        for folder in [input_path / "a" / "b", input_path / "c", output_path / "a" / "b"]:
+            os.makedirs(folder)
+        for name in ["top.parquet", "a/file1.parquet", "a/b/file2.parquet", "c/file3.parquet", "c/file4.txt"]:
+            (input_path / name).write_bytes(b"0" * 10)
+        (output_path / "a" / "b" / "file2.parquet").touch()
+        for checkpoint in [False, True]:
+            dal = DataAccessLocal(
+                {"input_folder": str(input_path), "output_folder": str(output_path)}, checkpoint=checkpoint
+            )
+            shards, _ = dal.get_listing_shards()
+            assert shards == [(str(input_path), False), (str(input_path / "a"), True), (str(input_path / "c"), True)]
+            files = []
+            for shard, recursive in shards:
+                shard_files, sizes, _ = dal.get_shard_files_to_process(shard=shard, recursive=recursive)
+                assert sorted(sizes.keys()) == sorted(shard_files)
+                files += shard_files
+            expected, _, _ = dal.get_files_to_process()
+            assert sorted(files) == sorted(expected)
+            assert (str(input_path / "a" / "b" / "file2.parquet") in files) != checkpoint
+
+    def test_listing_shards_manifest(self, tmp_path):
+        """
+        Test sharded listing with the checkpoint manifest read once for all the shards
+        """
+        input_path = tmp_path / "input"
+        output_path = tmp_path / "output"
+        for folder in [input_path / "a", input_path / "c"]:
+            os.makedirs(folder)
+        for name in ["top.parquet", "a/file1.parquet", "c/file3.parquet"]:
+            (input_path / name).touch()
+        dal = DataAccessLocal(
+            {"input_folder": str(input_path), "output_folder": str(output_path)},
+            checkpoint=True,
+            checkpoint_manifest=True,
+        )
+        dal.add_completed_file(str(input_path / "a" / "file1.parquet"))
+        assert dal.flush_completed_files() == 0
+        manifest, _ = dal.get_checkpoint_manifest()
+        assert manifest == {str(input_path / "a" / "file1")}
+        shards, _ = dal.get_listing_shards()
+        with patch.object(DataAccessLocal, "_read_checkpoint_manifest", side_effect=Exception("manifest is read")):
+            files = [
+                f
+                for shard, recursive in shards
+                for f in dal.get_shard_files_to_process(shard=shard, recursive=recursive, manifest=manifest)[0]
+            ]
+        assert sorted(files) == [str(input_path / "c" / "file3.parquet"), str(input_path / "top.parquet")]
+
+
 class TestGetFilesToProcess(TestInit):
     def setup_directories(self, dset=""):
         """
@@ -562,6 +753,22 @@ class TestGetFile(TestInit):
             assert data == b"Mock data"
 
 
+class TestGetFileBuffer(TestInit):
+    def test_get_file_buffer(self, tmp_path):
+        text_file = tmp_path / "test_file.txt"
+        text_file.write_bytes(b"This is a test file.")
+        gzip_file = tmp_path / "test_file.gz"
+        with gzip.open(gzip_file, "wb") as f:
+            f.write(b"This is a compressed test file.")
+        data, _ = self.dal.get_file_buffer(str(text_file))
+        assert isinstance(data, pyarrow.Buffer)
+        assert data.to_pybytes() == b"This is a test file."
+        data, _ = self.dal.get_file_buffer(str(gzip_file))
+        assert data.to_pybytes() == b"This is a compressed test file."
+        with pytest.raises(FileNotFoundError):
+            self.dal.get_file_buffer(str(tmp_path / "nonexistent_file.txt"))
+
+
 class TestGetFolderFiles(TestInit):
 
     # create test folder and test files (text pdf and bin) inside test folder
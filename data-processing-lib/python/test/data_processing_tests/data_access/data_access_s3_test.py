@@ -10,9 +10,11 @@
 # limitations under the License.
 ################################################################################
 
+import json
 import os
 
 from data_processing.data_access import DataAccessS3
+from data_processing.utils import MB
 from moto import mock_aws
 
 
@@ -137,3 +139,88 @@ def test_files_to_process():
         assert 0.034458160400390625 == profile["max_file_size"]
         assert 0.034458160400390625 == profile["min_file_size"]
         assert 0.06891632080078125 == profile["total_file_size"]
+        # lazy enumeration returns the same files
+        lazy_files = [f for page, _ in d_a.iterate_files_to_process(page_size=1) for f in page]
+        assert lazy_files == files
+        # sharded listing returns the same files, with and without data sets
+        for d_sets in [["dataset=d2"], None]:
+            d_a.d_sets = d_sets
+            files, _, _ = d_a.get_files_to_process()
+            shards, _ = d_a.get_listing_shards()
+            sharded_files = [f for shard, rec in shards for f in d_a.get_shard_files_to_process(shard, rec)[0]]
+            assert sorted(sharded_files) == sorted(files)
+        assert 6 == len(sharded_files)
+
+
+def test_parallel_read_write():
+    """
+    Testing multipart upload and concurrent ranged reads of large files
+    :return: None
+    """
+    with mock_aws():
+        # create data access with the minimal part size
+        d_a = DataAccessS3(s3_credentials=s3_cred, d_sets=None, part_size=5 * MB, max_concurrency=3)
+        d_a.arrS3.s3_client.create_bucket(Bucket="test")
+        data = os.urandom(12 * MB)
+        for size in [0, 5 * MB, len(data)]:
+            path = f"test/parallel_read_write/file_{size}.bin"
+            res, _ = d_a.save_file(path=path, data=data[:size])
+            assert res is not None
+            r_data, _ = d_a.get_file(path=path)
+            assert r_data == data[:size]
+        # large file was uploaded in 3 parts
+        head = d_a.arrS3.s3_client.head_object(Bucket="test", Key=f"parallel_read_write/file_{len(data)}.bin")
+        assert head["ETag"].endswith('-3"')
+
+
+def test_sharded_listing(tmp_path):
+    """
+    Testing concurrent listing of partitioned data and listing cache
+    :return: None
+    """
+    with mock_aws():
+        d_a = DataAccessS3(s3_credentials=s3_cred, s3_config=s3_conf, listing_concurrency=4)
+        for band in range(3):
+            for segment in range(2):
+                _create_and_populate_bucket(
+                    d_a=d_a, input_location=f"{s3_conf['input_folder']}band={band}/segment={segment}/", n_files=2
+                )
+        _create_and_populate_bucket(d_a=d_a, input_location=s3_conf["input_folder"], n_files=1)
+        # concurrent listing returns the same results as the flat one
+        files, _ = d_a.arrS3.list_files(key=s3_conf["input_folder"])
+        flat_files = [f for page, _ in d_a.arrS3.iterate_files(key=s3_conf["input_folder"]) for f in page]
+        assert 13 == len(files)
+        assert files == flat_files
+        folders, _ = d_a.arrS3.list_folders(key=s3_conf["input_folder"])
+        assert 9 == len(folders)
+        assert folders[:3] == [
+            f"{s3_conf['input_folder']}band=0/",
+            f"{s3_conf['input_folder']}band=0/segment=0/",
+            f"{s3_conf['input_folder']}band=0/segment=1/",
+        ]
+        # listing cache
+        d_a.arrS3.listing_cache = str(tmp_path)
+        files, _ = d_a.arrS3.list_files(key=s3_conf["input_folder"])
+        assert 13 == len(files)
+        _create_and_populate_bucket(d_a=d_a, input_location=f"{s3_conf['input_folder']}band=3/", n_files=1)
+        cached_files, _ = d_a.arrS3.list_files(key=s3_conf["input_folder"])
+        assert cached_files == files
+        files, _ = d_a.arrS3.list_files(key=s3_conf["input_folder"], use_cache=False)
+        assert 14 == len(files)
+        # expired cache
+        d_a.arrS3.listing_cache_ttl = 1
+        cache_file = d_a.arrS3._listing_cache_file(kind="files", bucket="test", prefix="table_read_write/input/")
+        with open(cache_file) as fp:
+            cached = json.load(fp)
+        cached["created"] -= 10
+        with open(cache_file, "w") as fp:
+            json.dump(cached, fp)
+        files, _ = d_a.arrS3.list_files(key=s3_conf["input_folder"])
+        assert 14 == len(files)
+        # only the input folder listings are cached
+        assert d_a._is_input_path(f"{s3_conf['input_folder']}band=0/")
+        assert not d_a._is_input_path(s3_conf["output_folder"])
+        assert not d_a._is_input_path("test/table_read_write/intermediate/")
+        # flat listing, used by default
+        d_a.arrS3.listing_concurrency = 1
+        assert d_a.arrS3.list_files(key=s3_conf["input_folder"], use_cache=False)[0] == files
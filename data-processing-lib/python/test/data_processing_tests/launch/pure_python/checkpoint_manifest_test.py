@@ -0,0 +1,70 @@
+# (C) Copyright IBM Corp. 2024.
+# Licensed under the Apache License, Version 2.0 (the “License”);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an “AS IS” BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+import os
+import sys
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from data_processing.data_access import DataAccessFactory
+from data_processing.runtime.pure_python import PythonTransformLauncher, PythonTransformRuntimeConfiguration
+from data_processing.test_support.transform.noop_transform import NOOPTransform
+from data_processing.transform import TransformConfiguration
+from data_processing.utils import ParamsUtils
+
+
+class _DropTransform(NOOPTransform):
+    """
+    Transform filtering out all the rows of the files with "drop" in their names
+    """
+
+    processed = []
+
+    def transform(self, table: pa.Table, file_name: str = None) -> tuple[list[pa.Table], dict[str, Any]]:
+        _DropTransform.processed.append(os.path.basename(file_name))
+        if "drop" in file_name:
+            return [], {"dropped": table.num_rows}
+        return [table], {}
+
+
+class _DropTransformConfiguration(PythonTransformRuntimeConfiguration):
+    def __init__(self):
+        super().__init__(transform_config=TransformConfiguration(name="drop", transform_class=_DropTransform))
+
+
+def test_manifest_restart(tmp_path):
+    """
+    Test that files producing no output are recorded in the checkpoint manifest and not reprocessed on restart
+    """
+    input_folder = tmp_path / "input"
+    os.makedirs(input_folder)
+    table = pa.Table.from_pydict({"a": pa.array(range(10))})
+    for name in ["keep.parquet", "drop.parquet"]:
+        pq.write_table(table, input_folder / name)
+    params = {
+        "data_local_config": ParamsUtils.convert_to_ast(
+            {"input_folder": str(input_folder), "output_folder": str(tmp_path / "output")}
+        ),
+        "data_checkpointing": True,
+        "data_checkpoint_manifest": True,
+    }
+    sys.argv = ParamsUtils.dict_to_req(params)
+    assert PythonTransformLauncher(_DropTransformConfiguration(), data_access_factory=DataAccessFactory()).launch() == 0
+    assert sorted(_DropTransform.processed) == ["drop.parquet", "keep.parquet"]
+    assert os.path.isfile(tmp_path / "output" / "keep.parquet")
+    assert not os.path.exists(tmp_path / "output" / "drop.parquet")
+    # restart - both files are completed, including the one without output
+    _DropTransform.processed = []
+    sys.argv = ParamsUtils.dict_to_req(params)
+    assert PythonTransformLauncher(_DropTransformConfiguration(), data_access_factory=DataAccessFactory()).launch() == 0
+    assert _DropTransform.processed == []
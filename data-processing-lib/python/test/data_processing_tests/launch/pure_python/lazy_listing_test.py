@@ -0,0 +1,56 @@
+# (C) Copyright IBM Corp. 2024.
+# Licensed under the Apache License, Version 2.0 (the “License”);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an “AS IS” BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+import json
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+from data_processing.data_access import DataAccessFactory, DataAccessLocal
+from data_processing.runtime.pure_python import PythonTransformLauncher
+from data_processing.test_support.transform import NOOPPythonTransformConfiguration
+from data_processing.utils import ParamsUtils
+
+
+@pytest.mark.parametrize(
+    "execution_params",
+    [
+        {},
+        {"runtime_read_ahead": 1},
+        {"runtime_num_threads": 2},
+        {"runtime_num_processors": 2},
+        {"runtime_num_processors": 2, "runtime_num_readers": 1},
+    ],
+)
+def test_lazy_listing(tmp_path, execution_params):
+    """
+    Test that the files are processed while listing them, without the complete listing of the input
+    """
+    input_folder = os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "../../../../test-data/data_processing/python/noop/input")
+    )
+    params = {
+        "data_local_config": ParamsUtils.convert_to_ast(
+            {"input_folder": input_folder, "output_folder": str(tmp_path)}
+        ),
+        "noop_sleep_sec": 0,
+    } | execution_params
+    sys.argv = ParamsUtils.dict_to_req(params)
+    with patch.object(DataAccessLocal, "get_files_to_process", side_effect=Exception("complete listing is used")):
+        # fresh data access factory, so that the configuration of the previously executed tests is not used
+        launcher = PythonTransformLauncher(NOOPPythonTransformConfiguration(), data_access_factory=DataAccessFactory())
+        assert launcher.launch() == 0
+    with open(tmp_path / "metadata.json") as f:
+        metadata = json.load(f)
+    assert metadata["job_output_stats"]["source_files"] == 3
+    assert os.path.isfile(tmp_path / "test1.parquet")
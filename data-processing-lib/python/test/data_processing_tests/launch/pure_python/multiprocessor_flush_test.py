@@ -0,0 +1,73 @@
+# (C) Copyright IBM Corp. 2024.
+# Licensed under the Apache License, Version 2.0 (the “License”);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an “AS IS” BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+import argparse
+import os
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from data_processing.data_access import DataAccessFactory
+from data_processing.runtime.pure_python.transform_orchestrator import (
+    _process_transforms_multiprocessor,
+)
+from data_processing.transform import AbstractTableTransform
+
+
+class _BufferingTransform(AbstractTableTransform):
+    """
+    Transform counting rows of all the tables and returning the count on flush
+    """
+
+    def __init__(self, config: dict[str, Any]):
+        super().__init__(config)
+        self.rows = None
+
+    def transform(self, table: pa.Table, file_name: str = None) -> tuple[list[pa.Table], dict[str, Any]]:
+        self.rows = (self.rows or 0) + table.num_rows
+        return [], {"buffered": 1}
+
+    def flush(self) -> tuple[list[pa.Table], dict[str, Any]]:
+        if self.rows is None:
+            return [], {}
+        return [pa.table({"rows": [self.rows]})], {"flushed": 1}
+
+
+def test_multiprocessor_flush(tmp_path):
+    input_folder = os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "../../../../test-data/data_processing/python/noop/input")
+    )
+    parser = argparse.ArgumentParser()
+    data_access_factory = DataAccessFactory()
+    data_access_factory.add_input_params(parser)
+    data_access_factory.apply_input_params(
+        parser.parse_args(["--data_local_config", str({"input_folder": input_folder, "output_folder": str(tmp_path)})])
+    )
+    files, _, _ = data_access_factory.create_data_access().get_files_to_process()
+    statistics = _process_transforms_multiprocessor(
+        files=files,
+        size=2,
+        print_interval=1,
+        data_access_factory=data_access_factory,
+        transform_params={},
+        transform_class=_BufferingTransform,
+        is_folder=False,
+        write_behind=1,
+    )
+    stats = statistics.get_execution_stats()
+    # every file is buffered and every worker, that processed files, flushed exactly once
+    assert stats["buffered"] == len(files)
+    assert stats["flushed"] == stats["result_files"] <= 2
+    rows = sum(pq.read_table(f).num_rows for f in files)
+    out_files = [os.path.join(root, f) for root, _, names in os.walk(tmp_path) for f in names]
+    assert len(out_files) == stats["flushed"]
+    assert sum(pq.read_table(f)["rows"][0].as_py() for f in out_files) == rows
@@ -0,0 +1,74 @@
+# (C) Copyright IBM Corp. 2024.
+# Licensed under the Apache License, Version 2.0 (the “License”);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an “AS IS” BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+import os
+from multiprocessing import shared_memory
+from unittest.mock import patch
+
+import pyarrow as pa
+import pytest
+from data_processing.runtime.pure_python import (
+    PythonTransformLauncher,
+    transform_orchestrator,
+)
+from data_processing.test_support.launch.transform_test import (
+    AbstractTransformLauncherTest,
+)
+from data_processing.test_support.transform import NOOPPythonTransformConfiguration
+from data_processing.utils import TransformUtils
+
+
+class TestPythonNOOPReadersTransform(AbstractTransformLauncherTest):
+    """
+    Extends the super-class to define the test data for the tests defined there.
+    The name of this class MUST begin with the word Test so that pytest recognizes it as a test class.
+    """
+
+    def get_test_transform_fixtures(self) -> list[tuple]:
+        basedir = "../../../../test-data/data_processing/python/noop/"
+        basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), basedir))
+        fixtures = []
+        launcher = PythonTransformLauncher(NOOPPythonTransformConfiguration())
+        fixtures.append(
+            (
+                launcher,
+                {"noop_sleep_sec": 0, "runtime_num_processors": 2, "runtime_num_readers": 1},
+                basedir + "/input",
+                basedir + "/expected",
+            )
+        )
+        return fixtures
+
+    def test_transform(self, launcher, cli_params, in_table_path, expected_out_table_path, ignore_columns):
+        # files are read by the reader processes and passed to the workers in shared memory
+        with patch.object(
+            transform_orchestrator,
+            "_process_transforms_pipelined",
+            wraps=transform_orchestrator._process_transforms_pipelined,
+        ) as pipelined:
+            super().test_transform(launcher, cli_params, in_table_path, expected_out_table_path, ignore_columns)
+        pipelined.assert_called_once()
+        # all the segments are removed
+        if os.path.isdir("/dev/shm"):
+            assert [name for name in os.listdir("/dev/shm") if name.startswith(f"dpk_{os.getpid()}_")] == []
+
+
+def test_remove_segments():
+    """
+    Test removal of the segments of the tables in flight, e.g. taken by a failed worker
+    """
+    name = f"dpk_{os.getpid()}_test"
+    TransformUtils.convert_arrow_to_shared_memory(table=pa.table({"a": [1, 2, 3]}), name=name)
+    # segments, that were never created, are ignored
+    transform_orchestrator._remove_segments(names=[name, f"dpk_{os.getpid()}_missing"])
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
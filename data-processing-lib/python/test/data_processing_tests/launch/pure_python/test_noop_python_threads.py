@@ -0,0 +1,101 @@
+# (C) Copyright IBM Corp. 2024.
+# Licensed under the Apache License, Version 2.0 (the “License”);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an “AS IS” BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+from data_processing.data_access import DataAccessFactory
+from data_processing.runtime.pure_python import (
+    PythonTransformFileProcessor,
+    PythonTransformLauncher,
+    transform_orchestrator,
+)
+from data_processing.test_support.launch.transform_test import (
+    AbstractTransformLauncherTest,
+)
+from data_processing.test_support.transform import NOOPPythonTransformConfiguration
+from data_processing.test_support.transform.noop_transform import NOOPTransform
+from data_processing.utils import ParamsUtils
+
+
+class TestPythonNOOPThreadsTransform(AbstractTransformLauncherTest):
+    """
+    Extends the super-class to define the test data for the tests defined there.
+    The name of this class MUST begin with the word Test so that pytest recognizes it as a test class.
+    """
+
+    def get_test_transform_fixtures(self) -> list[tuple]:
+        basedir = "../../../../test-data/data_processing/python/noop/"
+        basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), basedir))
+        fixtures = []
+        launcher = PythonTransformLauncher(NOOPPythonTransformConfiguration())
+        fixtures.append(
+            (launcher, {"noop_sleep_sec": 0, "runtime_num_threads": 2}, basedir + "/input", basedir + "/expected")
+        )
+        fixtures.append(
+            (
+                launcher,
+                {"noop_sleep_sec": 0, "runtime_num_threads": 2, "runtime_read_ahead": 1},
+                basedir + "/input",
+                basedir + "/expected",
+            )
+        )
+        return fixtures
+
+    def test_transform(self, launcher, cli_params, in_table_path, expected_out_table_path, ignore_columns):
+        # files are processed by the pool threads, reading ahead if requested
+        threads = set()
+        process_file = PythonTransformFileProcessor.process_file
+
+        def record_thread(processor, *args, **kwargs):
+            threads.add(threading.current_thread().name)
+            return process_file(processor, *args, **kwargs)
+
+        with patch.object(
+            transform_orchestrator,
+            "_process_transforms_threads",
+            wraps=transform_orchestrator._process_transforms_threads,
+        ) as process_threads, patch.object(PythonTransformFileProcessor, "process_file", record_thread):
+            super().test_transform(launcher, cli_params, in_table_path, expected_out_table_path, ignore_columns)
+        process_threads.assert_called_once()
+        assert process_threads.call_args.kwargs["read_ahead"] == cli_params.get("runtime_read_ahead", 0)
+        assert len(threads) > 0 and all(name.startswith("transform") for name in threads)
+
+
+def test_shared_transform(tmp_path):
+    """
+    Thread safe transform is created once and shared by the threads, the rest are created per thread
+    """
+    input_folder = os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "../../../../test-data/data_processing/python/noop/input")
+    )
+    init = NOOPTransform.__init__
+    for thread_safe, n_transforms in [(True, 1), (False, 3)]:
+        created = []
+
+        def record_init(transform, *args, **kwargs):
+            created.append(transform)
+            init(transform, *args, **kwargs)
+
+        launcher = PythonTransformLauncher(NOOPPythonTransformConfiguration(), data_access_factory=DataAccessFactory())
+        local_config = {"input_folder": input_folder, "output_folder": str(tmp_path / str(thread_safe))}
+        sys.argv = ParamsUtils.dict_to_req(
+            {"data_local_config": local_config, "noop_sleep_sec": 0, "runtime_num_threads": 3}
+        )
+        with patch.object(NOOPTransform, "thread_safe", thread_safe), patch.object(
+            NOOPTransform, "__init__", record_init
+        ):
+            assert launcher.launch() == 0
+        assert len(created) == n_transforms
+        assert sorted(os.listdir(tmp_path / str(thread_safe))) == sorted(os.listdir(input_folder) + ["metadata.json"])
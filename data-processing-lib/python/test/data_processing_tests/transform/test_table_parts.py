@@ -0,0 +1,64 @@
+# (C) Copyright IBM Corp. 2024.
+# Licensed under the Apache License, Version 2.0 (the “License”);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an “AS IS” BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from data_processing.test_support.transform.noop_transform import NOOPTransform
+from data_processing.utils import TransformUtils
+
+
+table = pa.Table.from_pydict({"doc_id": pa.array(range(100)), "lang": pa.array(["en", "fr"] * 50)})
+
+
+def _to_bytes(t: pa.Table, row_group_size: int) -> bytes:
+    writer = pa.BufferOutputStream()
+    pq.write_table(table=t, where=writer, row_group_size=row_group_size)
+    return bytes(writer.getvalue())
+
+
+def _transform_parts(config: dict, data: bytes, n_parts: int) -> tuple[list[pa.Table], int]:
+    transform = NOOPTransform(config)
+    tables = []
+    source_docs = 0
+    for part in range(n_parts):
+        out_files, stats = transform.transform_binary_part(
+            file_name="test.parquet", byte_array=data, part=part, n_parts=n_parts
+        )
+        source_docs += stats.get("source_doc_count", 0)
+        tables += [TransformUtils.convert_binary_to_arrow(data=f[0]) for f in out_files]
+    return tables, source_docs
+
+
+def test_parts():
+    """
+    Parts of the file together have to produce the same result as the complete file
+    """
+    tables, source_docs = _transform_parts(config={"sleep_sec": 0}, data=_to_bytes(table, 10), n_parts=3)
+    assert len(tables) == 3
+    assert [t.num_rows for t in tables] == [30, 30, 40]
+    assert source_docs == 100
+    assert pa.concat_tables(tables).equals(table)
+
+
+def test_parts_more_than_row_groups():
+    tables, _ = _transform_parts(config={"sleep_sec": 0}, data=_to_bytes(table, 50), n_parts=3)
+    assert len(tables) == 2
+    assert pa.concat_tables(tables).equals(table)
+
+
+def test_parts_streaming_and_filters():
+    data = _to_bytes(table, 10)
+    tables, _ = _transform_parts(config={"sleep_sec": 0, "stream_row_groups": True}, data=data, n_parts=4)
+    assert pa.concat_tables(tables).equals(table)
+    tables, _ = _transform_parts(config={"sleep_sec": 0, "read_filters": [("lang", "=", "en")]}, data=data, n_parts=4)
+    assert pa.concat_tables(tables).equals(table.filter(pc.equal(table["lang"], "en")))
@@ -0,0 +1,92 @@
+# (C) Copyright IBM Corp. 2024.
+# Licensed under the Apache License, Version 2.0 (the “License”);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an “AS IS” BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from data_processing.transform import AbstractTableTransform
+from data_processing.utils import TransformUtils
+
+
+table = pa.Table.from_pydict(
+    {
+        "doc_id": pa.array(range(100)),
+        "contents": pa.array([f"contents_{i}" for i in range(100)]),
+        "lang": pa.array(["en" if i % 2 == 0 else "fr" for i in range(100)]),
+    }
+)
+
+
+def _to_bytes(t: pa.Table) -> bytes:
+    writer = pa.BufferOutputStream()
+    pq.write_table(table=t, where=writer, row_group_size=10)
+    return bytes(writer.getvalue())
+
+
+class AnnotateTransform(AbstractTableTransform):
+    """
+    Adds a column based on doc_id, only reading doc_id
+    """
+
+    def __init__(self, config: dict[str, Any]):
+        super().__init__(config)
+        self.read_columns = ["doc_id"]
+
+    def transform(self, table: pa.Table, file_name: str = None) -> tuple[list[pa.Table], dict[str, Any]]:
+        assert table.column_names == ["doc_id", AbstractTableTransform.ROW_INDEX_COLUMN]
+        return [table.append_column("even", pc.equal(pc.bit_wise_and(table["doc_id"], 1), 0))], {}
+
+
+class FilterTransform(AbstractTableTransform):
+    """
+    Filters rows based on lang, only reading lang
+    """
+
+    def __init__(self, config: dict[str, Any]):
+        super().__init__(config | {"read_columns": ["lang"]})
+
+    def transform(self, table: pa.Table, file_name: str = None) -> tuple[list[pa.Table], dict[str, Any]]:
+        return [table.filter(pc.equal(table["lang"], "fr"))], {}
+
+
+def test_projection_pass_through():
+    transform = AnnotateTransform({})
+    out_files, stats = transform.transform_binary(file_name="test.parquet", byte_array=_to_bytes(table))
+    result = TransformUtils.convert_binary_to_arrow(data=out_files[0][0])
+    assert result.column_names == ["doc_id", "contents", "lang", "even"]
+    assert result.drop_columns(["even"]).equals(table)
+    assert stats == {"source_doc_count": 100, "result_doc_count": 100}
+
+
+def test_projection_filtered_rows():
+    transform = FilterTransform({})
+    out_files, _ = transform.transform_binary(file_name="test.parquet", byte_array=_to_bytes(table))
+    result = TransformUtils.convert_binary_to_arrow(data=out_files[0][0])
+    assert result.equals(table.filter(pc.equal(table["lang"], "fr")))
+
+
+def test_projection_read_filters():
+    transform = AnnotateTransform({"read_filters": [("doc_id", ">=", 90)]})
+    out_files, stats = transform.transform_binary(file_name="test.parquet", byte_array=_to_bytes(table))
+    result = TransformUtils.convert_binary_to_arrow(data=out_files[0][0])
+    assert result.drop_columns(["even"]).equals(table.slice(90))
+    assert stats["source_doc_count"] == 10
+
+
+def test_write_profile_stats():
+    transform = AnnotateTransform({"write_profile": {"compression": "gzip"}})
+    out_files, stats = transform.transform_binary(file_name="test.parquet", byte_array=_to_bytes(table))
+    assert stats["parquet gzip bytes"] == len(out_files[0][0])
+    assert "parquet gzip write time" in stats
+    assert pq.ParquetFile(pa.BufferReader(out_files[0][0])).metadata.row_group(0).column(0).compression == "GZIP"
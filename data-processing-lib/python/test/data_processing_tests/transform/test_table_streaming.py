@@ -0,0 +1,139 @@
+# (C) Copyright IBM Corp. 2024.
+# Licensed under the Apache License, Version 2.0 (the “License”);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an “AS IS” BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+import sys
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from data_processing.data_access import DataAccessFactory
+from data_processing.runtime.pure_python import PythonTransformLauncher, PythonTransformRuntimeConfiguration
+from data_processing.test_support.transform import NOOPPythonTransformConfiguration
+from data_processing.test_support.transform.noop_transform import NOOPTransform
+from data_processing.transform import AbstractTableTransform, TransformConfiguration
+from data_processing.utils import ParamsUtils, TransformUtils
+
+
+table = pa.Table.from_pydict({"name": pa.array([f"name_{i}" for i in range(100)]), "age": pa.array(range(100))})
+
+
+def _to_bytes(t: pa.Table, row_group_size: int) -> bytes:
+    writer = pa.BufferOutputStream()
+    pq.write_table(table=t, where=writer, row_group_size=row_group_size)
+    return bytes(writer.getvalue())
+
+
+def test_streaming_row_groups():
+    """
+    Streaming transform has to produce the same result as a regular one, processing one row group at a time
+    """
+    transform = NOOPTransform({"sleep_sec": 0, "stream_row_groups": True})
+    out_files, stats = transform.transform_binary(file_name="test.parquet", byte_array=_to_bytes(table, 10))
+    assert len(out_files) == 1
+    assert out_files[0][1] == ".parquet"
+    # number of rows is accumulated across all row groups, number of files is reported once
+    assert stats == {"nfiles": 1, "nrows": 100, "source_doc_count": 100, "result_doc_count": 100}
+    result = TransformUtils.convert_binary_to_arrow(data=out_files[0][0])
+    assert result.equals(table)
+
+
+def test_streaming_empty_table():
+    transform = NOOPTransform({"sleep_sec": 0, "stream_row_groups": True})
+    out_files, stats = transform.transform_binary(
+        file_name="test.parquet", byte_array=_to_bytes(table.slice(0, 0), 10)
+    )
+    assert out_files == []
+    assert stats == {"skipped empty tables": 1}
+
+
+def test_streaming_write_profile():
+    transform = NOOPTransform(
+        {"sleep_sec": 0, "stream_row_groups": True, "write_profile": {"compression": "snappy", "row_group_size": 5}}
+    )
+    out_files, stats = transform.transform_binary(file_name="test.parquet", byte_array=_to_bytes(table, 10))
+    assert stats["parquet snappy bytes"] == len(out_files[0][0])
+    metadata = pq.ParquetFile(pa.BufferReader(out_files[0][0])).metadata
+    assert metadata.num_row_groups == 20
+    assert metadata.row_group(0).column(0).compression == "SNAPPY"
+
+
+class _SchemaDriftTransform(NOOPTransform):
+    """
+    Transform changing the type of a column after the first row group
+    """
+
+    def transform_batch(self, batch: pa.Table, file_name: str = None):
+        if batch["age"][0].as_py() > 0:
+            batch = batch.set_column(0, "name", pa.array([{"a": 1}] * batch.num_rows))
+        return [batch], {}
+
+
+def test_streaming_schema_drift():
+    transform = _SchemaDriftTransform({"sleep_sec": 0, "stream_row_groups": True})
+    with pytest.raises(Exception, match="does not match the schema of the output file"):
+        transform.transform_binary(file_name="test.parquet", byte_array=_to_bytes(table, 10))
+
+
+class _CountingTransform(AbstractTableTransform):
+    """
+    Transform counting its invocations, that does not declare its statistics
+    """
+
+    supports_streaming = True
+
+    def transform(self, table: pa.Table, file_name: str = None):
+        return [table], {"rows": table.num_rows, "calls": 1, "note": "text"}
+
+
+def test_streaming_sums_stats():
+    """
+    Numeric statistics are summed across row groups by default
+    """
+    transform = _CountingTransform({"stream_row_groups": True})
+    _, stats = transform.transform_binary(file_name="test.parquet", byte_array=_to_bytes(table, 10))
+    assert stats == {"rows": 100, "calls": 10, "note": "text", "source_doc_count": 100, "result_doc_count": 100}
+
+
+class _FileLevelTransform(_CountingTransform):
+    """
+    Transform, that needs the complete file, so it does not support streaming
+    """
+
+    supports_streaming = False
+
+
+def test_streaming_opt_in():
+    """
+    Transforms, that do not support streaming, process complete files even if streaming is requested
+    """
+    transform = _FileLevelTransform({"stream_row_groups": True})
+    _, stats = transform.transform_binary(file_name="test.parquet", byte_array=_to_bytes(table, 10))
+    assert stats["calls"] == 1
+
+
+class _FileLevelTransformConfiguration(PythonTransformRuntimeConfiguration):
+    def __init__(self):
+        super().__init__(
+            transform_config=TransformConfiguration(name="file_level", transform_class=_FileLevelTransform)
+        )
+
+
+def test_streaming_option():
+    launcher = PythonTransformLauncher(NOOPPythonTransformConfiguration(), data_access_factory=DataAccessFactory())
+    sys.argv = ParamsUtils.dict_to_req({"noop_sleep_sec": 0, "runtime_stream_row_groups": True})
+    assert launcher._get_parameters(launcher._get_arguments(launcher._get_parser()))
+    assert launcher.runtime_config.get_transform_params()["stream_row_groups"]
+    # the option is not passed to the transforms, that do not support streaming
+    launcher = PythonTransformLauncher(_FileLevelTransformConfiguration(), data_access_factory=DataAccessFactory())
+    sys.argv = ParamsUtils.dict_to_req({"runtime_stream_row_groups": True})
+    assert launcher._get_parameters(launcher._get_arguments(launcher._get_parser()))
+    assert "stream_row_groups" not in launcher.runtime_config.get_transform_params()
@@ -10,8 +10,16 @@
 # limitations under the License.
 ################################################################################
 
+import io
 import unittest
+from argparse import ArgumentParser
+from unittest.mock import patch
 
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xxhash
+from data_processing.transform import TransformConfiguration
 from data_processing.utils import TransformUtils
 
 
@@ -30,3 +38,133 @@ class TestUtils(unittest.TestCase):
 
         path = "http://myhostname.com/rel0_7/a/lang%3Den/dataset=freelaw/"
         self.assertEqual(expected_path, TransformUtils.clean_path(path))
+
+    def test_write_profile(self):
+        table = pa.Table.from_pydict({"a": list(range(100)), "b": [f"b_{i}" for i in range(100)]})
+        # default profile
+        data = TransformUtils.convert_arrow_to_binary(table=table)
+        metadata = pq.ParquetFile(io.BytesIO(data)).metadata
+        self.assertEqual("ZSTD", metadata.row_group(0).column(0).compression)
+        # custom profile
+        profile = {"compression": "snappy", "row_group_size": 30, "use_dictionary": False}
+        data = TransformUtils.convert_arrow_to_binary(table=table, write_profile=profile)
+        metadata = pq.ParquetFile(io.BytesIO(data)).metadata
+        self.assertEqual(4, metadata.num_row_groups)
+        self.assertEqual("SNAPPY", metadata.row_group(0).column(0).compression)
+        self.assertTrue(table.equals(TransformUtils.convert_binary_to_arrow(data=data)))
+
+    def test_shared_memory(self):
+        table = pa.Table.from_pydict({"a": list(range(100)), "b": [f"b_{i}" for i in range(100)]})
+        name, size = TransformUtils.convert_arrow_to_shared_memory(table=table)
+        shared_table, segment = TransformUtils.convert_shared_memory_to_arrow(name=name, size=size)
+        self.assertTrue(table.equals(shared_table))
+        # segment is removed once it is mapped, and can be closed once the table is released
+        with self.assertRaises(FileNotFoundError):
+            TransformUtils.convert_shared_memory_to_arrow(name=name, size=size)
+        with self.assertRaises(BufferError):
+            segment.close()
+        shared_table = None
+        segment.close()
+
+    def test_hash_array(self):
+        docs = ["Hello, World!\n", None, "", "Tom and Jerry. " * 1000, "hello world", "İx", "ΟΔΟΣ, Straße"]
+        # chunked array with a sliced chunk
+        array = pa.chunked_array([pa.array(["x"] + docs[:2]).slice(1), pa.array(docs[2:])])
+        normalized = TransformUtils.normalize_array(array)
+        self.assertEqual(
+            [None if doc is None else TransformUtils.normalize_string(doc) for doc in docs], normalized.to_pylist()
+        )
+        hashes = TransformUtils.hash_array(normalized)
+        self.assertEqual(
+            [
+                None if doc is None else TransformUtils.str_to_hash(TransformUtils.normalize_string(doc))
+                for doc in docs
+            ],
+            hashes.to_pylist(),
+        )
+        self.assertEqual(hashes[0], hashes[4])
+        hashes = TransformUtils.hash_array(pa.array(docs, type=pa.large_string()), algorithm="murmur3_32")
+        self.assertEqual([None if doc is None else TransformUtils.str_to_int(doc) for doc in docs], hashes.to_pylist())
+        hashes = TransformUtils.hash_array(array, algorithm="murmur3_64")
+        self.assertEqual(pa.uint64(), hashes.type)
+        self.assertEqual(1, hashes.null_count)
+        hashes = TransformUtils.hash_array(array, algorithm="murmur3_128")
+        self.assertEqual(pa.binary(16), hashes.type)
+        self.assertEqual(len(docs), len(set(hashes.to_pylist())))
+        hashes = TransformUtils.hash_array(array, algorithm="xxh3_64")
+        self.assertEqual(
+            [None if doc is None else xxhash.xxh3_64_intdigest(doc.encode("utf-8"), 42) for doc in docs],
+            hashes.to_pylist(),
+        )
+        hashes = TransformUtils.hash_array(array, algorithm="xxh3_128", seed=0)
+        self.assertEqual(pa.binary(16), hashes.type)
+        self.assertEqual(
+            [None if doc is None else xxhash.xxh3_128_digest(doc.encode("utf-8")) for doc in docs], hashes.to_pylist()
+        )
+        with self.assertRaises(ValueError):
+            TransformUtils.hash_array(array, algorithm="md5")
+        with self.assertRaises(TypeError):
+            TransformUtils.hash_array(pa.array([1, 2]))
+
+    def test_hash_array_parallel(self):
+        docs = [f"document {i} " * (i % 7) for i in range(1000)] + [None]
+        array = pa.chunked_array([pa.array(docs[:500]), pa.array(docs[500:]).slice(1)])
+        docs = docs[:500] + docs[501:]
+        # hash slices of at least 100 bytes in 4 threads
+        with patch("data_processing.utils.transform_utils.HASH_THREADS", 4), patch(
+            "data_processing.utils.transform_utils.HASH_SLICE_SIZE", 100
+        ):
+            self.assertEqual(
+                [None if doc is None else TransformUtils.str_to_hash(doc) for doc in docs],
+                TransformUtils.hash_array(array).to_pylist(),
+            )
+            self.assertEqual(
+                [None if doc is None else xxhash.xxh3_64_intdigest(doc.encode("utf-8"), 42) for doc in docs],
+                TransformUtils.hash_array(array, algorithm="xxh3_64").to_pylist(),
+            )
+
+    def test_add_columns(self):
+        table = pa.Table.from_pydict({"a": [1, 2, 3], "b": ["x", "y", "z"]})
+        table = table.replace_schema_metadata({"key": "value"})
+        table = TransformUtils.add_columns(
+            table=table,
+            columns={
+                "a": pa.chunked_array([[4], [5, 6]]),
+                "c": np.array([1.0, 2.0, 3.0]),
+                "d": pa.array([True, False, None]),
+                "e": ["1", "2", "3"],
+            },
+        )
+        self.assertEqual(["b", "a", "c", "d", "e"], table.schema.names)
+        self.assertEqual([4, 5, 6], table["a"].to_pylist())
+        self.assertEqual(pa.float64(), table.schema.field("c").type)
+        self.assertEqual([True, False, None], table["d"].to_pylist())
+        self.assertEqual({b"key": b"value"}, table.schema.metadata)
+        table = TransformUtils.add_column(table=table, name="b", content=[7, 8, 9])
+        self.assertEqual(["a", "c", "d", "e", "b"], table.schema.names)
+        with self.assertRaises(pa.ArrowInvalid):
+            TransformUtils.add_columns(table=table, columns={"f": [1, 2]})
+
+    def test_write_profile_params(self):
+        config = TransformConfiguration(
+            name="test", transform_class=None, write_profile={"compression": "gzip", "row_group_size": 1000}
+        )
+        parser = ArgumentParser()
+        config.add_write_profile_params(parser)
+        args = parser.parse_args(["--parquet_compression", "lz4", "--parquet_write_page_index", "True"])
+        self.assertTrue(config.apply_write_profile_params(args))
+        self.assertEqual(
+            {"compression": "lz4", "row_group_size": 1000, "write_page_index": True},
+            config.get_transform_params()["write_profile"],
+        )
+        args = parser.parse_args(["--parquet_row_group_size", "0"])
+        self.assertFalse(config.apply_write_profile_params(args))
+        # no profile, if neither the default profile nor the arguments are specified
+        config = TransformConfiguration(name="test", transform_class=None)
+        parser = ArgumentParser()
+        config.add_write_profile_params(parser)
+        self.assertTrue(config.apply_write_profile_params(parser.parse_args([])))
+        self.assertIsNone(config.get_transform_params().get("write_profile", None))
+        args = parser.parse_args(["--parquet_compression", "lz4"])
+        self.assertTrue(config.apply_write_profile_params(args))
+        self.assertEqual({"compression": "lz4"}, config.get_transform_params()["write_profile"])
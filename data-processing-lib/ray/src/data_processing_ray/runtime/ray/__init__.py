@@ -1,4 +1,10 @@
 from data_processing_ray.runtime.ray.ray_utils import RayUtils
+from data_processing_ray.runtime.ray.file_scheduler import RayFileScheduler
+from data_processing_ray.runtime.ray.object_store_data_access import (
+    DataAccessRayObjects,
+    RayDataAccessFactory,
+    RayObjectStore,
+)
 from data_processing_ray.runtime.ray.transform_statistics import TransformStatisticsRay
 from data_processing_ray.runtime.ray.transform_runtime import DefaultRayTransformRuntime
 from data_processing_ray.runtime.ray.runtime_configuration import RayTransformRuntimeConfiguration
@@ -15,7 +15,13 @@ import ast
 from typing import Any
 
 from data_processing.runtime import TransformExecutionConfiguration
-from data_processing.utils import CLIArgumentProvider, ParamsUtils, get_logger
+from data_processing.utils import (
+    MB,
+    CLIArgumentProvider,
+    ParamsUtils,
+    get_logger,
+    str2bool,
+)
 
 
 logger = get_logger(__name__)
@@ -36,7 +42,20 @@ class RayTransformExecutionConfiguration(TransformExecutionConfiguration):
         super().__init__(name=name, print_params=False)
         self.worker_options = {}
         self.n_workers = 1
+        self.min_workers = 1
+        self.max_workers = 1
         self.creation_delay = 0
+        self.largest_first = False
+        self.split_file_size = 0
+        self.in_flight = 1
+        self.min_ready_fraction = 1.0
+        self.actor_start_timeout = 120.0
+        self.batch_files = 1
+        self.batch_size = 0
+        self.max_retries = 3
+        self.auto_size_samples = 0
+        self.auto_size_headroom = 1.5
+        self.sharded_listing = False
 
     def add_input_params(self, parser: argparse.ArgumentParser) -> None:
         """
@@ -45,6 +64,20 @@ class RayTransformExecutionConfiguration(TransformExecutionConfiguration):
         :return:
         """
         parser.add_argument(f"--{cli_prefix}num_workers", type=int, default=1, help="number of workers")
+        parser.add_argument(
+            f"--{cli_prefix}min_workers",
+            type=int,
+            default=0,
+            help="minimum number of workers, idle workers are retired down to it once all the work is dispatched. "
+            "0 - number of workers",
+        )
+        parser.add_argument(
+            f"--{cli_prefix}max_workers",
+            type=int,
+            default=0,
+            help="maximum number of workers, workers are added up to it while cluster resources are available and "
+            "there is queued work. 0 - number of workers",
+        )
 
         help_example_dict = {
             "num_cpus": ["8", "Required number of CPUs."],
@@ -67,6 +100,79 @@ class RayTransformExecutionConfiguration(TransformExecutionConfiguration):
             + ParamsUtils.get_ast_help_text(help_example_dict),
         )
         parser.add_argument(f"--{cli_prefix}creation_delay", type=int, default=0, help="delay between actor' creation")
+        parser.add_argument(
+            f"--{cli_prefix}min_ready_fraction",
+            type=float,
+            default=1.0,
+            help="fraction of workers, that have to start before processing begins. The rest of the workers "
+            "join processing once they start",
+        )
+        parser.add_argument(
+            f"--{cli_prefix}actor_start_timeout",
+            type=float,
+            default=120.0,
+            help="maximum time (sec) to wait for min ready fraction of the workers to start",
+        )
+        parser.add_argument(
+            f"--{cli_prefix}largest_first",
+            type=lambda x: bool(str2bool(x)),
+            default=False,
+            help="dispatch files for processing largest first, instead of the listing order. Requires listing "
+            "all the input files with their sizes before processing starts",
+        )
+        parser.add_argument(
+            f"--{cli_prefix}split_file_size",
+            type=float,
+            default=0,
+            help="size (MB) of the files, that are split into parts (row group ranges) processed by different "
+            "workers, 0 - do not split files",
+        )
+        parser.add_argument(
+            f"--{cli_prefix}in_flight",
+            type=int,
+            default=1,
+            help="maximum number of outstanding requests per worker",
+        )
+        parser.add_argument(
+            f"--{cli_prefix}batch_files",
+            type=int,
+            default=1,
+            help="maximum number of files processed by a single request to a worker (micro batch), 1 - no batching",
+        )
+        parser.add_argument(
+            f"--{cli_prefix}batch_size",
+            type=float,
+            default=0,
+            help="maximum total size (MB) of the files in a micro batch, 0 - no limit",
+        )
+        parser.add_argument(
+            f"--{cli_prefix}max_retries",
+            type=int,
+            default=3,
+            help="maximum number of retries of a file, which processing failed because of a worker failure. Files "
+            "failing more times are quarantined and listed in the execution_stats of the job metadata",
+        )
+        parser.add_argument(
+            f"--{cli_prefix}auto_size_samples",
+            type=int,
+            default=0,
+            help="number of sample files processed by a single worker to measure its CPU and memory usage and "
+            "choose number of workers and their CPU and memory, overwriting num_workers and worker_options. "
+            "0 - no automatic sizing",
+        )
+        parser.add_argument(
+            f"--{cli_prefix}auto_size_headroom",
+            type=float,
+            default=1.5,
+            help="factor applied to the measured worker memory by automatic sizing to avoid OOM",
+        )
+        parser.add_argument(
+            f"--{cli_prefix}sharded_listing",
+            type=lambda x: bool(str2bool(x)),
+            default=False,
+            help="list input sub folders in parallel tasks and start processing files as soon as the first sub "
+            "folder is listed, instead of listing all the input on the orchestrator first",
+        )
         return TransformExecutionConfiguration.add_input_params(self, parser=parser)
 
     def apply_input_params(self, args: argparse.Namespace) -> bool:
@@ -81,7 +187,50 @@ class RayTransformExecutionConfiguration(TransformExecutionConfiguration):
         # store parameters locally
         self.worker_options = captured["worker_options"]
         self.n_workers = captured["num_workers"]
+        self.min_workers = captured["min_workers"] if captured["min_workers"] > 0 else self.n_workers
+        self.max_workers = captured["max_workers"] if captured["max_workers"] > 0 else self.n_workers
+        if not self.min_workers <= self.n_workers <= self.max_workers:
+            logger.error(
+                f"number of workers {self.n_workers} should be between min workers {self.min_workers} "
+                f"and max workers {self.max_workers}"
+            )
+            return False
         self.creation_delay = captured["creation_delay"]
+        self.min_ready_fraction = captured["min_ready_fraction"]
+        if not 0 < self.min_ready_fraction <= 1:
+            logger.error(f"min ready fraction {self.min_ready_fraction} should be in the range (0, 1]")
+            return False
+        self.actor_start_timeout = captured["actor_start_timeout"]
+        if self.actor_start_timeout <= 0:
+            logger.error(f"actor start timeout {self.actor_start_timeout} should be greater than 0")
+            return False
+        self.largest_first = captured["largest_first"]
+        self.split_file_size = captured["split_file_size"]
+        if self.split_file_size < 0:
+            logger.error(f"split file size {self.split_file_size} can not be negative")
+            return False
+        self.in_flight = captured["in_flight"]
+        self.batch_files = captured["batch_files"]
+        self.batch_size = captured["batch_size"]
+        if self.in_flight < 1 or self.batch_files < 1 or self.batch_size < 0:
+            logger.error(
+                f"in flight {self.in_flight} and batch files {self.batch_files} should be greater than 0 "
+                f"and batch size {self.batch_size} can not be negative"
+            )
+            return False
+        self.max_retries = captured["max_retries"]
+        if self.max_retries < 0:
+            logger.error(f"max retries {self.max_retries} can not be negative")
+            return False
+        self.auto_size_samples = captured["auto_size_samples"]
+        self.auto_size_headroom = captured["auto_size_headroom"]
+        if self.auto_size_samples < 0 or self.auto_size_headroom < 1:
+            logger.error(
+                f"auto size samples {self.auto_size_samples} can not be negative and auto size headroom "
+                f"{self.auto_size_headroom} should be at least 1"
+            )
+            return False
+        self.sharded_listing = captured["sharded_listing"]
         self.job_details = {
             "job category": "preprocessing",
             "job name": self.name,
@@ -93,8 +242,19 @@ class RayTransformExecutionConfiguration(TransformExecutionConfiguration):
             self.worker_options["max_restarts"] = -1
 
         # print them
-        logger.info(f"number of workers {self.n_workers} worker options {self.worker_options}")
-        logger.info(f"actor creation delay {self.creation_delay}")
+        logger.info(
+            f"number of workers {self.n_workers} (min {self.min_workers}, max {self.max_workers}) "
+            f"worker options {self.worker_options}"
+        )
+        logger.info(
+            f"actor creation delay {self.creation_delay}, min ready fraction {self.min_ready_fraction}, "
+            f"actor start timeout {self.actor_start_timeout} sec"
+        )
+        logger.info(f"largest first {self.largest_first}, split file size {self.split_file_size} MB")
+        logger.info(f"in flight {self.in_flight}, batch files {self.batch_files}, batch size {self.batch_size} MB")
+        logger.info(f"max retries {self.max_retries}")
+        logger.info(f"auto size samples {self.auto_size_samples}, auto size headroom {self.auto_size_headroom}")
+        logger.info(f"sharded listing {self.sharded_listing}")
         logger.info(f"job details {self.job_details}")
         return True
 
@@ -105,6 +265,22 @@ class RayTransformExecutionConfiguration(TransformExecutionConfiguration):
         """
         return {
             "number of workers": self.n_workers,
+            "min workers": self.min_workers,
+            "max workers": self.max_workers,
             "worker options": self.worker_options,
             "actor creation delay": self.creation_delay,
+            "min ready fraction": self.min_ready_fraction,
+            "actor start timeout, sec": self.actor_start_timeout,
+            "read ahead": self.read_ahead,
+            "write behind": self.write_behind,
+            "stream row groups": self.stream_row_groups,
+            "largest first": self.largest_first,
+            "split file size, MB": self.split_file_size,
+            "in flight": self.in_flight,
+            "batch files": self.batch_files,
+            "batch size, MB": self.batch_size,
+            "max retries": self.max_retries,
+            "auto size samples": self.auto_size_samples,
+            "auto size headroom": self.auto_size_headroom,
+            "sharded listing": self.sharded_listing,
         }
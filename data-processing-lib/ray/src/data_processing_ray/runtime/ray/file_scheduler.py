@@ -0,0 +1,594 @@
+# (C) Copyright IBM Corp. 2024.
+# Licensed under the Apache License, Version 2.0 (the “License”);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an “AS IS” BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+import logging
+import time
+from typing import Any, Callable
+
+import ray
+from data_processing.utils import UnrecoverableException
+from data_processing_ray.runtime.ray.ray_utils import (
+    MAX_RETRIES,
+    RESOURCES_POLL_INTERVAL,
+    RayUtils,
+)
+from ray import ObjectRefGenerator
+from ray.actor import ActorHandle
+from ray.exceptions import ActorUnavailableError
+from ray.util.metrics import Gauge
+
+
+class RayFileScheduler:
+    """
+    Scheduler of the processing of files by a pool of executor actors, see RayUtils.process_files:
+     - dispatch - work items (files or their parts), grouped into micro batches, are queued and sent to the
+       actors having capacity for them, up to in_flight requests per actor
+     - completion handling - results of the requests, listings of the input shards and readiness of the
+       joining, restarting and retiring actors are handled as they arrive
+     - retry - unprocessed work items of the failed requests are resubmitted, items failing more than
+       max_retries times are quarantined
+     - scaling - starting actors join once they are ready, an elastic pool adds actors while there is more
+       work than the actors can take and retires idle actors once all the work is dispatched
+    """
+
+    def __init__(
+        self,
+        executors: list[ActorHandle],
+        files: list[str],
+        print_interval: int,
+        logger: logging.Logger,
+        files_in_progress_gauge: Gauge = None,
+        files_completed_gauge: Gauge = None,
+        available_cpus_gauge: Gauge = None,
+        available_gpus_gauge: Gauge = None,
+        available_memory_gauge: Gauge = None,
+        object_memory_gauge: Gauge = None,
+        file_sizes: dict[str, int] = None,
+        split_size: int = 0,
+        largest_first: bool = True,
+        in_flight: int = 1,
+        batch_files: int = 1,
+        batch_size: int = 0,
+        resources_poll_interval: float = RESOURCES_POLL_INTERVAL,
+        joining: list[ActorHandle] = None,
+        create_actor: Callable[[], ActorHandle] = None,
+        actor_resources: dict[str, float] = None,
+        min_actors: int = 0,
+        max_actors: int = 0,
+        max_retries: int = MAX_RETRIES,
+        shards: list[tuple[str, bool]] = None,
+        list_shard: Callable[[str, bool], ray.ObjectRef] = None,
+        list_concurrency: int = 1,
+        read_file: Callable[[str], ray.ObjectRef] = None,
+    ):
+        """
+        Init method, see RayUtils.process_files for the description of the parameters.
+        Gauges are optional, progress and resources are not reported to the ones, that are not specified
+        """
+        self.executors = executors
+        self.print_interval = print_interval
+        self.logger = logger
+        self.files_in_progress_gauge = files_in_progress_gauge
+        self.files_completed_gauge = files_completed_gauge
+        self.available_cpus_gauge = available_cpus_gauge
+        self.available_gpus_gauge = available_gpus_gauge
+        self.available_memory_gauge = available_memory_gauge
+        self.object_memory_gauge = object_memory_gauge
+        self.file_sizes = file_sizes
+        self.split_size = split_size
+        self.largest_first = largest_first
+        self.in_flight = max(in_flight, 1)
+        self.batch_files = max(batch_files, 1)
+        self.batch_size = batch_size
+        self.resources_poll_interval = resources_poll_interval
+        self.create_actor = create_actor
+        self.actor_resources = actor_resources or {}
+        self.min_actors = min_actors
+        self.max_actors = max_actors
+        self.max_retries = max_retries
+        self.shards = shards
+        self.list_shard = list_shard
+        self.list_concurrency = max(list_concurrency, 1)
+        self.read_file = read_file
+        # work items and their micro batches, index of the next batch to dispatch
+        self.work = []
+        self.batches = []
+        self.next_batch = 0
+        self.add_work(files=files, file_sizes=file_sizes)
+        if len(self.work) > len(files):
+            logger.info(f"{len(files)} files are split into {len(self.work)} work items")
+        if len(self.batches) < len(self.work):
+            logger.info(f"{len(self.work)} work items are grouped into {len(self.batches)} micro batches")
+        # actors (retired and removed ones are replaced with None), number of outstanding requests and
+        # number of consecutive failures per actor
+        self.actors = list(executors)
+        self.actor_load = [0] * len(self.actors)
+        self.actor_errors = [0] * len(self.actors)
+        self.max_used = len(self.actors)
+        # outstanding requests - future to actor index and the batch of work items, that are not done yet
+        self.requests = {}
+        # readiness of the actors, that are still starting
+        self.joining_refs = {actor.__ray_ready__.remote(): actor for actor in (joining or [])}
+        # flush of the retiring actors - future to actor index
+        self.retiring = {}
+        # readiness of the failed actors, that are restarting - future to actor index
+        self.recovering = {}
+        # work items to resubmit, number of failures per work item, number of resubmitted items and
+        # quarantined files
+        self.retry_queue = []
+        self.attempts = {}
+        self.retried = 0
+        self.quarantined = []
+        # content of the files split into parts - file name to the reference to its content and the number of
+        # its parts, that are not done yet
+        self.file_contents = {}
+        # shards to list and listings in progress - future to shard
+        self.pending_shards = list(shards or [])
+        self.listing = {}
+        self.listing_retries = 0
+        # progress
+        self.actor_failures = 0
+        self.completed = 0
+        self.running = 0
+        self.last_poll = 0
+        self.t_start = time.time()
+        self.t_idle = None
+        self.t_end = None
+
+    def add_work(self, files: list[str], file_sizes: dict[str, int]) -> None:
+        """
+        Add files to the work
+        :param files: list of files to process
+        :param file_sizes: dictionary of file sizes, only used if the scheduler is created with file sizes
+        :return: None
+        """
+        work = RayUtils.schedule_files(
+            files=files,
+            file_sizes=None if self.file_sizes is None else file_sizes,
+            split_size=self.split_size,
+            largest_first=self.largest_first,
+        )
+        self.work.extend(work)
+        self.batches.extend(RayUtils.batch_work(work=work, batch_files=self.batch_files, batch_size=self.batch_size))
+
+    def n_queued(self) -> int:
+        """
+        Get number of micro batches waiting for dispatch
+        :return: number of queued batches
+        """
+        return len(self.retry_queue) + len(self.batches) - self.next_batch
+
+    def n_active(self) -> int:
+        """
+        Get number of actors processing files
+        :return: number of actors, that are neither removed nor retiring
+        """
+        return len([actor for actor in self.actors if actor is not None]) - len(self.retiring)
+
+    def listing_done(self) -> bool:
+        """
+        Check whether all the shards are listed
+        :return: True, if there are no shards to list
+        """
+        return len(self.listing) == 0 and len(self.pending_shards) == 0
+
+    def list_shards(self) -> None:
+        """
+        Start listing of the shards, up to list_concurrency at a time
+        :return: None
+        """
+        while len(self.listing) < self.list_concurrency and len(self.pending_shards) > 0:
+            shard = self.pending_shards.pop(0)
+            self.listing[self.list_shard(shard[0], shard[1])] = shard
+
+    def dispatch(self, actor_index: int, depth: int = None) -> None:
+        """
+        Send queued work to the actor, until it has depth outstanding requests. Retried work items go first
+        :param actor_index: index of the actor
+        :param depth: maximum number of outstanding requests of the actor, in_flight by default
+        :return: None
+        """
+        actor = self.actors[actor_index]
+        if actor is None or actor_index in self.retiring.values() or actor_index in self.recovering.values():
+            return
+        while self.actor_load[actor_index] < (depth or self.in_flight) and self.n_queued() > 0:
+            if len(self.retry_queue) > 0:
+                batch = self.retry_queue.pop(0)
+            else:
+                batch = self.batches[self.next_batch]
+                self.next_batch += 1
+            if len(batch) == 1 and batch[0][1] is not None and self.read_file is not None:
+                # part of the file, the file is read once for all its parts
+                f_name = batch[0][0]
+                if f_name not in self.file_contents:
+                    self.file_contents[f_name] = [self.read_file(f_name), batch[0][1][1]]
+                future = actor.process_file.remote(f_name, batch[0][1], self.file_contents[f_name][0])
+            elif len(batch) == 1:
+                future = actor.process_file.remote(batch[0][0], batch[0][1])
+            else:
+                # micro batch reports every processed file, so that only unprocessed files are retried
+                future = actor.process_batch.remote([item[0] for item in batch])
+                batch = list(batch)
+            self.requests[future] = (actor_index, batch)
+            self.actor_load[actor_index] += 1
+            self.running += len(batch)
+
+    def dispatch_all(self) -> None:
+        """
+        Send queued work to all the actors having capacity for it
+        :return: None
+        """
+        for index in range(len(self.actors)):
+            self.dispatch(actor_index=index)
+
+    def handle(self, future: Any) -> None:
+        """
+        Handle a completed future
+        :param future: reference to the result of a request, shard listing, actor start, restart or flush
+        :return: None
+        """
+        if future in self.listing:
+            self.on_listed(future=future)
+        elif future in self.joining_refs:
+            self.on_joined(future=future)
+        elif future in self.recovering:
+            self.on_recovered(future=future)
+        elif future in self.retiring:
+            self.on_retired(future=future)
+        else:
+            self.on_request(future=future)
+
+    def on_listed(self, future: ray.ObjectRef) -> None:
+        """
+        Add files of the listed shard to the work and start listing of the next shard
+        :param future: reference to the result of the listing
+        :return: None
+        """
+        shard = self.listing.pop(future)
+        try:
+            shard_files, shard_sizes, retries = ray.get(future)
+        except Exception as e:
+            self.logger.error(f"Failed to list shard {shard[0]}, terminating: {e}")
+            raise UnrecoverableException
+        self.listing_retries += retries
+        self.logger.info(f"Listed shard {shard[0]}, {len(shard_files)} files to process")
+        self.add_work(files=shard_files, file_sizes=shard_sizes)
+        self.list_shards()
+        self.dispatch_all()
+
+    def on_request(self, future: Any) -> None:
+        """
+        Handle completion of a request. Micro batches report processed files one at a time, they are done once
+        all the files are reported
+        :param future: reference to the result of the request or generator of the processed files of a micro batch
+        :return: None
+        """
+        actor_index, batch = self.requests[future]
+        try:
+            if isinstance(future, ObjectRefGenerator):
+                ray.get(next(future))
+                batch.pop(0)
+                self.running -= 1
+                self.complete(n_items=1)
+                return
+            ray.get(future)
+        except StopIteration:
+            pass
+        except UnrecoverableException as e:
+            self.logger.error(f"Got unrecoverable exception {e}, terminating")
+            raise UnrecoverableException
+        except Exception as e:
+            self.requests.pop(future)
+            self.actor_load[actor_index] -= 1
+            self.running -= len(batch)
+            self.logger.error(f"Failed to process {[item[0] for item in batch]}, worker exception {e}")
+            self.on_failure(actor_index=actor_index, batch=batch)
+            return
+        self.requests.pop(future)
+        self.actor_load[actor_index] -= 1
+        self.running -= len(batch)
+        self.actor_errors[actor_index] = 0
+        self.release_content(batch=batch)
+        self.complete(n_items=len(batch))
+        if self.n_queued() > 0:
+            # replace completed request
+            self.dispatch(actor_index=actor_index)
+        elif self.actor_load[actor_index] == 0 and self.listing_done():
+            self.on_idle(actor_index=actor_index)
+
+    def complete(self, n_items: int) -> None:
+        """
+        Count completed work items
+        :param n_items: number of completed work items
+        :return: None
+        """
+        if self.completed // self.print_interval < (self.completed + n_items) // self.print_interval:
+            self.logger.info(
+                f"Completed {self.completed + n_items} files in {round((time.time() - self.t_start)/60., 3)} min"
+            )
+        self.completed += n_items
+
+    def release_content(self, batch: list[tuple[str, tuple[int, int], int]]) -> None:
+        """
+        Release content of the files split into parts, once all their parts are done
+        :param batch: done work items
+        :return: None
+        """
+        for item in batch:
+            if item[1] is not None and item[0] in self.file_contents:
+                self.file_contents[item[0]][1] -= 1
+                if self.file_contents[item[0]][1] == 0:
+                    del self.file_contents[item[0]]
+
+    def on_failure(self, actor_index: int, batch: list[tuple[str, tuple[int, int], int]]) -> None:
+        """
+        Handle a failed request. The failure is charged to the actor and its work item in progress, unless
+        the actor already failed (other requests queued by it fail as well) or was removed
+        :param actor_index: index of the actor
+        :param batch: work items of the request, that are not done
+        :return: None
+        """
+        if self.actors[actor_index] is None or actor_index in self.recovering.values():
+            # other requests of the failed (or removed) actor are not charged to their work items,
+            # as only the first one was processed, when the actor failed
+            self.retry_queue.extend([[item] for item in batch])
+            self.retried += len(batch)
+        else:
+            self.actor_failures += 1
+            self.actor_errors[actor_index] += 1
+            self.retry(batch=batch)
+            if self.actor_errors[actor_index] > self.max_retries:
+                self.logger.error(f"Actor failed {self.actor_errors[actor_index]} times in a row, removing it")
+                self.remove_actor(actor_index=actor_index)
+            else:
+                # actor is restarted, it gets more work once it is ready
+                self.recovering[self.actors[actor_index].__ray_ready__.remote()] = actor_index
+        # resubmit failed work to the actors having capacity for it
+        self.dispatch_all()
+
+    def retry(self, batch: list[tuple[str, tuple[int, int], int]]) -> None:
+        """
+        Resubmit work items of a failed request individually, so that a failing item does not fail the rest
+        of its batch. Items are processed sequentially, only the first one was in progress, when the request
+        failed, and is charged a failure. It is quarantined, if it failed more than max_retries times
+        :param batch: work items of the request, that are not done
+        :return: None
+        """
+        if len(batch) == 0:
+            # all the items are processed, the request failed reporting its completion
+            return
+        item = batch[0]
+        key = (item[0], item[1])
+        self.attempts[key] = self.attempts.get(key, 0) + 1
+        if self.attempts[key] > self.max_retries:
+            name = item[0] if item[1] is None else f"{item[0]} part {item[1][0]}"
+            self.logger.error(f"{name} failed {self.attempts[key]} times, quarantining it")
+            self.quarantined.append(name)
+            self.release_content(batch=[item])
+            batch = batch[1:]
+        self.retry_queue.extend([[item] for item in batch])
+        self.retried += len(batch)
+
+    def on_recovered(self, future: ray.ObjectRef) -> None:
+        """
+        Handle readiness of a restarted actor, it gets more work once it is ready
+        :param future: reference to the readiness of the actor
+        :return: None
+        """
+        index = self.recovering.pop(future)
+        try:
+            ray.get(future)
+        except ActorUnavailableError:
+            # actor is still restarting
+            self.recovering[self.actors[index].__ray_ready__.remote()] = index
+            return
+        except Exception as e:
+            self.logger.error(f"Actor failed to restart {e}, removing it")
+            self.remove_actor(actor_index=index)
+            return
+        self.logger.info("Actor restarted")
+        self.dispatch(actor_index=index)
+
+    def poll_resources(self) -> dict[str, Any]:
+        """
+        Report available resources to the gauges
+        :return: available resources in the format of ray.available_resources()
+        """
+        self.last_poll = time.time()
+        RayUtils.get_available_resources(
+            available_cpus_gauge=self.available_cpus_gauge,
+            available_gpus_gauge=self.available_gpus_gauge,
+            available_memory_gauge=self.available_memory_gauge,
+            object_memory_gauge=self.object_memory_gauge,
+        )
+        return ray.available_resources()
+
+    def scale_up(self, resources: dict[str, Any]) -> None:
+        """
+        Add an actor to the elastic pool, if there is more queued work than the actors can take and the cluster
+        has enough resources for it
+        :param resources: available resources in the format of ray.available_resources()
+        :return: None
+        """
+        n_actors = self.n_active() + len(self.joining_refs)
+        if self.create_actor is None or n_actors >= self.max_actors:
+            return
+        if self.n_queued() <= self.in_flight * n_actors:
+            # actors can take all the queued work
+            return
+        if any(resources.get(key, 0) < val for key, val in self.actor_resources.items() if val > 0):
+            # not enough resources for an actor
+            return
+        actor = self.create_actor()
+        self.joining_refs[actor.__ray_ready__.remote()] = actor
+        self.logger.info(f"Adding actor, {n_actors + 1} actors")
+
+    def on_joined(self, future: ray.ObjectRef) -> None:
+        """
+        Add a started actor to the pool
+        :param future: reference to the readiness of the actor
+        :return: None
+        """
+        actor = self.joining_refs.pop(future)
+        try:
+            ray.get(future)
+        except Exception as e:
+            self.logger.warning(f"Actor failed to start: {e}")
+            return
+        self.actors.append(actor)
+        self.actor_load.append(0)
+        self.actor_errors.append(0)
+        self.max_used = max(self.max_used, self.n_active())
+        self.logger.info(f"Actor joined processing, {self.n_active()} actors are processing")
+        self.dispatch(actor_index=len(self.actors) - 1)
+
+    def on_idle(self, actor_index: int) -> None:
+        """
+        Handle an actor running out of work, once all the work is dispatched. Idle actors of the elastic pool
+        are flushed and retired, down to min_actors
+        :param actor_index: index of the actor
+        :return: None
+        """
+        if self.t_idle is None:
+            # all the work is dispatched and the first actor ran out of work
+            self.t_idle = time.time()
+            self.logger.info(
+                f"Completed {self.completed} files ({round(100 * self.completed / len(self.work), 3)}%)  "
+                f"in {round((self.t_idle - self.t_start)/60., 3)} min. Waiting for completion"
+            )
+        if self.create_actor is not None and self.n_active() > self.min_actors:
+            # retire idle actor
+            self.retiring[self.actors[actor_index].flush.remote()] = actor_index
+
+    def on_retired(self, future: ray.ObjectRef) -> None:
+        """
+        Remove a retiring actor, once it is flushed
+        :param future: reference to the result of the flush
+        :return: None
+        """
+        index = self.retiring.pop(future)
+        try:
+            ray.get(future)
+        except Exception as e:
+            self.logger.error(f"Failed to flush retiring actor {e}")
+            self.actor_failures += 1
+        ray.kill(self.actors[index])
+        self.actors[index] = None
+        self.logger.info(f"Actor retired, {self.n_active()} actors are processing")
+
+    def remove_actor(self, actor_index: int) -> None:
+        """
+        Remove a failing actor. If no actors are left and there is more work, an actor is added
+        :param actor_index: index of the actor
+        :return: None
+        """
+        ray.kill(self.actors[actor_index])
+        self.actors[actor_index] = None
+        if self.n_active() + len(self.joining_refs) == 0 and (self.n_queued() > 0 or not self.listing_done()):
+            if self.create_actor is None:
+                self.logger.error("All the actors failed, terminating")
+                raise UnrecoverableException
+            actor = self.create_actor()
+            self.joining_refs[actor.__ray_ready__.remote()] = actor
+            self.logger.info("All the actors failed, adding actor")
+
+    def in_progress(self) -> bool:
+        """
+        Check whether processing is in progress
+        :return: True, if there are outstanding requests, retiring actors, shards to list, or queued work and
+            actors, that can still take it
+        """
+        return (
+            len(self.requests) > 0
+            or len(self.retiring) > 0
+            or ((len(self.joining_refs) > 0 or len(self.recovering) > 0) and self.n_queued() > 0)
+            or not self.listing_done()
+        )
+
+    def run(self) -> tuple[int, dict[str, Any]]:
+        """
+        Process the files, see RayUtils.process_files
+        :return: number of actors failures and scheduling statistics
+        """
+        self.logger.debug("Begin processing files")
+        self.poll_resources()
+        self.t_start = time.time()
+        self.list_shards()
+        # fill the actors, one request per actor at a time, to spread the work
+        for depth in range(1, self.in_flight + 1):
+            for index in range(len(self.actors)):
+                self.dispatch(actor_index=index, depth=depth)
+        self._report_progress()
+        while self.in_progress():
+            if self.n_queued() == 0 and self.listing_done() and len(self.joining_refs) > 0:
+                # no more work for the actors, that are still starting
+                self._kill_joining()
+            ready, _ = ray.wait(
+                list(self.requests.keys())
+                + list(self.joining_refs.keys())
+                + list(self.retiring.keys())
+                + list(self.recovering.keys())
+                + list(self.listing.keys()),
+                num_returns=1,
+                timeout=self.resources_poll_interval,
+            )
+            for future in ready:
+                self.handle(future=future)
+            self._report_progress()
+            if time.time() - self.last_poll >= self.resources_poll_interval:
+                self.scale_up(resources=self.poll_resources())
+        self._kill_joining()
+        self.poll_resources()
+        # return actors, that have to be flushed
+        self.executors[:] = [actor for actor in self.actors if actor is not None]
+        self.t_end = time.time()
+        self.logger.info(
+            f"Completed processing {self.completed} files in {round((self.t_end - self.t_start)/60, 3)} min, "
+            f"straggler time {round(self._get_straggler_time(), 3)} sec, retried {self.retried} work items, "
+            f"quarantined {len(self.quarantined)} files"
+        )
+        return self.actor_failures, self.get_stats()
+
+    def get_stats(self) -> dict[str, Any]:
+        """
+        Get scheduling statistics, see RayUtils.process_files
+        :return: dictionary of scheduling statistics
+        """
+        stats = {
+            "work items": len(self.work),
+            "straggler time, sec": round(self._get_straggler_time(), 3),
+            "max actors": self.max_used,
+            "retried work items": self.retried,
+        }
+        if len(self.quarantined) > 0:
+            stats["quarantined files"] = self.quarantined
+        if self.shards is not None:
+            stats["listed shards"] = len(self.shards)
+            stats["listing retries"] = self.listing_retries
+        return stats
+
+    def _get_straggler_time(self) -> float:
+        # time from the moment the first actor ran out of work until completion (or now)
+        if self.t_idle is None:
+            return 0
+        return (self.t_end or time.time()) - self.t_idle
+
+    def _kill_joining(self) -> None:
+        for actor in self.joining_refs.values():
+            ray.kill(actor)
+        self.joining_refs = {}
+
+    def _report_progress(self) -> None:
+        if self.files_in_progress_gauge is not None:
+            self.files_in_progress_gauge.set(self.running)
+        if self.files_completed_gauge is not None:
+            self.files_completed_gauge.set(self.completed)
@@ -0,0 +1,443 @@
+# (C) Copyright IBM Corp. 2024.
+# Licensed under the Apache License, Version 2.0 (the “License”);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an “AS IS” BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+import argparse
+import inspect
+from typing import Any, Union
+
+import pyarrow as pa
+import ray
+from data_processing.data_access import DataAccess, DataAccessFactory
+from data_processing.utils import TransformUtils, get_logger, str2bool
+from ray.actor import ActorHandle
+
+
+logger = get_logger(__name__)
+
+OBJECT_STORE_NAME = "dpk_object_store"
+OBJECT_STORE_NAMESPACE = "data_prep_kit"
+# ray.put accepts the private _owner argument (in Ray 2.x, tested with 2.36), allowing a worker to put an object
+# owned by another actor. As it is not a public API, its availability is checked. If it is not available, objects
+# are put by the object store actor itself, at the cost of passing their content through the actor
+OWNER_PUT = "_owner" in inspect.signature(ray.put).parameters
+
+
+@ray.remote(num_cpus=0)
+class RayObjectStore:
+    """
+    Detached actor keeping references to the files saved to the Ray object store. The objects are owned
+    by this actor, so they outlive the job that created them and can be used by the next steps of the
+    pipeline running in the same cluster
+    """
+
+    def __init__(self):
+        """
+        Initialization
+        """
+        # file name to a tuple of (list of object references, size)
+        self.files = {}
+
+    def add(self, path: str, refs: list[ray.ObjectRef], size: int) -> None:
+        """
+        Register a file
+        :param path: file path
+        :param refs: list containing a reference to the file content. The reference is wrapped in the
+            list to prevent Ray from resolving it
+        :param size: file size (bytes)
+        :return: None
+        """
+        self.files[path] = (refs, size)
+
+    def put(self, path: str, data: bytes) -> None:
+        """
+        Put a file to the object store. Used, if the object can not be put by the caller on behalf of the store
+        :param path: file path
+        :param data: file content
+        :return: None
+        """
+        self.add(path=path, refs=[ray.put(data)], size=len(data))
+
+    def ready(self) -> bool:
+        """
+        Check that the object store is running
+        :return: True
+        """
+        return True
+
+    def list_files(self, path: str) -> list[dict[str, Any]]:
+        """
+        Get files for a given folder and all sub folders
+        :param path: path
+        :return: list of files as dictionaries of name and size
+        """
+        prefix = _folder_prefix(path)
+        return [
+            {"name": name, "size": size} for name, (_, size) in sorted(self.files.items()) if name.startswith(prefix)
+        ]
+
+    def get(self, path: str) -> list[ray.ObjectRef]:
+        """
+        Get a file
+        :param path: file path
+        :return: list containing a reference to the file content or None, if the file does not exist
+        """
+        file = self.files.get(path, None)
+        if file is None:
+            return None
+        return file[0]
+
+    def remove(self, path: str) -> int:
+        """
+        Remove files of a given folder and all sub folders, releasing their objects
+        :param path: path
+        :return: number of removed files
+        """
+        prefix = _folder_prefix(path)
+        names = [name for name in self.files.keys() if name.startswith(prefix)]
+        for name in names:
+            self.files.pop(name)
+        return len(names)
+
+
+def _folder_prefix(path: str) -> str:
+    """
+    Get prefix of all the files of a folder
+    :param path: folder path
+    :return: prefix
+    """
+    if path.endswith("/"):
+        return path
+    return f"{path}/"
+
+
+def _merge_files(files: list[dict[str, Any]], store_files: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Merge listings of the storage and the object store
+    :param files: files of the storage
+    :param store_files: files of the object store, replacing the storage files with the same names
+    :return: merged list of files, sorted by name
+    """
+    merged = {file["name"]: file for file in files} | {file["name"]: file for file in store_files}
+    return [merged[name] for name in sorted(merged.keys())]
+
+
+def get_object_store() -> ActorHandle:
+    """
+    Get the object store of the cluster, creating it on the first usage
+    :return: object store actor
+    """
+    store = RayObjectStore.options(
+        name=OBJECT_STORE_NAME, namespace=OBJECT_STORE_NAMESPACE, lifetime="detached", get_if_exists=True
+    ).remote()
+    # objects can only be put on behalf of a running actor
+    ray.get(store.ready.remote())
+    return store
+
+
+class DataAccessRayObjects(DataAccess):
+    """
+    Implementation of the data access, that passes files through the Ray object store. Files are saved
+    as objects and read back from it, when they exist there, so that the next step of a pipeline, running in the
+    same cluster, consumes the outputs of the previous one without serializing them to the storage and listing
+    them. Everything else (folders, data sets, job metadata and, optionally, durable copies of the saved files)
+    is delegated to the wrapped data access
+    """
+
+    def __init__(self, data_access: DataAccess, durable: bool = False, release_input: bool = True):
+        """
+        Create data access class
+        :param data_access: wrapped (local or S3) data access
+        :param durable: flag to also save files using the wrapped data access, e.g. to use them for checkpointing
+        :param release_input: flag to release the files of the input folder from the object store, once the step
+            consuming them completes successfully (see release_input_files)
+        """
+        super().__init__(
+            d_sets=data_access.d_sets,
+            checkpoint=data_access.checkpoint,
+            m_files=data_access.m_files,
+            n_samples=data_access.n_samples,
+            files_to_use=data_access.files_to_use,
+            files_to_checkpoint=data_access.files_to_checkpoint,
+            checkpoint_manifest=data_access.checkpoint_manifest,
+        )
+        self.data_access = data_access
+        self.durable = durable
+        self.release_input = release_input
+        self.store = None
+
+    def _get_store(self) -> ActorHandle:
+        """
+        Get object store, connecting to it on the first usage
+        :return: object store actor
+        """
+        if self.store is None:
+            self.store = get_object_store()
+        return self.store
+
+    def get_output_folder(self) -> str:
+        """
+        Get output folder as a string
+        :return: output_folder
+        """
+        return self.data_access.get_output_folder()
+
+    def get_input_folder(self) -> str:
+        """
+        Get input folder as a string
+        :return: input_folder
+        """
+        return self.data_access.get_input_folder()
+
+    def _get_folders_to_use(self) -> tuple[list[str], int]:
+        """
+        convert data sets to a list of folders to use
+        :return: list of folders and retries
+        """
+        return self.data_access._get_folders_to_use()
+
+    def _list_files_folder(self, path: str) -> tuple[list[dict[str, Any]], int]:
+        """
+        Get files for a given folder and all sub folders. Files of the object store are merged with the
+        files of the wrapped data access, object store taking precedence for the files existing in both
+        :param path: path
+        :return: List of files
+        """
+        files, retries = self.data_access._list_files_folder(path=path)
+        return _merge_files(files, ray.get(self._get_store().list_files.remote(path))), retries
+
+    def _list_folder(self, path: str) -> tuple[list[dict[str, Any]], list[str], int]:
+        """
+        Get files and sub folders of a given folder, without going through the sub folders. Files and sub
+        folders of the object store are merged with the ones of the wrapped data access
+        :param path: path
+        :return: list of files, list of sub folders and number of retries
+        """
+        level, folders, retries = self.data_access._list_folder(path=path)
+        prefix = _folder_prefix(path)
+        folders = set(folders)
+        store_level = []
+        for file in ray.get(self._get_store().list_files.remote(path)):
+            name = file["name"][len(prefix) :]
+            if "/" in name:
+                folders.add(f"{prefix}{name.split('/')[0]}")
+            else:
+                store_level.append(file)
+        return _merge_files(level, store_level), sorted(folders), retries
+
+    def _get_object(self, path: str) -> bytes:
+        """
+        Get file content from the object store
+        :param path: file path
+        :return: file content or None, if the file is not in the object store
+        """
+        refs = ray.get(self._get_store().get.remote(path))
+        if refs is None:
+            return None
+        return ray.get(refs[0])
+
+    def get_table(self, path: str, columns: list[str] = None, filters: Any = None) -> tuple[pa.table, int]:
+        """
+        Get pyArrow table for a given path
+        :param path - file path
+        :param columns - optional list of columns to read, default None - all columns
+        :param filters - optional row filter, see TransformUtils.convert_binary_to_arrow, default None
+        :return: pyArrow table or None, if the table read failed and number of operation retries.
+        """
+        data = self._get_object(path=path)
+        if data is None:
+            return self.data_access.get_table(path=path, columns=columns, filters=filters)
+        return TransformUtils.convert_binary_to_arrow(data=data, columns=columns, filters=filters), 0
+
+    def get_file(self, path: str) -> tuple[bytes, int]:
+        """
+        Get file as a byte array
+        :param path: file path
+        :return: bytes array of file content and number of operation retries
+        """
+        data = self._get_object(path=path)
+        if data is None:
+            return self.data_access.get_file(path=path)
+        return data, 0
+
+    def get_file_buffer(self, path: str) -> tuple[pa.Buffer, int]:
+        """
+        Get file content as a pyarrow buffer
+        :param path: file path
+        :return: file content as a buffer or None and number of retries
+        """
+        data = self._get_object(path=path)
+        if data is None:
+            return self.data_access.get_file_buffer(path=path)
+        return pa.py_buffer(data), 0
+
+    def save_file(self, path: str, data: bytes) -> tuple[dict[str, Any], int]:
+        """
+        Save byte array to the object store and, if durable writes are enabled, using the wrapped data access
+        :param path: file path
+        :param data: byte array
+        :return: a dictionary with name and size of the file or None in the case of failure
+            and number of operation retries
+        """
+        if self.get_output_folder() is not None and path.startswith(self.get_checkpoint_manifest_folder()):
+            # checkpoint manifest has to survive the cluster
+            return self.data_access.save_file(path=path, data=data)
+        store = self._get_store()
+        if isinstance(data, pa.Buffer):
+            data = data.to_pybytes()
+        try:
+            # the object is owned by the store, so that it outlives this worker
+            if OWNER_PUT:
+                ref = ray.put(data, _owner=store)
+                ray.get(store.add.remote(path, [ref], len(data)))
+            else:
+                ray.get(store.put.remote(path, data))
+        except Exception as e:
+            logger.error(f"Error saving {path} to the object store: {e}")
+            return None, 0
+        if self.durable:
+            return self.data_access.save_file(path=path, data=data)
+        return {"name": path, "size": len(data)}, 0
+
+    def save_table(self, path: str, table: pa.Table) -> tuple[int, dict[str, Any], int]:
+        """
+        Save table to a given location
+        :param path: location to save table
+        :param table: table
+        :return: size of table in memory, a dictionary with name and size of the file or None in the case
+            of failure and number of operation retries
+        """
+        data = TransformUtils.convert_arrow_to_binary(table=table)
+        if data is None:
+            return -1, None, 0
+        file_info, retries = self.save_file(path=path, data=data)
+        return table.nbytes, file_info, retries
+
+    def save_job_metadata(self, metadata: dict[str, Any]) -> tuple[dict[str, Any], int]:
+        """
+        Save job metadata. Metadata is always saved using the wrapped data access
+        :param metadata: job metadata
+        :return: a dictionary as defined by the wrapped data access and number of operation retries
+        """
+        return self.data_access.save_job_metadata(metadata=metadata)
+
+    def release(self, path: str) -> int:
+        """
+        Release files of a given folder from the object store, once they are no longer required
+        by the pipeline
+        :param path: folder path
+        :return: number of released files
+        """
+        return ray.get(self._get_store().remove.remote(path))
+
+    def release_input_files(self) -> int:
+        """
+        Release files of the input folder (or the data sets folders) from the object store, unless disabled.
+        Used by the orchestrator, once the step consuming them completes successfully
+        :return: number of released files
+        """
+        if not self.release_input or self.get_output_folder() is None:
+            return 0
+        if self.d_sets is not None:
+            folders, _ = self._get_folders_to_use()
+        else:
+            folders = [self.get_input_folder()]
+        return sum(self.release(path=folder) for folder in folders)
+
+
+class RayDataAccessFactory(DataAccessFactory):
+    """
+    Data access factory, supporting passing files between the steps of a pipeline through the Ray object store
+    """
+
+    def __init__(self, cli_arg_prefix: str = "data_", enable_data_navigation: bool = True):
+        """
+        Create the factory
+        :param cli_arg_prefix:  if provided, this will be prepended to all the CLI arguments names.
+               Make sure it ends with _
+        :param enable_data_navigation: if true enables CLI args and configuration for input/output paths,
+            data sets, checkpointing, files to use, sampling and max files.
+        """
+        super().__init__(cli_arg_prefix=cli_arg_prefix, enable_data_navigation=enable_data_navigation)
+        self.object_store = False
+        self.object_store_durable = False
+        self.object_store_release = True
+
+    def add_input_params(self, parser: argparse.ArgumentParser) -> None:
+        """
+        Define data access specific parameters
+        :param parser: parser
+        :return: None
+        """
+        super().add_input_params(parser=parser)
+        parser.add_argument(
+            f"--{self.cli_arg_prefix}object_store",
+            type=lambda x: bool(str2bool(x)),
+            default=False,
+            help="flag to save files to and read them from the Ray object store, so that the next steps of a "
+            "pipeline, running in the same cluster, use them without re-reading from the storage",
+        )
+        parser.add_argument(
+            f"--{self.cli_arg_prefix}object_store_durable",
+            type=lambda x: bool(str2bool(x)),
+            default=False,
+            help="flag to also save files passed through the Ray object store to the storage",
+        )
+        parser.add_argument(
+            f"--{self.cli_arg_prefix}object_store_release",
+            type=lambda x: bool(str2bool(x)),
+            default=True,
+            help="flag to release input files from the Ray object store, once the step consuming them completes. "
+            "Disable it if several steps consume the same files",
+        )
+
+    def apply_input_params(self, args: Union[dict, argparse.Namespace]) -> bool:
+        """
+        Validate data access specific parameters
+        :param args: user defined arguments
+        :return: True, if validate pass or False otherwise
+        """
+        if not super().apply_input_params(args=args):
+            return False
+        arg_dict = vars(args) if isinstance(args, argparse.Namespace) else args
+        self.object_store = arg_dict.get(f"{self.cli_arg_prefix}object_store", False)
+        self.object_store_durable = arg_dict.get(f"{self.cli_arg_prefix}object_store_durable", False)
+        self.object_store_release = arg_dict.get(f"{self.cli_arg_prefix}object_store_release", True)
+        if self.object_store:
+            self.logger.info(
+                f"data factory {self.cli_arg_prefix} is using Ray object store, durable {self.object_store_durable}, "
+                f"releasing input {self.object_store_release}"
+            )
+        return True
+
+    def get_input_params(self) -> dict[str, Any]:
+        """
+        get input parameters for job_input_params for metadata
+        :return: dictionary of params
+        """
+        params = super().get_input_params()
+        if self.object_store:
+            params["object_store"] = True
+            params["object_store_durable"] = self.object_store_durable
+            params["object_store_release"] = self.object_store_release
+        return params
+
+    def create_data_access(self) -> DataAccess:
+        """
+        Create data access based on the parameters
+        :return: corresponding data access class
+        """
+        data_access = super().create_data_access()
+        if self.object_store:
+            return DataAccessRayObjects(
+                data_access=data_access, durable=self.object_store_durable, release_input=self.object_store_release
+            )
+        return data_access
@@ -11,15 +11,25 @@
 ################################################################################
 
 import logging
+import math
 import time
-from typing import Any
+from typing import Any, Callable
 
 import ray
-from ray.experimental.state.api import list_actors
-from data_processing.utils import GB, UnrecoverableException
+from data_processing.utils import GB, UnrecoverableException, get_logger
 from ray.actor import ActorHandle
-from ray.exceptions import RayError
-from ray.util.actor_pool import ActorPool
+
+
+# default interval (sec) of polling available cluster resources
+RESOURCES_POLL_INTERVAL = 10.0
+# default number of retries of a work item, failed because of its actor failure
+MAX_RETRIES = 3
+# default time (sec) to wait for the actors to start
+ACTORS_START_TIMEOUT = 120.0
+# default factor applied to the measured actor memory to avoid OOM
+AUTO_SIZE_HEADROOM = 1.5
+
+logger = get_logger(__name__)
 
 
 class RayUtils:
@@ -95,7 +105,7 @@ class RayUtils:
         clazz: type, params: dict[str, Any], actor_options: dict[str, Any], n_actors: int, creation_delay: int = 0
     ) -> list[ActorHandle]:
         """
-        Create a set of actors
+        Create a set of actors and wait for all of them to start
         :param clazz: actor class, has to be annotated as remote
         :param params: actor init params
         :param actor_options: dictionary of actor options.
@@ -104,25 +114,185 @@ class RayUtils:
         :param creation_delay - delay between actor's creations
         :return: a list of actor handles
         """
+        actors, _ = RayUtils.start_actors(
+            clazz=clazz,
+            params=params,
+            actor_options=actor_options,
+            n_actors=n_actors,
+            creation_delay=creation_delay,
+        )
+        return actors
+
+    @staticmethod
+    def start_actors(
+        clazz: type,
+        params: dict[str, Any],
+        actor_options: dict[str, Any],
+        n_actors: int,
+        creation_delay: int = 0,
+        min_fraction: float = 1.0,
+        timeout: float = ACTORS_START_TIMEOUT,
+    ) -> tuple[list[ActorHandle], list[ActorHandle]]:
+        """
+        Create a set of actors and wait until the required fraction of them starts. Readiness of the actors
+        is detected by waiting (ray.wait) for their built-in __ray_ready__ method
+        :param clazz: actor class, has to be annotated as remote
+        :param params: actor init params
+        :param actor_options: dictionary of actor options.
+        see https://docs.ray.io/en/latest/ray-core/api/doc/ray.actor.ActorClass.options.html
+        :param n_actors: number of actors
+        :param creation_delay - delay between actor's creations
+        :param min_fraction: minimal fraction of the actors, that have to start before returning
+        :param timeout: maximum time (sec) to wait for the actors to start
+        :return: a tuple of the list of started actors and the list of actors, that are still starting
+        """
 
         def operator() -> ActorHandle:
             time.sleep(creation_delay)
             return clazz.options(**actor_options).remote(params)
 
-        cls_name = clazz.__class__.__name__.replace('ActorClass(', '').replace(')','')
         actors = [operator() for _ in range(n_actors)]
-        for i in range(120):
-            time.sleep(1)
-            alive = list_actors(filters=[("class_name", "=", cls_name), ("state", "=", "ALIVE")])
-            if len(actors) == len(alive):
-                return actors
-        # failed - raise an exception
-        print(f"created {actors}, alive {alive}")
-        raise UnrecoverableException(f"out of {len(actors)} created actors only {len(alive)} alive")
+        min_ready = min(n_actors, max(math.ceil(n_actors * min_fraction), 1))
+        pending = {actor.__ray_ready__.remote(): index for index, actor in enumerate(actors)}
+        ready = []
+        deadline = time.time() + timeout
+        while len(ready) < min_ready and len(pending) > 0:
+            done, _ = ray.wait(
+                list(pending.keys()),
+                num_returns=min(min_ready - len(ready), len(pending)),
+                timeout=max(deadline - time.time(), 0),
+            )
+            if len(done) == 0:
+                # timed out
+                break
+            for ref in done:
+                index = pending.pop(ref)
+                try:
+                    ray.get(ref)
+                    ready.append(index)
+                except Exception as e:
+                    logger.warning(f"Actor {index} failed to start: {e}")
+        if len(ready) < min_ready:
+            # failed - raise an exception
+            raise UnrecoverableException(
+                f"out of {n_actors} created actors only {len(ready)} alive, required {min_ready}"
+            )
+        if len(pending) > 0:
+            logger.info(f"{len(ready)} out of {n_actors} actors started, {len(pending)} are still starting")
+        return [actors[index] for index in sorted(ready)], [actors[index] for index in sorted(pending.values())]
+
+    @staticmethod
+    def schedule_files(
+        files: list[str], file_sizes: dict[str, int] = None, split_size: int = 0, largest_first: bool = True
+    ) -> list[tuple[str, tuple[int, int], int]]:
+        """
+        Build the list of work items for processing. If file sizes are known, work items can be ordered
+        largest first (LPT scheduling), so that large files do not end up processed at the end of the run,
+        leaving the rest of the actors idle. Files larger than split_size are split into parts processed
+        by different actors
+        :param files: list of files to process
+        :param file_sizes: optional dictionary of file sizes (bytes). If None, listing order is preserved
+        :param split_size: maximum size of the work item (bytes), 0 - do not split files
+        :param largest_first: flag to order the work items largest first, if file sizes are known
+        :return: list of work items - tuples of file name, part (index and number of parts or None) and size
+        """
+        if file_sizes is None:
+            return [(f_name, None, 0) for f_name in files]
+        work = []
+        for f_name in files:
+            size = file_sizes.get(f_name, 0)
+            if 0 < split_size < size:
+                n_parts = math.ceil(size / split_size)
+                work += [(f_name, (part, n_parts), size / n_parts) for part in range(n_parts)]
+            else:
+                work.append((f_name, None, size))
+        if not largest_first:
+            return work
+        # sort is stable, equal sizes preserve listing order
+        return sorted(work, key=lambda item: item[2], reverse=True)
+
+    @staticmethod
+    def batch_work(
+        work: list[tuple[str, tuple[int, int], int]], batch_files: int = 1, batch_size: int = 0
+    ) -> list[list[tuple[str, tuple[int, int], int]]]:
+        """
+        Group consecutive work items into micro batches, processed by a single remote call.
+        Parts of the files are never batched
+        :param work: list of work items, see schedule_files
+        :param batch_files: maximum number of files in a batch, 1 - no batching
+        :param batch_size: maximum total size (bytes) of the files in a batch, 0 - no limit
+        :return: list of batches of work items
+        """
+        batches = []
+        batch = []
+        batch_bytes = 0
+        for item in work:
+            if len(batch) > 0 and (
+                len(batch) >= batch_files or item[1] is not None or (0 < batch_size < batch_bytes + item[2])
+            ):
+                batches.append(batch)
+                batch = []
+                batch_bytes = 0
+            batch.append(item)
+            batch_bytes += item[2]
+            if item[1] is not None:
+                # part of the file is a batch on its own
+                batches.append(batch)
+                batch = []
+                batch_bytes = 0
+        if len(batch) > 0:
+            batches.append(batch)
+        return batches
+
+    @staticmethod
+    def get_actor_resources(actor_options: dict[str, Any]) -> dict[str, float]:
+        """
+        Get resources required by an actor
+        :param actor_options: dictionary of actor options
+        :return: dictionary of the required resources in the format of ray.available_resources()
+        """
+        return {
+            "CPU": actor_options.get("num_cpus", 1),
+            "GPU": actor_options.get("num_gpus", 0),
+            "memory": actor_options.get("memory", 0),
+        } | actor_options.get("resources", {})
+
+    @staticmethod
+    def plan_actors(
+        profile: dict[str, float],
+        resources: dict[str, float],
+        actor_options: dict[str, Any],
+        n_files: int,
+        memory_scale: float = 1.0,
+        headroom: float = AUTO_SIZE_HEADROOM,
+    ) -> tuple[int, dict[str, Any]]:
+        """
+        Choose number of actors and their options based on the resources used for processing of the sample files.
+        Actors get CPUs matching CPU utilization of the processing and memory matching its peak, so that the
+        maximum number of actors fitting into available resources runs without running out of memory
+        :param profile: resources used for processing a file, see RayTransformFileProcessor.profile_files
+        :param resources: available resources in the format of ray.available_resources()
+        :param actor_options: dictionary of actor options, options other than num_cpus and memory are preserved
+        :param n_files: number of files to process, no more actors than files are used
+        :param memory_scale: scale of the memory used for processing, e.g. ratio of the largest file size to
+            the largest sampled file size
+        :param headroom: factor applied to the estimated memory to avoid OOM
+        :return: number of actors (0, if the actor does not fit into available resources) and actor options
+        """
+        # CPU utilization, rounded up to 0.1 CPU
+        utilization = profile["cpu_time"] / max(profile["wall_time"], 1e-6)
+        cpus = max(round(math.ceil(utilization * 10) / 10, 1), 0.1)
+        memory = profile["base_memory"] + (profile["peak_memory"] - profile["base_memory"]) * memory_scale
+        options = actor_options | {"num_cpus": cpus, "memory": int(memory * headroom)}
+        n_actors = n_files
+        for name, value in RayUtils.get_actor_resources(actor_options=options).items():
+            if value > 0:
+                n_actors = min(n_actors, int(resources.get(name, 0) / value))
+        return max(n_actors, 0), options
 
     @staticmethod
     def process_files(
-        executors: ActorPool,
+        executors: list[ActorHandle],
         files: list[str],
         print_interval: int,
         files_in_progress_gauge: Gauge,
@@ -132,10 +302,28 @@ class RayUtils:
         available_memory_gauge: Gauge,
         object_memory_gauge: Gauge,
         logger: logging.Logger,
-    ) -> int:
+        file_sizes: dict[str, int] = None,
+        split_size: int = 0,
+        largest_first: bool = True,
+        in_flight: int = 1,
+        batch_files: int = 1,
+        batch_size: int = 0,
+        resources_poll_interval: float = RESOURCES_POLL_INTERVAL,
+        joining: list[ActorHandle] = None,
+        create_actor: Callable[[], ActorHandle] = None,
+        actor_resources: dict[str, float] = None,
+        min_actors: int = 0,
+        max_actors: int = 0,
+        max_retries: int = MAX_RETRIES,
+        shards: list[tuple[str, bool]] = None,
+        list_shard: Callable[[str, bool], ray.ObjectRef] = None,
+        list_concurrency: int = 1,
+        read_file: Callable[[str], ray.ObjectRef] = None,
+    ) -> tuple[int, dict[str, Any]]:
         """
         Process files
-        :param executors: actor pool of executors
+        :param executors: list of executor actors. The list is updated in place - on return it contains
+                          all the actors, that were used for processing and not retired, and have to be flushed
         :param files: list of files to process
         :param print_interval: print interval
         :param files_in_progress_gauge: ray Gauge to report files in process
@@ -145,85 +333,79 @@ class RayUtils:
         :param available_memory_gauge: ray Gauge to report available memory
         :param object_memory_gauge: ray Gauge to report available object memory
         :param logger: logger
-        :return: number of actors failures
+        :param file_sizes: optional dictionary of file sizes, used for largest first scheduling and splitting
+        :param split_size: maximum size of the work item (bytes), larger files are split into parts
+                           (range of row groups). 0 - do not split files
+        :param largest_first: flag to dispatch work items largest first, if file sizes are specified
+        :param in_flight: maximum number of outstanding requests per actor. Requests above 1 are queued
+                          by the actor, so that it does not wait for the next request after completing one
+        :param batch_files: maximum number of files processed by a single request (micro batch)
+        :param batch_size: maximum total size (bytes) of the files in a micro batch, 0 - no limit
+        :param resources_poll_interval: interval (sec) of updating available resources gauges
+        :param joining: optional list of executor actors, that are still starting (see start_actors). They
+                        start getting work once they are ready. Actors, that did not start before all the work
+                        is dispatched, are killed
+        :param create_actor: optional function creating a new executor actor. If specified, the pool is elastic:
+                             while there are more queued requests than the actors can take, an actor is added
+                             (at most one per resources poll), if the cluster has enough resources. Once the work
+                             is dispatched, idle actors are flushed and retired
+        :param actor_resources: resources required by an actor (see get_actor_resources)
+        :param min_actors: minimum number of actors of the elastic pool
+        :param max_actors: maximum number of actors of the elastic pool
+        :param max_retries: maximum number of retries of a work item. Unprocessed work items of the failed requests
+                            (e.g. because their actor died) are resubmitted individually, only the item, that was
+                            in progress, is charged a failure. Micro batches report every processed file, so that
+                            processed files are not resubmitted. Items failing more than max_retries times are
+                            quarantined. Actors failing more than max_retries times in a row are removed
+        :param shards: optional list of input shards (see DataAccess.get_listing_shards), listed while files are
+                       processed. Files of every listed shard are added to the work
+        :param list_shard: function starting listing of a shard, returning reference to the result of
+                           DataAccess.get_shard_files_to_process. Required if shards are specified
+        :param list_concurrency: maximum number of shards listed concurrently
+        :param read_file: optional function starting read of a file, returning reference to the result of
+                          DataAccess.get_file. If specified, a file split into parts is read once, when its first
+                          part is dispatched, and the content is passed to the actors processing its parts
+        :return: number of actors failures and scheduling statistics:
+            "work items" - number of work items (files or their parts)
+            "straggler time, sec" - time from the moment the first actor ran out of work until completion
+            "max actors" - maximum number of actors used for processing
+            "retried work items" - number of resubmitted work items
+            "listed shards", "listing retries" - number of listed shards and listing retries, only present if
+                                                 shards are specified
+            "quarantined files" - list of files (or their parts), that failed more than max_retries times,
+                                  only present if there are any
         """
-        logger.debug("Begin processing files")
-        actor_failures = 0
-        RayUtils.get_available_resources(
+        from data_processing_ray.runtime.ray.file_scheduler import RayFileScheduler
+
+        return RayFileScheduler(
+            executors=executors,
+            files=files,
+            print_interval=print_interval,
+            logger=logger,
+            files_in_progress_gauge=files_in_progress_gauge,
+            files_completed_gauge=files_completed_gauge,
             available_cpus_gauge=available_cpus_gauge,
             available_gpus_gauge=available_gpus_gauge,
             available_memory_gauge=available_memory_gauge,
             object_memory_gauge=object_memory_gauge,
-        )
-        terminate = False
-        running = 0
-        t_start = time.time()
-        completed = 0
-        for path in files:
-            if executors.has_free():  # still have room
-                executors.submit(lambda a, v: a.process_file.remote(v), path)
-                running += 1
-                files_in_progress_gauge.set(running)
-            else:  # need to wait for some actors
-                while True:
-                    # we can have several workers fail here
-                    try:
-                        res = executors.get_next_unordered()
-                        break
-                    except Exception as e:
-                        if isinstance(e, RayError):
-                            # Ray exception - terminate
-                            logger.error(f"Got Ray worker exception {e}, terminating")
-                            terminate = True
-                            break
-                        logger.error(f"Failed to process request worker exception {e}")
-                        actor_failures += 1
-                        completed += 1
-                        break
-                if terminate:
-                    raise UnrecoverableException
-                executors.submit(lambda a, v: a.process_file.remote(v), path)
-
-                completed += 1
-                files_completed_gauge.set(completed)
-                RayUtils.get_available_resources(
-                    available_cpus_gauge=available_cpus_gauge,
-                    available_gpus_gauge=available_gpus_gauge,
-                    available_memory_gauge=available_memory_gauge,
-                    object_memory_gauge=object_memory_gauge,
-                )
-                if completed % print_interval == 0:
-                    logger.info(f"Completed {completed} files in {round((time.time() - t_start)/60., 3)} min")
-        # Wait for completion
-        files_completed_gauge.set(completed)
-        # Wait for completion
-        logger.info(
-            f"Completed {completed} files ({round(100 * completed / len(files), 3)}%)  "
-            f"in {round((time.time() - t_start)/60., 3)} min. Waiting for completion"
-        )
-        while executors.has_next():
-            while True:
-                # we can have several workers fail here
-                try:
-                    executors.get_next_unordered()
-                    break
-                except Exception as e:
-                    logger.error(f"Failed to process request worker exception {e}")
-                    actor_failures += 1
-                    completed += 1
-            running -= 1
-            completed += 1
-            files_in_progress_gauge.set(running)
-            files_completed_gauge.set(completed)
-            RayUtils.get_available_resources(
-                available_cpus_gauge=available_cpus_gauge,
-                available_gpus_gauge=available_gpus_gauge,
-                available_memory_gauge=available_memory_gauge,
-                object_memory_gauge=object_memory_gauge,
-            )
-
-        logger.info(f"Completed processing {completed} files in {round((time.time() - t_start)/60, 3)} min")
-        return actor_failures
+            file_sizes=file_sizes,
+            split_size=split_size,
+            largest_first=largest_first,
+            in_flight=in_flight,
+            batch_files=batch_files,
+            batch_size=batch_size,
+            resources_poll_interval=resources_poll_interval,
+            joining=joining,
+            create_actor=create_actor,
+            actor_resources=actor_resources,
+            min_actors=min_actors,
+            max_actors=max_actors,
+            max_retries=max_retries,
+            shards=shards,
+            list_shard=list_shard,
+            list_concurrency=list_concurrency,
+            read_file=read_file,
+        ).run()
 
     @staticmethod
     def wait_for_execution_completion(logger: logging.Logger, replies: list[ray.ObjectRef]) -> int:
@@ -231,16 +413,16 @@ class RayUtils:
         Wait for all requests completed
         :param logger: logger to use
         :param replies: list of request futures
-        :return: None
+        :return: number of failed requests
         """
         actor_failures = 0
         while replies:
-            # Wait for replies
-            try:
-                ready, not_ready = ray.wait(replies)
-            except Exception as e:
-                logger.error(f"Failed to process request worker exception {e}")
-                actor_failures += 1
-                not_ready = replies - 1
-            replies = not_ready
+            # Wait for replies, failures are only reported when getting their results
+            ready, replies = ray.wait(replies)
+            for reply in ready:
+                try:
+                    ray.get(reply)
+                except Exception as e:
+                    logger.error(f"Failed to process request worker exception {e}")
+                    actor_failures += 1
         return actor_failures
@@ -10,7 +10,10 @@
 # limitations under the License.
 ################################################################################
 
-from typing import Any
+import resource
+import sys
+import time
+from typing import Any, Iterator
 
 import ray
 from data_processing.runtime import AbstractTransformFileProcessor
@@ -20,7 +23,9 @@ from data_processing.utils import UnrecoverableException
 @ray.remote(scheduling_strategy="SPREAD")
 class RayTransformFileProcessor(AbstractTransformFileProcessor):
     """
-    This is the class implementing the actual work/actor processing of a single file
+    This is the class implementing the actual work/actor processing of a single file.
+    Execution statistics are aggregated locally and sent to the statistics actor periodically
+    (every stats_publish_interval seconds or stats_publish_updates updates) and on flush
     """
 
     def __init__(self, params: dict[str, Any]):
@@ -31,11 +36,17 @@ class RayTransformFileProcessor(AbstractTransformFileProcessor):
             transform_class: local transform class
             transform_params: dictionary of parameters for local transform creation
             statistics: object reference to statistics
+            read_ahead: maximum number of files read in the background
+            write_behind: maximum number of files with outstanding background writes
+            stats_publish_interval: maximum time (sec) statistics are aggregated locally, default 5
+            stats_publish_updates: maximum number of statistics updates aggregated locally, default 100
         """
         super().__init__(
             data_access_factory=params.get("data_access_factory", None),
             transform_parameters=dict(params.get("transform_params", {})),
-            is_folder=params.get("is_folder", False)
+            is_folder=params.get("is_folder", False),
+            read_ahead=params.get("read_ahead", 0),
+            write_behind=params.get("write_behind", 0),
         )
         # Create statistics
         self.stats = params.get("statistics", None)
@@ -43,6 +54,12 @@ class RayTransformFileProcessor(AbstractTransformFileProcessor):
             self.logger.error("Transform file processor: statistics is not specified")
             raise UnrecoverableException("statistics is None")
         self.transform_params["statistics"] = self.stats
+        # locally aggregated statistics
+        self.stats_publish_interval = params.get("stats_publish_interval", 5.0)
+        self.stats_publish_updates = params.get("stats_publish_updates", 100)
+        self.local_stats = {}
+        self.local_updates = 0
+        self.last_publish = time.time()
         # Create local processor
         try:
             self.transform = params.get("transform_class", None)(self.transform_params)
@@ -50,5 +67,76 @@ class RayTransformFileProcessor(AbstractTransformFileProcessor):
             self.logger.error(f"Exception creating transform  {e}")
             raise UnrecoverableException("failed creating transform")
 
+    def flush(self) -> None:
+        """
+        Flush the transform and send all locally aggregated statistics
+        :return: None
+        """
+        super().flush()
+        # wait for the statistics to be added, so that they are available once flush completes
+        ray.get(self._send_stats())
+
+    def process_batch(self, f_names: list[str]) -> Iterator[str]:
+        """
+        Process a micro batch of files sequentially, reporting every processed file, so that if the batch
+        fails (e.g. the actor dies), only the files, that were not processed yet, are retried
+        :param f_names: list of file names
+        :return: generator of the names of the processed files
+        """
+        for index, f_name in enumerate(f_names):
+            self.prefetch(f_names[index + 1 : index + 1 + self.read_ahead])
+            self.process_file(f_name=f_name)
+            yield f_name
+
+    def profile_files(self, f_names: list[str]) -> dict[str, float]:
+        """
+        Process files and flush, measuring resources used by the processing. Used to size the actors
+        :param f_names: list of file names
+        :return: dictionary of the average CPU and wall time (sec) of processing a file, peak memory of the
+            actor before processing (bytes) and its peak memory (bytes)
+        """
+        base_memory = self._get_peak_memory()
+        cpu_start = time.process_time()
+        start = time.time()
+        self.process_files(f_names=f_names)
+        self.flush()
+        n_files = max(len(f_names), 1)
+        return {
+            "cpu_time": (time.process_time() - cpu_start) / n_files,
+            "wall_time": (time.time() - start) / n_files,
+            "base_memory": base_memory,
+            "peak_memory": self._get_peak_memory(),
+        }
+
+    @staticmethod
+    def _get_peak_memory() -> int:
+        """
+        Get peak resident memory of the actor process
+        :return: peak memory (bytes)
+        """
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # max RSS is reported in bytes on macOS and in KB on Linux
+        if sys.platform == "darwin":
+            return peak_memory
+        return peak_memory * 1024
+
     def _publish_stats(self, stats: dict[str, Any]) -> None:
-        self.stats.add_stats.remote(stats)
+        for key, val in stats.items():
+            self.local_stats[key] = self.local_stats.get(key, 0) + val
+        self.local_updates += 1
+        if (
+            self.local_updates >= self.stats_publish_updates
+            or time.time() - self.last_publish >= self.stats_publish_interval
+        ):
+            self._send_stats()
+
+    def _send_stats(self) -> ray.ObjectRef:
+        """
+        Send locally aggregated statistics to the statistics actor
+        :return: reference to the result of the statistics update
+        """
+        stats = self.local_stats
+        self.local_stats = {}
+        self.local_updates = 0
+        self.last_publish = time.time()
+        return self.stats.add_stats.remote(stats)
@@ -10,6 +10,7 @@
 # limitations under the License.
 ################################################################################
 
+import random
 import time
 import traceback
 from datetime import datetime
@@ -17,14 +18,44 @@ from datetime import datetime
 import ray
 from data_processing.data_access import DataAccessFactoryBase
 from data_processing.transform import AbstractFolderTransform
+from data_processing.utils import GB, MB
 from data_processing_ray.runtime.ray import (
+    DataAccessRayObjects,
+    DefaultRayTransformRuntime,
     RayTransformExecutionConfiguration,
     RayTransformFileProcessor,
     RayTransformRuntimeConfiguration,
     RayUtils,
     TransformStatisticsRay,
 )
-from ray.util import ActorPool
+
+
+@ray.remote(num_cpus=0)
+def list_shard(
+    data_access_factory: DataAccessFactoryBase, shard: str, recursive: bool, manifest: set[str]
+) -> tuple[list[str], dict[str, int], int]:
+    """
+    List files to process of a single input shard
+    :param data_access_factory: data access factory
+    :param shard: shard folder
+    :param recursive: flag to include files of the shard sub folders
+    :param manifest: completed files from the checkpoint manifest, see DataAccess.get_checkpoint_manifest
+    :return: list of files, dictionary of file name to the file size (bytes) and number of retries
+    """
+    data_access = data_access_factory.create_data_access()
+    return data_access.get_shard_files_to_process(shard=shard, recursive=recursive, manifest=manifest)
+
+
+@ray.remote(num_cpus=0)
+def read_file(data_access_factory: DataAccessFactoryBase, f_name: str) -> tuple[bytes, int]:
+    """
+    Read a file, that is split into parts, once for all the workers processing its parts
+    :param data_access_factory: data access factory
+    :param f_name: file name
+    :return: content of the file (None if the read failed) and number of retries
+    """
+    data_access = data_access_factory.create_data_access()
+    return data_access.get_file(path=f_name)
 
 
 @ray.remote(num_cpus=1, scheduling_strategy="SPREAD")
@@ -58,13 +89,46 @@ def orchestrate(
     runtime = runtime_config.create_transform_runtime()
     resources = RayUtils.get_cluster_resources()
     is_folder = issubclass(runtime_config.get_transform_class(), AbstractFolderTransform)
+    # file sizes are only used for largest first scheduling and splitting of the files
+    split_files = preprocessing_params.split_file_size > 0 and runtime_config.get_transform_class().supports_file_parts
+    use_sizes = not is_folder and (preprocessing_params.largest_first or split_files)
+    scheduling_stats = {}
+    auto_size_stats = {}
+    shards = None
     try:
         if is_folder:
             # folder transform
             files = runtime.get_folders(data_access=data_access)
             logger.info(f"Number of folders is {len(files)}")  # Get files to process
+        elif (
+            preprocessing_params.sharded_listing
+            and data_access.m_files <= 0
+            and data_access.n_samples <= 0
+            and type(runtime).get_transform_config is DefaultRayTransformRuntime.get_transform_config
+        ):
+            # shards are listed by the tasks, while the files are processed. Only used if the
+            # transform configuration does not depend on the list of files
+            files = []
+            shards, retries = data_access.get_listing_shards()
+            if len(shards) == 0:
+                logger.error("No input shards to list - exiting")
+                return 0
+            # checkpoint manifest is read once for all the shards
+            manifest, r = data_access.get_checkpoint_manifest()
+            retries += r
+            if retries > 0:
+                statistics.add_stats.remote({"data access retries": retries})
+            logger.info(f"Number of input shards is {len(shards)}")
         else:
-            files, profile, retries = data_access.get_files_to_process()
+            if use_sizes or preprocessing_params.auto_size_samples > 0:
+                # file sizes are used for scheduling, splitting and sizing of the actors
+                files, profile, retries = data_access.get_files_to_process()
+            else:
+                # list files without getting their sizes and ordering them
+                files, profile, retries = [], {}, 0
+                for page, r in data_access.iterate_files_to_process():
+                    files.extend(page)
+                    retries += r
             if len(files) == 0:
                 logger.error("No input files to process - exiting")
                 return 0
@@ -72,8 +136,8 @@ def orchestrate(
             if retries > 0:
                 statistics.add_stats.remote({"data access retries": retries})
             logger.info(f"Number of files is {len(files)}, source profile {profile}")
-        # Print interval
-        print_interval = int(len(files) / 100)
+        # Print interval, number of files is not known upfront for sharded listing
+        print_interval = int(len(files) / 100) if shards is None else 100
         if print_interval == 0:
             print_interval = 1
         # Get Resources for execution
@@ -91,16 +155,87 @@ def orchestrate(
             ),
             "statistics": statistics,
             "is_folder": is_folder,
+            "read_ahead": preprocessing_params.read_ahead,
+            "write_behind": preprocessing_params.write_behind,
         }
+        if preprocessing_params.auto_size_samples > 0 and len(files) > 0:
+            # process sample files by a single actor, measuring resources it uses, to size the actors
+            sample = random.sample(files, min(preprocessing_params.auto_size_samples, len(files)))
+            logger.info(f"Sizing workers using sample files {sample}")
+            probe = RayTransformFileProcessor.options(**preprocessing_params.worker_options).remote(processor_params)
+            profile = ray.get(probe.profile_files.remote(sample))
+            # resources used by the probe become available once it is killed
+            available = ray.available_resources()
+            probe_resources = RayUtils.get_actor_resources(actor_options=preprocessing_params.worker_options)
+            for name, value in probe_resources.items():
+                available[name] = available.get(name, 0) + value
+            ray.kill(probe)
+            sampled = set(sample)
+            files = [f for f in files if f not in sampled]
+            memory_scale = 1.0
+            if len(files) == 0:
+                # the sample covered all the files, there are no files left to size the workers for
+                logger.info("All the files were processed by the sizing sample, not resizing workers")
+            else:
+                if not is_folder:
+                    # memory usage is assumed to grow with the file size
+                    sizes = data_access.get_file_sizes()
+                    sampled_size = max(sizes.get(f, 0) for f in sample)
+                    if sampled_size > 0:
+                        memory_scale = max(1.0, max(sizes.get(f, 0) for f in files) / sampled_size)
+                n_workers, worker_options = RayUtils.plan_actors(
+                    profile=profile,
+                    resources=available,
+                    actor_options=preprocessing_params.worker_options,
+                    n_files=len(files),
+                    memory_scale=memory_scale,
+                    headroom=preprocessing_params.auto_size_headroom,
+                )
+                logger.info(f"Sizing workers profile {profile}, memory scale {memory_scale}")
+                if n_workers == 0:
+                    logger.warning(f"Worker with {worker_options} does not fit available resources, not resizing")
+                else:
+                    if (
+                        preprocessing_params.min_workers < preprocessing_params.n_workers
+                        or preprocessing_params.max_workers > preprocessing_params.n_workers
+                    ):
+                        # elastic pool is extended to include the planned number of workers
+                        preprocessing_params.min_workers = min(preprocessing_params.min_workers, n_workers)
+                        preprocessing_params.max_workers = max(preprocessing_params.max_workers, n_workers)
+                    else:
+                        preprocessing_params.min_workers = n_workers
+                        preprocessing_params.max_workers = n_workers
+                    preprocessing_params.n_workers = n_workers
+                    preprocessing_params.worker_options = worker_options
+                    logger.info(f"Using {n_workers} workers with {worker_options} each")
+            auto_size_stats = {
+                "auto size sample files": len(sample),
+                "auto size cpu time per file, sec": round(profile["cpu_time"], 3),
+                "auto size wall time per file, sec": round(profile["wall_time"], 3),
+                "auto size peak memory, GB": round(profile["peak_memory"] / GB, 3),
+                "auto size memory scale": round(memory_scale, 3),
+            }
         logger.debug("Creating actors")
-        processors = RayUtils.create_actors(
+        processors, joining = RayUtils.start_actors(
             clazz=RayTransformFileProcessor,
             params=processor_params,
             actor_options=preprocessing_params.worker_options,
             n_actors=preprocessing_params.n_workers,
             creation_delay=preprocessing_params.creation_delay,
+            min_fraction=preprocessing_params.min_ready_fraction,
+            timeout=preprocessing_params.actor_start_timeout,
         )
-        processors_pool = ActorPool(processors)
+        create_actor = None
+        if (
+            preprocessing_params.min_workers < preprocessing_params.n_workers
+            or preprocessing_params.max_workers > preprocessing_params.n_workers
+        ):
+            # elastic pool
+            def create_actor():
+                return RayTransformFileProcessor.options(**preprocessing_params.worker_options).remote(
+                    processor_params
+                )
+
         # create gauges
         files_in_progress_gauge = Gauge("files_in_progress", "Number of files in progress")
         files_completed_gauge = Gauge("files_processed_total", "Number of files completed")
@@ -110,8 +245,27 @@ def orchestrate(
         available_object_memory_gauge = Gauge("available_object_store", "Available object store")
         # process data
         logger.debug("Begin processing files")
-        failures = RayUtils.process_files(
-            executors=processors_pool,
+        file_sizes = None
+        split_size = 0
+        list_shard_files = None
+        read_file_content = None
+        factory_ref = ray.put(data_access_factory)
+        if shards is not None:
+            manifest_ref = ray.put(manifest)
+
+            def list_shard_files(shard: str, recursive: bool) -> ray.ObjectRef:
+                return list_shard.remote(factory_ref, shard, recursive, manifest_ref)
+
+        if use_sizes:
+            file_sizes = data_access.get_file_sizes()
+            if split_files:
+                split_size = int(preprocessing_params.split_file_size * MB)
+
+                def read_file_content(f_name: str) -> ray.ObjectRef:
+                    return read_file.remote(factory_ref, f_name)
+
+        failures, scheduling_stats = RayUtils.process_files(
+            executors=processors,
             files=files,
             print_interval=print_interval,
             files_in_progress_gauge=files_in_progress_gauge,
@@ -121,6 +275,22 @@ def orchestrate(
             available_memory_gauge=available_memory_gauge,
             object_memory_gauge=available_object_memory_gauge,
             logger=logger,
+            file_sizes=file_sizes,
+            split_size=split_size,
+            largest_first=preprocessing_params.largest_first,
+            in_flight=preprocessing_params.in_flight,
+            batch_files=preprocessing_params.batch_files,
+            batch_size=int(preprocessing_params.batch_size * MB),
+            joining=joining,
+            create_actor=create_actor,
+            actor_resources=RayUtils.get_actor_resources(actor_options=preprocessing_params.worker_options),
+            min_actors=preprocessing_params.min_workers,
+            max_actors=preprocessing_params.max_workers,
+            max_retries=preprocessing_params.max_retries,
+            shards=shards,
+            list_shard=list_shard_files,
+            read_file=read_file_content,
+            list_concurrency=preprocessing_params.n_workers,
         )
         if failures > 0:
             statistics.add_stats.remote({"actor failures": failures})
@@ -132,6 +302,10 @@ def orchestrate(
         if failures > 0:
             statistics.add_stats.remote({"actor failures": failures})
         logger.info(f"done flushing in {round(time.time() - start, 3)} sec")
+        if isinstance(data_access, DataAccessRayObjects) and "quarantined files" not in scheduling_stats:
+            # input files are consumed, release them from the object store
+            released = data_access.release_input_files()
+            logger.info(f"Released {released} input files from the object store")
         status = "success"
         return_code = 0
     except Exception as e:
@@ -155,7 +329,10 @@ def orchestrate(
             "job_input_params": runtime_config.get_transform_metadata()
             | data_access_factory.get_input_params()
             | preprocessing_params.get_input_params(),
-            "execution_stats": resources | {"execution time, min": round((time.time() - start_time) / 60.0, 3)},
+            "execution_stats": resources
+            | scheduling_stats
+            | auto_size_stats
+            | {"execution time, min": round((time.time() - start_time) / 60.0, 3)},
             "job_output_stats": stats,
         }
         logger.debug(f"Saving job metadata: {metadata}.")
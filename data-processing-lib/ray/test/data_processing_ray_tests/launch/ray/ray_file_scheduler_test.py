@@ -0,0 +1,151 @@
+# (C) Copyright IBM Corp. 2024.
+# Licensed under the Apache License, Version 2.0 (the “License”);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an “AS IS” BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+from typing import Any
+
+from data_processing.utils import get_logger
+from data_processing_ray.runtime.ray import RayFileScheduler
+
+
+class _Method:
+    def __init__(self, actor: "_Actor", name: str):
+        self.actor = actor
+        self.name = name
+
+    def remote(self, *args) -> object:
+        self.actor.calls.append((self.name, args))
+        return object()
+
+
+class _Actor:
+    """
+    Actor handle recording remote calls, so that the scheduler can be tested without Ray
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name: str) -> _Method:
+        return _Method(self, name)
+
+    def requests(self) -> list[tuple[str, Any]]:
+        return [(name, args[0]) for name, args in self.calls if name in ["process_file", "process_batch"]]
+
+
+def _scheduler(n_actors: int = 2, n_files: int = 10, **kwargs) -> RayFileScheduler:
+    return RayFileScheduler(
+        executors=[_Actor() for _ in range(n_actors)],
+        files=[f"file{i}" for i in range(n_files)],
+        print_interval=5,
+        logger=get_logger(__name__),
+        **kwargs,
+    )
+
+
+def test_dispatch():
+    scheduler = _scheduler(batch_files=2, in_flight=2)
+    assert scheduler.n_queued() == 5
+    scheduler.dispatch_all()
+    # actors are filled up to in_flight requests, micro batches are processed by process_batch
+    assert scheduler.actors[0].requests() == [
+        ("process_batch", ["file0", "file1"]),
+        ("process_batch", ["file2", "file3"]),
+    ]
+    assert scheduler.actors[1].requests() == [
+        ("process_batch", ["file4", "file5"]),
+        ("process_batch", ["file6", "file7"]),
+    ]
+    assert scheduler.n_queued() == 1
+    assert scheduler.running == 8
+    # retried work items go first
+    scheduler.actor_load[0] = 0
+    scheduler.retry_queue.append([("file3", None, 0)])
+    scheduler.dispatch(actor_index=0, depth=1)
+    assert scheduler.actors[0].requests()[-1] == ("process_file", "file3")
+    assert scheduler.n_queued() == 1
+
+
+def test_retry():
+    scheduler = _scheduler(max_retries=1)
+    batch = [("file0", None, 0), ("file1", None, 0), ("file2", None, 0)]
+    # only the work item in progress is charged a failure
+    scheduler.retry(batch=batch)
+    assert scheduler.attempts == {("file0", None): 1}
+    assert scheduler.retry_queue == [[item] for item in batch]
+    assert scheduler.retried == 3
+    # work item failing more than max_retries times is quarantined
+    scheduler.retry_queue = []
+    scheduler.retry(batch=batch[:1])
+    assert scheduler.quarantined == ["file0"]
+    assert scheduler.retry_queue == []
+    assert scheduler.retried == 3
+    # nothing to retry, if all the work items are done
+    scheduler.retry(batch=[])
+    assert scheduler.retried == 3
+
+
+def test_failure():
+    scheduler = _scheduler(n_files=4)
+    scheduler.dispatch_all()
+    first = [("file0", None, 0)]
+    second = [("file2", None, 0)]
+    scheduler.on_failure(actor_index=0, batch=first)
+    # actor is restarting, its work is resubmitted to the other actors
+    assert scheduler.actor_failures == 1
+    assert list(scheduler.recovering.values()) == [0]
+    assert scheduler.attempts == {("file0", None): 1}
+    scheduler.actor_load[1] = 0
+    scheduler.dispatch_all()
+    assert scheduler.actors[1].requests()[-1] == ("process_file", "file0")
+    assert scheduler.actors[0].requests() == [("process_file", "file0")]
+    # other requests of the failed actor are not charged
+    scheduler.on_failure(actor_index=0, batch=second)
+    assert scheduler.actor_failures == 1
+    assert ("file2", None) not in scheduler.attempts
+    assert [("file2", None, 0)] in scheduler.retry_queue
+
+
+def test_scaling():
+    created = []
+
+    def create_actor() -> _Actor:
+        created.append(_Actor())
+        return created[-1]
+
+    scheduler = _scheduler(
+        n_actors=1,
+        create_actor=create_actor,
+        actor_resources={"CPU": 0.5},
+        min_actors=1,
+        max_actors=2,
+    )
+    # not enough resources
+    scheduler.scale_up(resources={"CPU": 0.1})
+    assert len(created) == 0
+    scheduler.scale_up(resources={"CPU": 1.0})
+    assert len(created) == 1
+    assert len(scheduler.joining_refs) == 1
+    # maximum number of actors is reached
+    scheduler.scale_up(resources={"CPU": 1.0})
+    assert len(created) == 1
+    # idle actors are retired down to min_actors
+    scheduler.actors.append(created[0])
+    scheduler.actor_load.append(0)
+    scheduler.actor_errors.append(0)
+    scheduler.joining_refs = {}
+    scheduler.on_idle(actor_index=1)
+    assert list(scheduler.retiring.values()) == [1]
+    assert created[0].calls[-1] == ("flush", ())
+    assert scheduler.t_idle is not None
+    scheduler.on_idle(actor_index=0)
+    assert list(scheduler.retiring.values()) == [1]
+    assert scheduler.n_active() == 1
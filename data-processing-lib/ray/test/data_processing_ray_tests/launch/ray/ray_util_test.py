@@ -10,11 +10,25 @@
 # limitations under the License.
 ################################################################################
 
+import os
+import shutil
+import time
+from unittest.mock import patch
+
 import pyarrow as pa
 import pytest
 import ray
-from data_processing.utils import GB, TransformUtils
-from data_processing_ray.runtime.ray import RayUtils, TransformStatisticsRay
+from data_processing.data_access import DataAccessFactory, DataAccessLocal
+from data_processing.test_support.transform.noop_transform import NOOPTransform
+from data_processing.utils import GB, TransformUtils, UnrecoverableException, get_logger
+from data_processing_ray.runtime.ray import (
+    DataAccessRayObjects,
+    RayDataAccessFactory,
+    RayTransformFileProcessor,
+    RayUtils,
+    TransformStatisticsRay,
+)
+from ray.util.metrics import Gauge
 
 
 params = {}
@@ -75,6 +89,336 @@ def test_add_column():
     assert len(columns) == 2
 
 
+def test_schedule_files():
+    files = ["a", "b", "c", "d"]
+    # no sizes - listing order
+    work = RayUtils.schedule_files(files=files)
+    assert [w[0] for w in work] == files
+    # largest first
+    sizes = {"a": 10, "b": 300, "c": 20, "d": 20}
+    work = RayUtils.schedule_files(files=files, file_sizes=sizes)
+    assert [w[0] for w in work] == ["b", "c", "d", "a"]
+    assert all(w[1] is None for w in work)
+    # split large files
+    work = RayUtils.schedule_files(files=files, file_sizes=sizes, split_size=100)
+    assert [w[0] for w in work] == ["b", "b", "b", "c", "d", "a"]
+    assert [w[1] for w in work[:3]] == [(0, 3), (1, 3), (2, 3)]
+    assert work[0][2] == 100
+    # split large files, keeping the listing order
+    work = RayUtils.schedule_files(files=files, file_sizes=sizes, split_size=100, largest_first=False)
+    assert [w[0] for w in work] == ["a", "b", "b", "b", "c", "d"]
+
+
+def test_batch_work():
+    work = [("a", (0, 2), 100), ("a", (1, 2), 100), ("b", None, 30), ("c", None, 30), ("d", None, 30), ("e", None, 10)]
+    batches = RayUtils.batch_work(work=work)
+    assert len(batches) == len(work)
+    batches = RayUtils.batch_work(work=work, batch_files=10)
+    assert [[item[0] for item in batch] for batch in batches] == [["a"], ["a"], ["b", "c", "d", "e"]]
+    batches = RayUtils.batch_work(work=work, batch_files=10, batch_size=60)
+    assert [[item[0] for item in batch] for batch in batches] == [["a"], ["a"], ["b", "c"], ["d", "e"]]
+    batches = RayUtils.batch_work(work=work, batch_files=3)
+    assert [[item[0] for item in batch] for batch in batches] == [["a"], ["a"], ["b", "c", "d"], ["e"]]
+
+
+@ray.remote
+class _Processor:
+    def __init__(self, params: dict = None):
+        self.processed = []
+        self.sleep = (params or {}).get("sleep", 0)
+        # folder to record processed files in, files crashing the actor always and only the first time
+        self.folder = (params or {}).get("folder", None)
+        self.crash = (params or {}).get("crash", [])
+        self.crash_once = (params or {}).get("crash_once", [])
+        self.fail = (params or {}).get("fail", [])
+
+    def process_file(self, f_name: str, part: tuple[int, int] = None, content: tuple[bytes, int] = None) -> None:
+        time.sleep(self.sleep)
+        if content is not None and content[0] != f_name.encode("utf-8"):
+            raise Exception(f"wrong content of {f_name}")
+        if f_name in self.crash_once and not os.path.exists(os.path.join(self.folder, f"{f_name}.crashed")):
+            open(os.path.join(self.folder, f"{f_name}.crashed"), "w").close()
+            os._exit(1)
+        if f_name in self.crash:
+            os._exit(1)
+        if f_name in self.fail:
+            raise Exception(f"failed to process {f_name}")
+        if self.folder is not None:
+            # record every processing of the file
+            with open(os.path.join(self.folder, f_name), "a") as f:
+                f.write("processed\n")
+        self.processed.append((f_name, part))
+
+    def flush(self) -> None:
+        pass
+
+    def process_batch(self, f_names: list[str]):
+        for f_name in f_names:
+            self.process_file(f_name=f_name)
+            yield f_name
+
+    def get_processed(self) -> list[tuple[str, tuple[int, int]]]:
+        return self.processed
+
+
+def test_plan_actors():
+    profile = {"cpu_time": 0.45, "wall_time": 1.0, "base_memory": GB, "peak_memory": 2 * GB}
+    resources = {"CPU": 10.0, "memory": 12.0 * GB}
+    # CPU bound
+    n_actors, options = RayUtils.plan_actors(
+        profile=profile, resources=resources, actor_options={"max_restarts": -1}, n_files=100, headroom=1.0
+    )
+    assert options == {"max_restarts": -1, "num_cpus": 0.5, "memory": 2 * GB}
+    assert n_actors == 6
+    # memory bound, memory used for processing is scaled for larger files
+    n_actors, options = RayUtils.plan_actors(
+        profile=profile, resources=resources, actor_options={}, n_files=100, memory_scale=2.0, headroom=1.0
+    )
+    assert options["memory"] == 3 * GB
+    assert n_actors == 4
+    # limited by the number of files
+    n_actors, _ = RayUtils.plan_actors(profile=profile, resources=resources, actor_options={}, n_files=2)
+    assert n_actors == 2
+    # does not fit
+    n_actors, _ = RayUtils.plan_actors(profile=profile, resources={"CPU": 0.1}, actor_options={}, n_files=2)
+    assert n_actors == 0
+
+
+def test_process_files():
+    ray.init()
+    processors = [_Processor.options(num_cpus=0.1).remote() for _ in range(2)]
+    files = [f"file{i}" for i in range(20)]
+    sizes = {f_name: 10 for f_name in files} | {"file0": 100}
+    reads = []
+
+    def read_file(f_name: str) -> ray.ObjectRef:
+        reads.append(f_name)
+        return ray.put((f_name.encode("utf-8"), 0))
+
+    failures, stats = RayUtils.process_files(
+        executors=processors,
+        files=files,
+        print_interval=5,
+        files_in_progress_gauge=Gauge("files_in_progress", "Number of files in progress"),
+        files_completed_gauge=Gauge("files_processed_total", "Number of files completed"),
+        available_cpus_gauge=None,
+        available_gpus_gauge=None,
+        available_memory_gauge=None,
+        object_memory_gauge=None,
+        logger=get_logger(__name__),
+        file_sizes=sizes,
+        split_size=50,
+        in_flight=2,
+        batch_files=4,
+        resources_poll_interval=0.1,
+        read_file=read_file,
+    )
+    processed = [item for p in processors for item in ray.get(p.get_processed.remote())]
+    ray.shutdown()
+    assert failures == 0
+    assert stats["work items"] == 21
+    # split file is read once for all its parts
+    assert reads == ["file0"]
+    assert sorted(processed, key=str) == sorted(
+        [("file0", (0, 2)), ("file0", (1, 2))] + [(f_name, None) for f_name in files[1:]], key=str
+    )
+
+
+def test_process_files_retries(tmp_path):
+    ray.init()
+    params = {"folder": str(tmp_path), "crash": ["file3"], "crash_once": ["file5"]}
+    processors = [_Processor.options(num_cpus=0.1, max_restarts=-1).remote(params) for _ in range(2)]
+    files = [f"file{i}" for i in range(10)]
+    failures, stats = RayUtils.process_files(
+        executors=processors,
+        files=files,
+        print_interval=5,
+        files_in_progress_gauge=Gauge("files_in_progress", "Number of files in progress"),
+        files_completed_gauge=Gauge("files_processed_total", "Number of files completed"),
+        available_cpus_gauge=None,
+        available_gpus_gauge=None,
+        available_memory_gauge=None,
+        object_memory_gauge=None,
+        logger=get_logger(__name__),
+        batch_files=2,
+        resources_poll_interval=0.1,
+        max_retries=2,
+    )
+    ray.shutdown()
+    # files of the failed batches are resubmitted, the poison file is quarantined
+    assert sorted(f for f in os.listdir(tmp_path) if not f.endswith(".crashed")) == sorted(
+        f for f in files if f != "file3"
+    )
+    assert stats["quarantined files"] == ["file3"]
+    assert failures == 4
+    assert stats["retried work items"] >= 3
+
+
+def test_process_files_partial_batch(tmp_path):
+    ray.init()
+    params = {"folder": str(tmp_path), "crash_once": ["file2"], "fail": ["file9"]}
+    processors = [_Processor.options(num_cpus=0.1, max_restarts=-1).remote(params)]
+    files = [f"file{i}" for i in range(10)]
+    failures, stats = RayUtils.process_files(
+        executors=processors,
+        files=files,
+        print_interval=5,
+        files_in_progress_gauge=Gauge("files_in_progress", "Number of files in progress"),
+        files_completed_gauge=Gauge("files_processed_total", "Number of files completed"),
+        available_cpus_gauge=None,
+        available_gpus_gauge=None,
+        available_memory_gauge=None,
+        object_memory_gauge=None,
+        logger=get_logger(__name__),
+        batch_files=5,
+        resources_poll_interval=0.1,
+        max_retries=1,
+    )
+    ray.shutdown()
+    # files processed before the failure of their batch are not processed again, only the failing file is charged
+    assert stats["quarantined files"] == ["file9"]
+    assert failures == 3
+    assert stats["retried work items"] == 4
+    for f_name in files[:-1]:
+        with open(os.path.join(tmp_path, f_name)) as f:
+            assert f.read() == "processed\n"
+
+
+@ray.remote(num_cpus=0)
+def _list_shard(local_config: dict[str, str], shard: str, recursive: bool) -> tuple[list[str], dict[str, int], int]:
+    return DataAccessLocal(local_config=local_config).get_shard_files_to_process(shard=shard, recursive=recursive)
+
+
+def test_process_files_sharded(tmp_path):
+    input_folder = tmp_path / "input"
+    files = []
+    for folder in ["", "a", "a/b", "c"]:
+        os.makedirs(input_folder / folder, exist_ok=True)
+        for i in range(3):
+            path = str(input_folder / folder / f"file{i}.parquet")
+            open(path, "w").close()
+            files.append(path)
+    local_config = {"input_folder": str(input_folder), "output_folder": str(tmp_path / "output")}
+    shards, _ = DataAccessLocal(local_config=local_config).get_listing_shards()
+    ray.init()
+    processors = [_Processor.options(num_cpus=0.1).remote() for _ in range(2)]
+    failures, stats = RayUtils.process_files(
+        executors=processors,
+        files=[],
+        print_interval=5,
+        files_in_progress_gauge=Gauge("files_in_progress", "Number of files in progress"),
+        files_completed_gauge=Gauge("files_processed_total", "Number of files completed"),
+        available_cpus_gauge=None,
+        available_gpus_gauge=None,
+        available_memory_gauge=None,
+        object_memory_gauge=None,
+        logger=get_logger(__name__),
+        file_sizes={},
+        resources_poll_interval=0.1,
+        shards=shards,
+        list_shard=lambda shard, recursive: _list_shard.remote(local_config, shard, recursive),
+        list_concurrency=2,
+    )
+    processed = [item[0] for p in processors for item in ray.get(p.get_processed.remote())]
+    ray.shutdown()
+    assert failures == 0
+    assert stats["listed shards"] == 3
+    assert stats["work items"] == len(files)
+    assert sorted(processed) == sorted(files)
+
+
+def test_start_actors():
+    ray.init()
+    ready, joining = RayUtils.start_actors(
+        clazz=_Processor, params={}, actor_options={"num_cpus": 0.1}, n_actors=3, min_fraction=0.3
+    )
+    assert len(ready) >= 1
+    assert len(ready) + len(joining) == 3
+    files = [f"file{i}" for i in range(10)]
+    failures, _ = RayUtils.process_files(
+        executors=ready,
+        files=files,
+        print_interval=5,
+        files_in_progress_gauge=Gauge("files_in_progress", "Number of files in progress"),
+        files_completed_gauge=Gauge("files_processed_total", "Number of files completed"),
+        available_cpus_gauge=None,
+        available_gpus_gauge=None,
+        available_memory_gauge=None,
+        object_memory_gauge=None,
+        logger=get_logger(__name__),
+        joining=joining,
+    )
+    # actors, that joined the processing, are added to the executors
+    processed = [item[0] for p in ready for item in ray.get(p.get_processed.remote())]
+    assert failures == 0
+    assert sorted(processed) == sorted(files)
+    # actors, that can not be scheduled, never start
+    with pytest.raises(UnrecoverableException):
+        RayUtils.start_actors(clazz=_Processor, params={}, actor_options={"num_cpus": 100}, n_actors=1, timeout=2)
+    ray.shutdown()
+
+
+def test_elastic_pool():
+    ray.init()
+    actor_options = {"num_cpus": 0.1}
+    executors = RayUtils.create_actors(clazz=_Processor, params={"sleep": 0.1}, actor_options=actor_options, n_actors=1)
+    failures, stats = RayUtils.process_files(
+        executors=executors,
+        files=[f"file{i}" for i in range(100)],
+        print_interval=10,
+        files_in_progress_gauge=Gauge("files_in_progress", "Number of files in progress"),
+        files_completed_gauge=Gauge("files_processed_total", "Number of files completed"),
+        available_cpus_gauge=None,
+        available_gpus_gauge=None,
+        available_memory_gauge=None,
+        object_memory_gauge=None,
+        logger=get_logger(__name__),
+        resources_poll_interval=0.2,
+        create_actor=lambda: _Processor.options(**actor_options).remote({"sleep": 0.1}),
+        actor_resources=RayUtils.get_actor_resources(actor_options=actor_options),
+        min_actors=1,
+        max_actors=3,
+    )
+    ray.shutdown()
+    assert failures == 0
+    # actors were added while there was queued work and retired once it was dispatched
+    assert stats["max actors"] > 1
+    assert len(executors) == 1
+
+
+def test_processor_statistics(tmp_path):
+    input_folder = os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "../../../../test-data/data_processing/ray/noop/input")
+    )
+    daf = DataAccessFactory()
+    daf.local_config = {"input_folder": input_folder, "output_folder": str(tmp_path)}
+    ray.init()
+    statistics = TransformStatisticsRay.remote({})
+    processor = RayTransformFileProcessor.options(num_cpus=0.1).remote(
+        {
+            "data_access_factory": daf,
+            "transform_class": NOOPTransform,
+            "transform_params": {"sleep_sec": 0},
+            "statistics": statistics,
+            "stats_publish_interval": 1000,
+        }
+    )
+    ray.get(processor.process_file.remote(os.path.join(input_folder, "sample1.parquet")))
+    # statistics are aggregated locally
+    assert "source_files" not in ray.get(statistics.get_execution_stats.remote())
+    ray.get(processor.flush.remote())
+    stats = ray.get(statistics.get_execution_stats.remote())
+    assert stats["source_files"] == 1
+    assert stats["result_files"] == 1
+    # micro batch reports every processed file
+    f_names = [os.path.join(input_folder, "subdir/test1.parquet"), os.path.join(input_folder, "sample1.parquet")]
+    assert [ray.get(ref) for ref in processor.process_batch.remote(f_names)] == f_names
+    ray.get(processor.flush.remote())
+    stats = ray.get(statistics.get_execution_stats.remote())
+    ray.shutdown()
+    assert stats["source_files"] == 3
+
+
 def test_actor_creation():
     print("Starting Ray cluster")
     ray.init()
@@ -103,3 +447,71 @@ def test_actor_creation():
     assert 1 == res["memory"] - res1["memory"]
 
     ray.shutdown()
+
+
+def test_object_store_data_access(tmp_path):
+    input_folder = os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "../../../../test-data/data_processing/ray/noop/input")
+    )
+    step1 = os.path.join(tmp_path, "step1")
+    step2 = os.path.join(tmp_path, "step2")
+    ray.init()
+    # first step reads from the local folder and passes its outputs through the object store
+    daf = RayDataAccessFactory()
+    assert daf.apply_input_params(
+        {"data_local_config": {"input_folder": input_folder, "output_folder": step1}, "data_object_store": True}
+    )
+    processor = RayTransformFileProcessor.options(num_cpus=0.1).remote(
+        {
+            "data_access_factory": daf,
+            "transform_class": NOOPTransform,
+            "transform_params": {"sleep_sec": 0},
+            "statistics": TransformStatisticsRay.remote({}),
+        }
+    )
+    ray.get(processor.process_file.remote(os.path.join(input_folder, "sample1.parquet")))
+    ray.get(processor.flush.remote())
+    assert not os.path.exists(os.path.join(step1, "sample1.parquet"))
+    # files of the storage are listed together with the ones in the object store
+    os.makedirs(step1)
+    shutil.copy(os.path.join(input_folder, "subdir", "test1.parquet"), step1)
+    # next step finds them in the object store
+    data_access = DataAccessRayObjects(
+        data_access=DataAccessLocal(
+            local_config={"input_folder": step1, "output_folder": step2}, checkpoint_manifest=True
+        ),
+        durable=True,
+    )
+    files, _, _ = data_access.get_files_to_process()
+    assert files == [os.path.join(step1, "sample1.parquet"), os.path.join(step1, "test1.parquet")]
+    # checkpoint manifest is always saved to the storage
+    data_access.add_completed_file(path=files[1])
+    data_access.flush_completed_files()
+    assert len(os.listdir(data_access.get_checkpoint_manifest_folder())) == 1
+    table, _ = data_access.get_table(path=files[0])
+    expected, _ = data_access.get_table(path=os.path.join(input_folder, "sample1.parquet"))
+    assert table.equals(expected)
+    # durable writes are also saved locally
+    data_access.save_table(path=os.path.join(step2, "sample1.parquet"), table=table)
+    assert os.path.exists(os.path.join(step2, "sample1.parquet"))
+    assert data_access.release_input_files() == 1
+    files, _, _ = data_access.get_files_to_process()
+    ray.shutdown()
+    assert files == [os.path.join(step1, "test1.parquet")]
+
+
+def test_object_store_put(tmp_path):
+    ray.init()
+    data_access = DataAccessRayObjects(
+        data_access=DataAccessLocal(local_config={"input_folder": str(tmp_path), "output_folder": str(tmp_path)})
+    )
+    path = os.path.join(tmp_path, "file.parquet")
+    # objects are put by the store itself, if ray.put does not support owners
+    for owner_put in [True, False]:
+        with patch("data_processing_ray.runtime.ray.object_store_data_access.OWNER_PUT", owner_put):
+            file_info, _ = data_access.save_file(path=path, data=str(owner_put).encode("utf-8"))
+        assert file_info == {"name": path, "size": len(str(owner_put))}
+        assert data_access.get_file(path=path) == (str(owner_put).encode("utf-8"), 0)
+    assert data_access.release(path=str(tmp_path)) == 1
+    ray.shutdown()
+    assert not os.path.exists(path)
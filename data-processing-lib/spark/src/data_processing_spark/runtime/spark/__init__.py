@@ -9,6 +9,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 ################################################################################
+from data_processing_spark.runtime.spark.spark_utils import SparkUtils, StatisticsAccumulatorParam
 from data_processing_spark.runtime.spark.transform_runtime import DefaultSparkTransformRuntime
 from data_processing_spark.runtime.spark.execution_configuration import SparkTransformExecutionConfiguration
 from data_processing_spark.runtime.spark.runtime_configuration import SparkTransformRuntimeConfiguration
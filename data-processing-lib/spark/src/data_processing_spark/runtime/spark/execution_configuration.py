@@ -14,7 +14,7 @@ import argparse
 from typing import Any
 
 from data_processing.runtime import TransformExecutionConfiguration, runtime_cli_prefix
-from data_processing.utils import CLIArgumentProvider, get_logger
+from data_processing.utils import CLIArgumentProvider, get_logger, str2bool
 
 
 logger = get_logger(__name__)
@@ -31,6 +31,9 @@ class SparkTransformExecutionConfiguration(TransformExecutionConfiguration):
         """
         super().__init__(name=name, print_params=False)
         self.parallelization = -1
+        self.sharded_listing = False
+        self.partition_size = 0
+        self.dataframe = False
 
     def add_input_params(self, parser: argparse.ArgumentParser) -> None:
         """
@@ -51,6 +54,26 @@ class SparkTransformExecutionConfiguration(TransformExecutionConfiguration):
         (number of workers).    
         """
         parser.add_argument(f"--{runtime_cli_prefix}parallelization", type=int, default=-1, help="parallelization.")
+        parser.add_argument(
+            f"--{runtime_cli_prefix}partition_size",
+            type=float,
+            default=0,
+            help="target size (MB) of the input files of a partition. Files are bin-packed into partitions by "
+            "their size, using at least parallelization partitions. 0 - partition by the number of files",
+        )
+        parser.add_argument(
+            f"--{runtime_cli_prefix}dataframe",
+            type=lambda x: bool(str2bool(x)),
+            default=False,
+            help="process table transforms as a Spark data frame - read input files using Spark parquet reader, "
+            "transform their record batches with mapInArrow and write the results using Spark parquet writer",
+        )
+        parser.add_argument(
+            f"--{runtime_cli_prefix}sharded_listing",
+            type=lambda x: bool(str2bool(x)),
+            default=False,
+            help="list input sub folders in Spark tasks, instead of listing all the input on the driver",
+        )
         return TransformExecutionConfiguration.add_input_params(self, parser=parser)
 
     def apply_input_params(self, args: argparse.Namespace) -> bool:
@@ -70,9 +93,16 @@ class SparkTransformExecutionConfiguration(TransformExecutionConfiguration):
             "job id": captured["job_id"],
         }
         self.parallelization = captured["parallelization"]
+        self.sharded_listing = captured["sharded_listing"]
+        self.partition_size = captured["partition_size"]
+        if self.partition_size < 0:
+            logger.error(f"partition size {self.partition_size} can not be negative")
+            return False
+        self.dataframe = captured["dataframe"]
         # if the user did not define actor max_restarts set it up for fault tolerance
         logger.info(f"job details {self.job_details}")
-        logger.info(f"RDD parallelization {self.parallelization}")
+        logger.info(f"RDD parallelization {self.parallelization}, sharded listing {self.sharded_listing}")
+        logger.info(f"partition size {self.partition_size} MB, data frame {self.dataframe}")
         return True
 
     def get_input_params(self) -> dict[str, Any]:
@@ -82,4 +112,10 @@ class SparkTransformExecutionConfiguration(TransformExecutionConfiguration):
         """
         return {
             "RDD parallelization": self.parallelization,
+            "sharded listing": self.sharded_listing,
+            "partition size, MB": self.partition_size,
+            "data frame": self.dataframe,
+            "read ahead": self.read_ahead,
+            "write behind": self.write_behind,
+            "stream row groups": self.stream_row_groups,
         }
@@ -0,0 +1,231 @@
+# (C) Copyright IBM Corp. 2024.
+# Licensed under the Apache License, Version 2.0 (the “License”);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an “AS IS” BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+import heapq
+import math
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from data_processing.data_access import DataAccess, DataAccessS3
+from data_processing.transform import AbstractTableTransform
+from data_processing.utils import TransformUtils, get_logger
+from pyspark import AccumulatorParam
+
+
+logger = get_logger(__name__)
+
+# number of rows of an input file transformed on the driver to get the schema of the transform output
+SCHEMA_SAMPLE_ROWS = 100
+# maximum number of input files sampled to get the schema of the transform output
+SCHEMA_SAMPLE_FILES = 3
+
+
+class StatisticsAccumulatorParam(AccumulatorParam):
+    """
+    Spark accumulator of the statistics of the partitions - dictionaries of the partition index to the statistics
+    of the partition. Statistics of the same partition replace each other, so that the statistics of a partition,
+    processed by several task attempts (retries or speculative execution), are only counted once
+    """
+
+    def zero(self, value: dict[int, dict[str, Any]]) -> dict[int, dict[str, Any]]:
+        """
+        Get zero value of the accumulator
+        :param value: initial value
+        :return: empty dictionary
+        """
+        return {}
+
+    def addInPlace(
+        self, value1: dict[int, dict[str, Any]], value2: dict[int, dict[str, Any]]
+    ) -> dict[int, dict[str, Any]]:
+        """
+        Add statistics of the partitions
+        :param value1: accumulated statistics, updated in place
+        :param value2: statistics to add
+        :return: accumulated statistics
+        """
+        value1.update(value2)
+        return value1
+
+
+class SparkUtils:
+    """
+    Class implementing support methods for Spark execution
+    """
+
+    @staticmethod
+    def pack_files(
+        files: list[str], file_sizes: dict[str, int], partition_size: int, min_partitions: int = 0
+    ) -> list[list[str]]:
+        """
+        Bin-pack files into partitions of roughly equal size. The number of partitions is the total size
+        of the files divided by partition_size, files are assigned largest first to the least loaded
+        partition (LPT), so a partition exceeds partition_size only when it contains a larger file
+        :param files: list of files to process
+        :param file_sizes: dictionary of file sizes (bytes), missing files are assumed empty
+        :param partition_size: target size of a partition (bytes), must be positive
+        :param min_partitions: minimum number of partitions, 0 - no minimum
+        :return: list of non empty partitions - lists of files
+        """
+        if len(files) == 0:
+            return []
+        total = sum(file_sizes.get(f_name, 0) for f_name in files)
+        n_partitions = min(max(math.ceil(total / partition_size), min_partitions, 1), len(files))
+        partitions = [[] for _ in range(n_partitions)]
+        # heap of partition size, number of files and index, so that empty files are spread as well
+        heap = [(0, 0, index) for index in range(n_partitions)]
+        # sort is stable, equal sizes preserve listing order
+        for f_name in sorted(files, key=lambda name: file_sizes.get(name, 0), reverse=True):
+            size, n_files, index = heapq.heappop(heap)
+            partitions[index].append(f_name)
+            heapq.heappush(heap, (size + file_sizes.get(f_name, 0), n_files + 1, index))
+        return partitions
+
+    @staticmethod
+    def sum_statistics(statistics: dict[int, dict[str, Any]]) -> dict[str, Any]:
+        """
+        Sum statistics of the partitions (see StatisticsAccumulatorParam)
+        :param statistics: dictionary of the partition index to the statistics of the partition
+        :return: statistics
+        """
+        result = {}
+        for stats in statistics.values():
+            for key, val in stats.items():
+                result[key] = result.get(key, 0) + val
+        return result
+
+    @staticmethod
+    def get_s3a_config(data_access: DataAccess) -> dict[str, str]:
+        """
+        Get Hadoop configuration of the S3A file system, used by Spark readers and writers of S3 paths,
+        from the credentials of the data access
+        :param data_access: data access
+        :return: dictionary of Hadoop configuration, empty if the data access is not S3
+        """
+        if not isinstance(data_access, DataAccessS3):
+            return {}
+        credentials = data_access.s3_credentials
+        config = {
+            "fs.s3a.access.key": credentials["access_key"],
+            "fs.s3a.secret.key": credentials["secret_key"],
+        }
+        if credentials.get("url", None) is not None:
+            # S3 compatible storage (e.g. MinIO), usually not supporting virtual host style access
+            config["fs.s3a.endpoint"] = credentials["url"]
+            config["fs.s3a.path.style.access"] = "true"
+        if credentials.get("region", None) is not None:
+            config["fs.s3a.endpoint.region"] = credentials["region"]
+        return config
+
+    @staticmethod
+    def conform_table(table: pa.Table, schema: pa.Schema) -> pa.Table:
+        """
+        Conform a table to a schema (e.g. of the Spark data frame), casting its columns to the types of the schema
+        and adding missing ones as nulls
+        :param table: table
+        :param schema: schema
+        :return: table with the given schema
+        """
+        extra = [name for name in table.column_names if schema.get_field_index(name) < 0]
+        if len(extra) > 0:
+            raise ValueError(f"columns {extra} are not in the output schema {schema}")
+        columns = []
+        for field in schema:
+            if field.name in table.column_names:
+                columns.append(table[field.name].cast(field.type))
+            else:
+                columns.append(pa.nulls(table.num_rows, type=field.type))
+        return pa.Table.from_arrays(columns, schema=schema)
+
+    @staticmethod
+    def get_spark_path(data_access: DataAccess, path: str) -> str:
+        """
+        Convert a path of the data access to the path used by Spark readers and writers
+        :param data_access: data access
+        :param path: file or folder path
+        :return: path with the scheme required by Spark
+        """
+        if isinstance(data_access, DataAccessS3):
+            # S3 paths do not include the scheme, Spark uses S3A file system for them
+            return f"s3a://{path}"
+        return path
+
+    @staticmethod
+    def get_output_schema(
+        transform: AbstractTableTransform,
+        data_access: DataAccess,
+        files: list[str],
+        input_schema: pa.Schema = None,
+        sample_rows: int = SCHEMA_SAMPLE_ROWS,
+        sample_files: int = SCHEMA_SAMPLE_FILES,
+    ) -> pa.Schema:
+        """
+        Get schema of the transform output on the driver, before the processing. The schema declared by the
+        transform (see AbstractTableTransform.get_output_schema) is used, if there is one. Otherwise the first
+        sample_rows rows of the input files are transformed, until the transform produces an output. The
+        transform is not flushed
+        :param transform: transform, created on the driver
+        :param data_access: data access
+        :param files: input files
+        :param input_schema: optional schema of the input (e.g. of the Spark data frame), the sample is conformed to
+        :param sample_rows: number of rows of a file to transform
+        :param sample_files: maximum number of files to sample
+        :return: output schema
+        """
+        for f_name in files[:sample_files]:
+            content, _ = data_access.get_file_buffer(path=f_name)
+            if content is None:
+                continue
+            parquet = pq.ParquetFile(pa.BufferReader(content))
+            schema = transform.get_output_schema(schema=input_schema or parquet.schema_arrow)
+            if schema is not None:
+                return schema
+            batch = next(parquet.iter_batches(batch_size=sample_rows), None)
+            if batch is None:
+                continue
+            sample = pa.Table.from_batches([batch])
+            if input_schema is not None:
+                sample = SparkUtils.conform_table(table=sample, schema=input_schema)
+            out_tables, _ = transform.transform(table=sample)
+            if len(out_tables) > 0:
+                return pa.unify_schemas([table.schema for table in out_tables])
+        raise RuntimeError(
+            f"Transform produced no output for the sample of {min(len(files), sample_files)} files, "
+            f"can not get output schema. The transform has to declare it (get_output_schema())"
+        )
+
+    @staticmethod
+    def get_parquet_writer_options(write_profile: dict[str, Any] = None) -> dict[str, str]:
+        """
+        Convert parquet write profile (see TransformUtils.get_parquet_write_options) to the options of Spark
+        parquet writer. Compression (and zstd compression level), row group size (rows) and dictionary encoding
+        (of all the columns) are supported, the rest of the profile is not applied (with a warning)
+        :param write_profile: parquet write profile
+        :return: dictionary of Spark parquet writer options
+        """
+        profile = TransformUtils.get_parquet_write_options(write_profile=write_profile)
+        options = {"compression": str(profile.pop("compression"))}
+        level = profile.pop("compression_level", None)
+        if level is not None and options["compression"] == "zstd":
+            options["parquet.compression.codec.zstd.level"] = str(level)
+        elif level is not None:
+            logger.warning(
+                f"Compression level is only applied to zstd by Spark writer, not to {options['compression']}"
+            )
+        if "row_group_size" in profile:
+            options["parquet.block.row.count.limit"] = str(profile.pop("row_group_size"))
+        if isinstance(profile.get("use_dictionary", None), bool):
+            options["parquet.enable.dictionary"] = str(profile.pop("use_dictionary")).lower()
+        if len(profile) > 0:
+            logger.warning(f"Parquet write options {sorted(profile.keys())} are not applied by Spark writer")
+        return options
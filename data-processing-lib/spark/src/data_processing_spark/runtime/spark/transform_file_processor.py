@@ -30,6 +30,8 @@ class SparkTransformFileProcessor(AbstractTransformFileProcessor):
         runtime_configuration: SparkTransformRuntimeConfiguration,
         statistics: TransformStatistics,
         is_folder: bool,
+        read_ahead: int = 0,
+        write_behind: int = 0,
     ):
         """
         Init method
@@ -38,6 +40,8 @@ class SparkTransformFileProcessor(AbstractTransformFileProcessor):
             data_access_factory=data_access_factory,
             transform_parameters=runtime_configuration.get_transform_params(),
             is_folder=is_folder,
+            read_ahead=read_ahead,
+            write_behind=write_behind,
         )
         # Add data access ant statistics to the processor parameters
         self.runtime_configuration = runtime_configuration
@@ -15,18 +15,28 @@ import socket
 import time
 import traceback
 from datetime import datetime
+from typing import Any
 
+import pyarrow as pa
 import yaml
-from data_processing.data_access import DataAccessFactoryBase
-from data_processing.transform import TransformStatistics, AbstractFolderTransform
-from data_processing.utils import GB, get_logger
+from data_processing.data_access import DataAccess, DataAccessFactoryBase
+from data_processing.transform import (
+    AbstractFolderTransform,
+    AbstractTableTransform,
+    TransformStatistics,
+)
+from data_processing.utils import GB, MB, get_logger
 from data_processing_spark.runtime.spark import (
     SparkTransformExecutionConfiguration,
     SparkTransformFileProcessor,
     SparkTransformRuntimeConfiguration,
+    SparkUtils,
+    StatisticsAccumulatorParam,
 )
-from pyspark import SparkConf, SparkContext
-from pyspark.sql import SparkSession
+from pyspark import SparkConf, SparkContext, TaskContext
+from pyspark.broadcast import Broadcast
+from pyspark.sql import DataFrame, SparkSession
+from pyspark.sql.pandas.types import from_arrow_schema, to_arrow_schema
 
 
 logger = get_logger(__name__)
@@ -73,6 +83,122 @@ def _init_spark(runtime_config: SparkTransformRuntimeConfiguration) -> SparkSess
         return SparkSession.builder.master(master_url).appName(app_name).config(map=spark_config).getOrCreate()
 
 
+def _create_table_transform(
+    runtime_config: SparkTransformRuntimeConfiguration,
+    data_access_factory: DataAccessFactoryBase,
+    bcast_params: dict[str, Any],
+    statistics: TransformStatistics,
+    partition: int,
+) -> tuple[Any, AbstractTableTransform]:
+    """
+    Create table transform for a Spark partition
+    :param runtime_config: transformer runtime configuration
+    :param data_access_factory: data access factory
+    :param bcast_params: broadcasted transform parameters
+    :param statistics: statistics of the partition
+    :param partition: partition index, used as the transform's partition number
+    :return: transform runtime and transform
+    """
+    runtime = runtime_config.create_transform_runtime()
+    transform = runtime_config.get_transform_class()(
+        runtime.get_transform_config(
+            partition=partition, data_access_factory=data_access_factory, statistics=statistics
+        )
+        | bcast_params
+    )
+    return runtime, transform
+
+
+def _process_dataframe(
+    spark_session: SparkSession,
+    runtime_config: SparkTransformRuntimeConfiguration,
+    execution_configuration: SparkTransformExecutionConfiguration,
+    data_access: DataAccess,
+    files: list[str],
+    spark_runtime_config: Broadcast,
+    daf: Broadcast,
+    spark_bcast_params: Broadcast,
+) -> tuple[int, dict[str, Any]]:
+    """
+    Process files as a Spark DataFrame - read them using Spark parquet reader, transform record batches
+    using mapInArrow and write the result using Spark parquet writer
+    :param spark_session: Spark session
+    :param runtime_config: transformer runtime configuration
+    :param execution_configuration: orchestrator configuration
+    :param data_access: data access
+    :param files: files to process
+    :param spark_runtime_config: broadcasted runtime configuration
+    :param daf: broadcasted data access factory
+    :param spark_bcast_params: broadcasted transform parameters
+    :return: number of partitions and statistics
+    """
+    # statistics by partition, so that retried and speculative task attempts are only counted once
+    statistics = spark_session.sparkContext.accumulator({}, StatisticsAccumulatorParam())
+
+    def process_batches(iterator):
+        """
+        process record batches of a partition
+        :param iterator: iterator of record batches
+        :return: iterator of the transformed record batches
+        """
+        local_stats = TransformStatistics()
+        runtime, transform = _create_table_transform(
+            runtime_config=spark_runtime_config.value,
+            data_access_factory=daf.value,
+            bcast_params=spark_bcast_params.value,
+            statistics=local_stats,
+            partition=TaskContext.get().partitionId(),
+        )
+        for batch in iterator:
+            out_tables, stats = transform.transform(table=pa.Table.from_batches([batch]))
+            local_stats.add_stats(stats | {"source_doc_count": batch.num_rows})
+            for table in out_tables:
+                local_stats.add_stats({"result_doc_count": table.num_rows})
+                yield from SparkUtils.conform_table(table, schema).to_batches()
+        out_tables, stats = transform.flush()
+        local_stats.add_stats(stats)
+        for table in out_tables:
+            local_stats.add_stats({"result_doc_count": table.num_rows})
+            yield from SparkUtils.conform_table(table, schema).to_batches()
+        runtime.compute_execution_stats(local_stats)
+        statistics.add({TaskContext.get().partitionId(): local_stats.get_execution_stats()})
+
+    if execution_configuration.partition_size > 0:
+        spark_session.conf.set("spark.sql.files.maxPartitionBytes", int(execution_configuration.partition_size * MB))
+    hadoop_config = spark_session.sparkContext._jsc.hadoopConfiguration()
+    for key, value in SparkUtils.get_s3a_config(data_access).items():
+        hadoop_config.set(key, value)
+    source_df = spark_session.read.parquet(*[SparkUtils.get_spark_path(data_access, f_name) for f_name in files])
+    if execution_configuration.parallelization > 0:
+        source_df = source_df.repartition(execution_configuration.parallelization)
+    # output schema is obtained on the driver, transforming a sample of the input by a transform, that is not
+    # flushed, unless the transform declares it
+    _, transform = _create_table_transform(
+        runtime_config=runtime_config,
+        data_access_factory=daf.value,
+        bcast_params=spark_bcast_params.value,
+        statistics=TransformStatistics(),
+        partition=0,
+    )
+    schema = SparkUtils.get_output_schema(
+        transform=transform, data_access=data_access, files=files, input_schema=to_arrow_schema(source_df.schema)
+    )
+    logger.info(f"Output schema {schema}")
+    num_partitions = source_df.rdd.getNumPartitions()
+    logger.info(f"Processing data frame. Using {num_partitions} partitions")
+    write_options = SparkUtils.get_parquet_writer_options(
+        write_profile=runtime_config.get_transform_params().get("write_profile", None)
+    )
+    source_df.mapInArrow(process_batches, from_arrow_schema(schema)).write.mode("append").options(
+        **write_options
+    ).parquet(SparkUtils.get_spark_path(data_access, data_access.get_output_folder()))
+    sizes = data_access.get_file_sizes()
+    return num_partitions, SparkUtils.sum_statistics(statistics.value) | {
+        "source_files": len(files),
+        "source_size": sum(sizes.get(f_name, 0) for f_name in files),
+    }
+
+
 def orchestrate(
     runtime_config: SparkTransformRuntimeConfiguration,
     execution_configuration: SparkTransformExecutionConfiguration,
@@ -102,10 +228,11 @@ def orchestrate(
     daf = sc.broadcast(data_access_factory)
     spark_bcast_params = sc.broadcast(bcast_params)
 
-    def process_partition(iterator):
+    def process_partition(index, iterator):
         """
         process partitions
-        :param iterator: iterator of records
+        :param index: partition index, used as the transform's partition number
+        :param iterator: iterator of file names
         :return:
         """
         # local statistics dictionary
@@ -121,24 +248,24 @@ def orchestrate(
             runtime_configuration=runtime_conf,
             statistics=statistics,
             is_folder=is_folder,
+            read_ahead=read_ahead,
+            write_behind=write_behind,
         )
-        first = True
-        for f in iterator:
-            # for every file
-            if first:
-                logger.debug(f"partition {f}")
-                # add additional parameters
-                transform_params = (
-                    runtime.get_transform_config(
-                        partition=int(f[1]), data_access_factory=d_access_factory, statistics=statistics
-                    )
-                    | bcast_params
+        # partition's file names are small, materialize them to allow for reading ahead
+        partition = list(iterator)
+        if len(partition) > 0:
+            logger.debug(f"partition {index}, first file {partition[0]}")
+            # add additional parameters
+            transform_params = (
+                runtime.get_transform_config(
+                    partition=index, data_access_factory=d_access_factory, statistics=statistics
                 )
-                # create transform with partition number
-                file_processor.create_transform(transform_params)
-                first = False
-            # process file
-            file_processor.process_file(f_name=f[0])
+                | bcast_params
+            )
+            # create transform with partition number
+            file_processor.create_transform(transform_params)
+            # process files
+            file_processor.process_files(partition)
         # flush
         file_processor.flush()
         # enhance statistics
@@ -147,16 +274,52 @@ def orchestrate(
         return list(statistics.get_execution_stats().items())
 
     num_partitions = 0
+    read_ahead = execution_configuration.read_ahead
+    write_behind = execution_configuration.write_behind
     is_folder = issubclass(runtime_config.get_transform_class(), AbstractFolderTransform)
+    use_dataframe = execution_configuration.dataframe and issubclass(
+        runtime_config.get_transform_class(), AbstractTableTransform
+    )
+    if execution_configuration.dataframe and not use_dataframe:
+        logger.warning("Data frame execution is only supported for table transforms, processing files")
+    if use_dataframe and data_access.checkpoint:
+        # Spark writer appends part files with the generated names, rerun would duplicate the output
+        logger.warning("Data frame execution does not support checkpointing, processing files")
+        use_dataframe = False
     try:
+        shards = None
         if is_folder:
             # folder transform
             runtime = runtime_config.create_transform_runtime()
             files = runtime.get_folders(data_access=data_access)
-            logger.info(f"Number of folders is {len(files)}")        # Get files to process
+            logger.info(f"Number of folders is {len(files)}")  # Get files to process
+        elif (
+            execution_configuration.sharded_listing
+            and not use_dataframe
+            and data_access.m_files <= 0
+            and data_access.n_samples <= 0
+        ):
+            # only the shards are listed on the driver, their files are listed by the tasks
+            shards, retries = data_access.get_listing_shards()
+            if len(shards) == 0:
+                logger.error("No input shards to list - exiting")
+                return 0
+            # checkpoint manifest is read once on the driver and broadcasted to the tasks listing the shards
+            manifest, r = data_access.get_checkpoint_manifest()
+            retries += r
+            bcast_manifest = sc.broadcast(manifest)
+            logger.info(f"Number of input shards is {len(shards)}")
         else:
             # Get files to process
-            files, profile, retries = data_access.get_files_to_process()
+            if use_dataframe or execution_configuration.partition_size > 0:
+                # file sizes are used for partitioning and statistics
+                files, profile, retries = data_access.get_files_to_process()
+            else:
+                # list files without getting their sizes and ordering them
+                files, profile, retries = [], {}, 0
+                for page, r in data_access.iterate_files_to_process():
+                    files.extend(page)
+                    retries += r
             if len(files) == 0:
                 logger.error("No input files to process - exiting")
                 return 0
@@ -165,15 +328,56 @@ def orchestrate(
         logger.debug("Begin processing files")
         # process files split by partitions
         logger.debug(f"parallelization {execution_configuration.parallelization}")
-        if execution_configuration.parallelization > 0:
-            source_rdd = sc.parallelize(files, execution_configuration.parallelization)
+        if use_dataframe:
+            num_partitions, stats = _process_dataframe(
+                spark_session=spark_session,
+                runtime_config=runtime_config,
+                execution_configuration=execution_configuration,
+                data_access=data_access,
+                files=files,
+                spark_runtime_config=spark_runtime_config,
+                daf=daf,
+                spark_bcast_params=spark_bcast_params,
+            )
         else:
-            source_rdd = sc.parallelize(files)
-        num_partitions = source_rdd.getNumPartitions()
-        logger.info(f"Parallelizing execution. Using {num_partitions} partitions")
-        stats_rdd = source_rdd.zipWithIndex().mapPartitions(process_partition)
-        # build overall statistics
-        stats = dict(stats_rdd.reduceByKey(lambda a, b: a + b).collect())
+            if shards is not None:
+
+                def list_shard(shard):
+                    files, _, _ = daf.value.create_data_access().get_shard_files_to_process(
+                        shard=shard[0], recursive=shard[1], manifest=bcast_manifest.value
+                    )
+                    return files
+
+                # shards can be very uneven (e.g. all the files directly in the input folder), the listed files
+                # are always redistributed, so that they are not processed by the tasks that listed them
+                source_rdd = (
+                    sc.parallelize(shards, len(shards))
+                    .flatMap(list_shard)
+                    .repartition(
+                        execution_configuration.parallelization
+                        if execution_configuration.parallelization > 0
+                        else sc.defaultParallelism
+                    )
+                )
+            elif not is_folder and execution_configuration.partition_size > 0:
+                # partitions of (roughly) equal size, one element (list of files) per partition
+                partitions = SparkUtils.pack_files(
+                    files=files,
+                    file_sizes=data_access.get_file_sizes(),
+                    partition_size=int(execution_configuration.partition_size * MB),
+                    min_partitions=max(execution_configuration.parallelization, 0),
+                )
+                source_rdd = sc.parallelize(partitions, len(partitions)).flatMap(lambda partition: partition)
+            elif execution_configuration.parallelization > 0:
+                source_rdd = sc.parallelize(files, execution_configuration.parallelization)
+            else:
+                source_rdd = sc.parallelize(files)
+            num_partitions = source_rdd.getNumPartitions()
+            logger.info(f"Parallelizing execution. Using {num_partitions} partitions")
+            # partition index is used as the transform's partition number, avoiding an extra job to index the files
+            stats_rdd = source_rdd.mapPartitionsWithIndex(process_partition)
+            # build overall statistics
+            stats = dict(stats_rdd.reduceByKey(lambda a, b: a + b).collect())
         return_code = 0
         status = "success"
     except Exception as e:
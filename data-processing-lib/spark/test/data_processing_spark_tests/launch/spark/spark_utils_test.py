@@ -0,0 +1,126 @@
+# (C) Copyright IBM Corp. 2024.
+# Licensed under the Apache License, Version 2.0 (the “License”);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an “AS IS” BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+################################################################################
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from data_processing.data_access import DataAccessLocal, DataAccessS3
+from data_processing.transform import AbstractTableTransform
+from data_processing_spark.runtime.spark import SparkUtils, StatisticsAccumulatorParam
+
+
+def test_pack_files():
+    files = [f"file{i}" for i in range(6)]
+    sizes = {"file0": 10, "file1": 60, "file2": 20, "file3": 30, "file4": 40, "file5": 50}
+    partitions = SparkUtils.pack_files(files=files, file_sizes=sizes, partition_size=70)
+    # 210 bytes are packed into 3 partitions of 70 bytes
+    assert partitions == [["file1", "file0"], ["file5", "file2"], ["file4", "file3"]]
+    # minimum number of partitions
+    partitions = SparkUtils.pack_files(files=files, file_sizes=sizes, partition_size=1000, min_partitions=2)
+    assert sorted(sum(sizes[f] for f in partition) for partition in partitions) == [100, 110]
+    # empty files are spread between partitions, no partition is empty
+    partitions = SparkUtils.pack_files(files=files, file_sizes={}, partition_size=70, min_partitions=3)
+    assert [len(partition) for partition in partitions] == [2, 2, 2]
+    assert SparkUtils.pack_files(files=[], file_sizes=sizes, partition_size=70) == []
+
+
+def test_statistics_accumulator():
+    param = StatisticsAccumulatorParam()
+    statistics = param.zero({})
+    statistics = param.addInPlace(statistics, {0: {"source_doc_count": 10, "result_doc_count": 5}})
+    statistics = param.addInPlace(statistics, {1: {"source_doc_count": 20}})
+    # retried (or speculative) attempt of the partition 0 replaces its statistics
+    statistics = param.addInPlace(statistics, {0: {"source_doc_count": 10, "result_doc_count": 5}})
+    assert SparkUtils.sum_statistics(statistics) == {"source_doc_count": 30, "result_doc_count": 5}
+    assert SparkUtils.sum_statistics(param.zero({})) == {}
+
+
+def test_conform_table():
+    schema = pa.unify_schemas(
+        [pa.schema([("a", pa.int64()), ("b", pa.string())]), pa.schema([("a", pa.int64()), ("c", pa.float64())])]
+    )
+    table = SparkUtils.conform_table(pa.table({"a": pa.array([1, 2], type=pa.int32()), "c": [0.5, 1.5]}), schema)
+    assert table.schema == schema
+    assert table.to_pydict() == {"a": [1, 2], "b": [None, None], "c": [0.5, 1.5]}
+    with pytest.raises(ValueError):
+        SparkUtils.conform_table(pa.table({"d": [1]}), schema)
+
+
+def test_s3a_config():
+    assert SparkUtils.get_s3a_config(DataAccessLocal({"input_folder": "in", "output_folder": "out"})) == {}
+    credentials = {"access_key": "access", "secret_key": "secret", "url": "http://localhost:9000", "region": None}
+    data_access = DataAccessS3(s3_credentials=credentials, s3_config={"input_folder": "in", "output_folder": "out"})
+    assert SparkUtils.get_s3a_config(data_access) == {
+        "fs.s3a.access.key": "access",
+        "fs.s3a.secret.key": "secret",
+        "fs.s3a.endpoint": "http://localhost:9000",
+        "fs.s3a.path.style.access": "true",
+    }
+
+
+class _SchemaTransform(AbstractTableTransform):
+    """
+    Transform adding a column to the rows, that are not filtered out, counting its invocations
+    """
+
+    def __init__(self, config: dict):
+        super().__init__(config)
+        self.declared = config.get("declared", None)
+        self.calls = 0
+
+    def transform(self, table: pa.Table, file_name: str = None):
+        self.calls += 1
+        table = table.filter(pa.compute.greater(table["a"], 5))
+        if table.num_rows == 0:
+            return [], {}
+        return [table.append_column("b", pa.array([1.0] * table.num_rows))], {}
+
+    def get_output_schema(self, schema: pa.Schema) -> pa.Schema:
+        return self.declared
+
+    def flush(self):
+        raise Exception("transform is not flushed")
+
+
+def test_output_schema(tmp_path):
+    pq.write_table(pa.table({"a": [1, 2, 3]}), tmp_path / "file0.parquet")
+    pq.write_table(pa.table({"a": pa.array([4, 5, 6, 7], type=pa.int32())}), tmp_path / "file1.parquet")
+    data_access = DataAccessLocal({"input_folder": str(tmp_path), "output_folder": str(tmp_path / "out")})
+    files = [str(tmp_path / "file0.parquet"), str(tmp_path / "file1.parquet")]
+    # files are sampled until there is an output, the sample is conformed to the input schema
+    transform = _SchemaTransform({})
+    schema = SparkUtils.get_output_schema(
+        transform=transform, data_access=data_access, files=files, input_schema=pa.schema([("a", pa.int64())])
+    )
+    assert schema == pa.schema([("a", pa.int64()), ("b", pa.float64())])
+    assert transform.calls == 2
+    # declared schema is used without transforming data
+    declared = pa.schema([("c", pa.string())])
+    transform = _SchemaTransform({"declared": declared})
+    assert SparkUtils.get_output_schema(transform=transform, data_access=data_access, files=files) == declared
+    assert transform.calls == 0
+    with pytest.raises(RuntimeError):
+        SparkUtils.get_output_schema(transform=_SchemaTransform({}), data_access=data_access, files=files[:1])
+
+
+def test_parquet_writer_options():
+    assert SparkUtils.get_parquet_writer_options() == {"compression": "zstd"}
+    profile = {"compression": "zstd", "compression_level": 9, "row_group_size": 1000, "use_dictionary": False}
+    assert SparkUtils.get_parquet_writer_options(profile) == {
+        "compression": "zstd",
+        "parquet.compression.codec.zstd.level": "9",
+        "parquet.block.row.count.limit": "1000",
+        "parquet.enable.dictionary": "false",
+    }
+    # options, that are not supported by Spark writer, are not applied
+    profile = {"compression": "snappy", "compression_level": 3, "write_page_index": True}
+    assert SparkUtils.get_parquet_writer_options(profile) == {"compression": "snappy"}
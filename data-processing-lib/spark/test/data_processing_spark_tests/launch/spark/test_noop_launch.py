@@ -31,4 +31,13 @@ class TestSparkNOOPTransform(AbstractTransformLauncherTest):
         fixtures = []
         launcher = SparkTransformLauncher(NOOPSparkTransformConfiguration())
         fixtures.append((launcher, {"noop_sleep_sec": 1}, basedir + "/input", basedir + "/expected"))
+        # files are listed by the shard listing tasks
+        fixtures.append(
+            (
+                launcher,
+                {"noop_sleep_sec": 1, "runtime_sharded_listing": True},
+                basedir + "/input",
+                basedir + "/expected",
+            )
+        )
         return fixtures
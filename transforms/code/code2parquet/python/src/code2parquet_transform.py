@@ -129,7 +129,6 @@ class CodeToParquetTransform(AbstractBinaryTransform):
                                     "contents": content_string,
                                     "document_id": str(uuid.uuid4()),
                                     "ext": ext,
-                                    "hash": TransformUtils.str_to_hash(content_string),
                                     "size": len(content_string),
                                     "date_acquired": datetime.now().isoformat(),
                                     "repo_name": os.path.splitext(os.path.basename(file_name))[0],
@@ -146,6 +145,11 @@ class CodeToParquetTransform(AbstractBinaryTransform):
                         except Exception as e:
                             self.logger.warning(f"Exception {str(e)} processing file {member.filename}, skipping")
         table = pa.Table.from_pylist(data)
+        if number_of_rows > 0:
+            # hash all the contents at once, placing the hashes after the extensions
+            table = table.add_column(
+                table.schema.get_field_index("ext") + 1, "hash", TransformUtils.hash_array(table["contents"])
+            )
         return [(TransformUtils.convert_arrow_to_binary(table=table), ".parquet")], {"number of rows": number_of_rows}
 
 
@@ -243,18 +243,23 @@ class CodeQualityTransform(AbstractTableTransform):
             is_xml_values.append(is_xml(c, languages[i]))
             is_html_values.append(is_html(c, languages[i]))
 
-        table = TransformUtils.add_column(table=table, name="line_mean", content=line_mean_values)
-        table = TransformUtils.add_column(table=table, name="line_max", content=line_max_values)
-        table = TransformUtils.add_column(table=table, name="total_num_lines", content=no_lines_values)
-        table = TransformUtils.add_column(table=table, name="avg_longest_lines", content=avg_longest_lines_values)
-        table = TransformUtils.add_column(table=table, name="alphanum_frac", content=alphanum_frac_values)
-        table = TransformUtils.add_column(table=table, name="char_token_ratio", content=char_token_ratio_values)
-        table = TransformUtils.add_column(table=table, name="autogenerated", content=is_autogenerated_values)
-        table = TransformUtils.add_column(table=table, name="config_or_test", content=is_config_or_test_values)
-        table = TransformUtils.add_column(table=table, name="has_no_keywords", content=has_no_keywords_values)
-        table = TransformUtils.add_column(table=table, name="has_few_assignments", content=has_few_assignments_values)
-        table = TransformUtils.add_column(table=table, name="is_xml", content=is_xml_values)
-        table = TransformUtils.add_column(table=table, name="is_html", content=is_html_values)
+        table = TransformUtils.add_columns(
+            table=table,
+            columns={
+                "line_mean": line_mean_values,
+                "line_max": line_max_values,
+                "total_num_lines": no_lines_values,
+                "avg_longest_lines": avg_longest_lines_values,
+                "alphanum_frac": alphanum_frac_values,
+                "char_token_ratio": char_token_ratio_values,
+                "autogenerated": is_autogenerated_values,
+                "config_or_test": is_config_or_test_values,
+                "has_no_keywords": has_no_keywords_values,
+                "has_few_assignments": has_few_assignments_values,
+                "is_xml": is_xml_values,
+                "is_html": is_html_values,
+            },
+        )
 
         return [table], {}
 
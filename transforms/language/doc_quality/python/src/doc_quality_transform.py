@@ -56,6 +56,9 @@ class DocQualityTransform(AbstractTableTransform):
     Implements a transform to calculate document quality.
     """
 
+    # rows are processed independently, so files can be split into parts
+    supports_file_parts = True
+
     def __init__(self, config: dict[str, Any]):
         """
         Initialize based on the dictionary of configuration information.
@@ -151,31 +154,23 @@ class DocQualityTransform(AbstractTableTransform):
                 docq_avg_ja_sentence_len.append(compute_average_japanese_sentence_length(text))
                 docq_first_ja_alphabet_pos.append(find_first_japanese_alphabet_position(text))
 
-        table = TransformUtils.add_column(table=table, name="docq_total_words", content=docq_total_words)
-        table = TransformUtils.add_column(table=table, name="docq_mean_word_len", content=docq_mean_word_len)
-        table = TransformUtils.add_column(
-            table=table, name="docq_symbol_to_word_ratio", content=docq_symbol_to_word_ratio
-        )
-        table = TransformUtils.add_column(table=table, name="docq_sentence_count", content=docq_sentence_count)
-        table = TransformUtils.add_column(table=table, name="docq_lorem_ipsum_ratio", content=docq_lorem_ipsum_ratio)
-        table = TransformUtils.add_column(
-            table=table, name="docq_curly_bracket_ratio", content=docq_curly_bracket_ratio
-        )
-        table = TransformUtils.add_column(table=table, name="docq_contain_bad_word", content=docq_contain_bad_word)
-        table = TransformUtils.add_column(table=table, name="docq_bullet_point_ratio", content=docq_bullet_point_ratio)
-        table = TransformUtils.add_column(
-            table=table, name="docq_ellipsis_line_ratio", content=docq_ellipsis_line_ratio
-        )
-        table = TransformUtils.add_column(
-            table=table, name="docq_alphabet_word_ratio", content=docq_alphabet_word_ratio
-        )
-        table = TransformUtils.add_column(
-            table=table, name="docq_contain_common_en_words", content=docq_contain_common_en_words
-        )
-
+        columns = {
+            "docq_total_words": docq_total_words,
+            "docq_mean_word_len": docq_mean_word_len,
+            "docq_symbol_to_word_ratio": docq_symbol_to_word_ratio,
+            "docq_sentence_count": docq_sentence_count,
+            "docq_lorem_ipsum_ratio": docq_lorem_ipsum_ratio,
+            "docq_curly_bracket_ratio": docq_curly_bracket_ratio,
+            "docq_contain_bad_word": docq_contain_bad_word,
+            "docq_bullet_point_ratio": docq_bullet_point_ratio,
+            "docq_ellipsis_line_ratio": docq_ellipsis_line_ratio,
+            "docq_alphabet_word_ratio": docq_alphabet_word_ratio,
+            "docq_contain_common_en_words": docq_contain_common_en_words,
+        }
         if self.text_lang == "ja":
-            table = table.append_column("docq_avg_ja_sentence_len", pa.array(docq_avg_ja_sentence_len))
-            table = table.append_column("docq_first_ja_alphabet_pos", pa.array(docq_first_ja_alphabet_pos))
+            columns["docq_avg_ja_sentence_len"] = docq_avg_ja_sentence_len
+            columns["docq_first_ja_alphabet_pos"] = docq_first_ja_alphabet_pos
+        table = TransformUtils.add_columns(table=table, columns=columns)
 
         metadata = {
             "total_docs_count": table.num_rows,
@@ -13,6 +13,7 @@
 from argparse import ArgumentParser, Namespace
 from typing import Any
 
+import numpy as np
 import pyarrow as pa
 
 from data_processing.transform import AbstractTableTransform, TransformConfiguration
@@ -91,19 +92,15 @@ class DocIDTransformBase(AbstractTableTransform):
         """
         TransformUtils.validate_columns(table=table, required=[self.doc_column])
 
+        columns = {}
         if self.hash_column is not None:
             # add doc id column
-            docs = table[self.doc_column]
-            doc_ids = [""] * table.num_rows
-            for n in range(table.num_rows):
-                doc_ids[n] = TransformUtils.str_to_hash(docs[n].as_py())
-            table = TransformUtils.add_column(table=table, name=self.hash_column, content=doc_ids)
+            columns[self.hash_column] = TransformUtils.hash_array(table[self.doc_column])
         if self.int_column is not None:
             # add integer document id
             sid = self._get_starting_id(table.num_rows)
-            int_doc_ids = list(range(sid, table.num_rows + sid))
-            table = TransformUtils.add_column(table=table, name=self.int_column, content=int_doc_ids)
-        return [table], {}
+            columns[self.int_column] = np.arange(sid, table.num_rows + sid, dtype=np.int64)
+        return [TransformUtils.add_columns(table=table, columns=columns)], {}
 
     def _get_starting_id(self, n_rows: int) -> int:
         """
@@ -13,6 +13,7 @@
 from argparse import ArgumentParser, Namespace
 from typing import Any
 
+import numpy as np
 import pyarrow as pa
 from data_processing.transform import AbstractTableTransform, TransformConfiguration
 from data_processing.data_access import DataAccessFactoryBase
@@ -65,20 +66,17 @@ class DocIDTransform(AbstractTableTransform):
         """
         TransformUtils.validate_columns(table=table, required=[self.doc_column])
 
+        columns = {}
         if self.hash_column is not None:
             # add doc id column
-            docs = table[self.doc_column]
-            doc_ids = [""] * table.num_rows
-            for n in range(table.num_rows):
-                doc_ids[n] = TransformUtils.str_to_hash(docs[n].as_py())
-            table = TransformUtils.add_column(table=table, name=self.hash_column, content=doc_ids)
+            columns[self.hash_column] = TransformUtils.hash_array(table[self.doc_column])
         if self.int_column is not None:
             # add integer document id
-            int_doc_ids = list(range(self.start_index, table.num_rows + self.start_index))
-            self.logger.debug(f"int ids {int_doc_ids}")
+            int_doc_ids = np.arange(self.start_index, table.num_rows + self.start_index, dtype=np.int64)
+            self.logger.debug(f"int ids {self.start_index} - {table.num_rows + self.start_index - 1}")
             self.start_index += table.num_rows
-            table = TransformUtils.add_column(table=table, name=self.int_column, content=int_doc_ids)
-        return [table], {}
+            columns[self.int_column] = int_doc_ids
+        return [TransformUtils.add_columns(table=table, columns=columns)], {}
 
 
 class DocIDTransformConfiguration(TransformConfiguration):
@@ -15,6 +15,7 @@ from argparse import ArgumentParser, Namespace
 from typing import Any
 
 import pyarrow as pa
+import pyarrow.compute as pc
 from data_processing.data_access import SnapshotUtils
 from data_processing.transform import (
     AbstractTableTransform,
@@ -141,17 +142,22 @@ class EdedupTransformBase(AbstractTableTransform):
         # make sure that the doc column exists
         TransformUtils.validate_columns(table=table, required=[self.doc_column, self.doc_id_column])
         # Inner variables
+        doc_ids = table[self.doc_id_column].to_pylist()
+        # Compute doc hashes. Hashes are persisted in the snapshots, so they have to be the same as the ones of
+        # the normalized str(doc)
         docs = table[self.doc_column]
-        doc_ids = table[self.doc_id_column]
+        if pa.types.is_string(docs.type) or pa.types.is_large_string(docs.type):
+            docs = TransformUtils.normalize_array(pc.fill_null(docs, str(None)))
+            doc_hashes = TransformUtils.hash_array(docs).to_pylist()
+        else:
+            doc_hashes = [
+                TransformUtils.str_to_hash(TransformUtils.normalize_string(str(doc))) for doc in docs.to_pylist()
+            ]
         hashes = set()
         unique = []
         hd = {}
         # Compute unique hashes for the table
-        for n in range(table.num_rows):
-            doc = docs[n].as_py()
-            doc_id = doc_ids[n].as_py()
-            # Compute doc hash
-            h = TransformUtils.str_to_hash(TransformUtils.normalize_string(str(doc)))
+        for h, doc_id in zip(doc_hashes, doc_ids):
             if h not in hashes:  # Processing this hash for the first time
                 hashes.add(h)  # Remember it locally
                 hd[h] = doc_id